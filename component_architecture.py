@@ -37,7 +37,7 @@ def patch_node_prompts():
     Monkey patch the node classes to use our custom prompts.
     This is a temporary solution until we refactor the nodes to accept custom prompts.
     """
-    from nodes import IdentifyAbstractions, AnalyzeRelationships, WriteChapters
+    from nodes import IdentifyAbstractions, AnalyzeRelationships, WriteChapters, repair_response
     
     # Store original methods
     original_identify_exec = IdentifyAbstractions.exec
@@ -50,11 +50,12 @@ def patch_node_prompts():
         (
             context,
             file_listing_for_prompt,
-            file_count,
+            file_ids,
             project_name,
             language,
             use_cache,
             max_abstraction_num,
+            _,
         ) = prep_res
         
         # Add language instruction and hints only if not English
@@ -68,7 +69,7 @@ def patch_node_prompts():
         
         # Use our custom prompt
         from utils.call_llm import call_llm
-        import yaml
+        from utils.structured_output import ABSTRACTIONS_SCHEMA
         
         print(f"Identifying architectural components using LLM...")
         
@@ -82,60 +83,19 @@ def patch_node_prompts():
             max_abstraction_num=max_abstraction_num
         )
         
-        response = call_llm(prompt, use_cache=(use_cache and self.cur_retry == 0))
+        response = call_llm(prompt, use_cache=(use_cache and self.cur_retry == 0), response_schema=ABSTRACTIONS_SCHEMA)
         
-        # The rest of the method is the same as the original
-        # --- Validation ---
-        yaml_str = response.strip().split("```yaml")[1].split("```")[0].strip()
-        abstractions = yaml.safe_load(yaml_str)
-
-        if not isinstance(abstractions, list):
-            raise ValueError("LLM Output is not a list")
-
-        validated_abstractions = []
-        for item in abstractions:
-            if not isinstance(item, dict) or not all(
-                k in item for k in ["name", "description", "file_indices"]
-            ):
-                raise ValueError(f"Missing keys in abstraction item: {item}")
-            if not isinstance(item["name"], str):
-                raise ValueError(f"Name is not a string in item: {item}")
-            if not isinstance(item["description"], str):
-                raise ValueError(f"Description is not a string in item: {item}")
-            if not isinstance(item["file_indices"], list):
-                raise ValueError(f"file_indices is not a list in item: {item}")
-
-            # Validate indices
-            validated_indices = []
-            for idx_entry in item["file_indices"]:
-                try:
-                    if isinstance(idx_entry, int):
-                        idx = idx_entry
-                    elif isinstance(idx_entry, str) and "#" in idx_entry:
-                        idx = int(idx_entry.split("#")[0].strip())
-                    else:
-                        idx = int(str(idx_entry).strip())
-
-                    if not (0 <= idx < file_count):
-                        raise ValueError(
-                            f"Invalid file index {idx} found in item {item['name']}. Max index is {file_count - 1}."
-                        )
-                    validated_indices.append(idx)
-                except (ValueError, TypeError):
-                    raise ValueError(
-                        f"Could not parse index from entry: {idx_entry} in item {item['name']}"
-                    )
-
-            item["files"] = sorted(list(set(validated_indices)))
-            # Store only the required fields
-            validated_abstractions.append(
-                {
-                    "name": item["name"],  # Potentially translated name
-                    "description": item[
-                        "description"
-                    ],  # Potentially translated description
-                    "files": item["files"],
-                }
+        # Validation (and repair of invalid output) is the same as the original
+        try:
+            validated_abstractions = self.parse_response(response, file_ids)
+        except ValueError as e:
+            validated_abstractions = repair_response(
+                response,
+                e,
+                f"Valid file ids:\n{file_listing_for_prompt}",
+                lambda repaired: self.parse_response(repaired, file_ids),
+                use_cache=(use_cache and self.cur_retry == 0),
+                response_schema=ABSTRACTIONS_SCHEMA,
             )
 
         print(f"Identified {len(validated_abstractions)} architectural components.")
@@ -165,7 +125,7 @@ def patch_node_prompts():
         
         # Use our custom prompt
         from utils.call_llm import call_llm
-        import yaml
+        from utils.structured_output import RELATIONSHIPS_SCHEMA
         
         prompt = ANALYZE_ARCHITECTURE_PROMPT.format(
             project_name=project_name,
@@ -176,63 +136,23 @@ def patch_node_prompts():
             list_lang_note=list_lang_note
         )
         
-        response = call_llm(prompt, use_cache=(use_cache and self.cur_retry == 0))
+        response = call_llm(prompt, use_cache=(use_cache and self.cur_retry == 0), response_schema=RELATIONSHIPS_SCHEMA)
         
-        # The rest of the method is the same as the original
-        # --- Validation ---
-        yaml_str = response.strip().split("```yaml")[1].split("```")[0].strip()
-        relationships_data = yaml.safe_load(yaml_str)
-
-        if not isinstance(relationships_data, dict) or not all(
-            k in relationships_data for k in ["summary", "relationships"]
-        ):
-            raise ValueError(
-                "LLM output is not a dict or missing keys ('summary', 'relationships')"
+        # Validation (and repair of invalid output) is the same as the original
+        try:
+            relationships = self.parse_response(response, num_abstractions)
+        except ValueError as e:
+            relationships = repair_response(
+                response,
+                e,
+                f"Valid abstraction indices:\n{abstraction_listing}",
+                lambda repaired: self.parse_response(repaired, num_abstractions),
+                use_cache=(use_cache and self.cur_retry == 0),
+                response_schema=RELATIONSHIPS_SCHEMA,
             )
-        if not isinstance(relationships_data["summary"], str):
-            raise ValueError("summary is not a string")
-        if not isinstance(relationships_data["relationships"], list):
-            raise ValueError("relationships is not a list")
-
-        # Validate relationships structure
-        validated_relationships = []
-        for rel in relationships_data["relationships"]:
-            # Check for 'label' key
-            if not isinstance(rel, dict) or not all(
-                k in rel for k in ["from_abstraction", "to_abstraction", "label"]
-            ):
-                raise ValueError(
-                    f"Missing keys (expected from_abstraction, to_abstraction, label) in relationship item: {rel}"
-                )
-            # Validate 'label' is a string
-            if not isinstance(rel["label"], str):
-                raise ValueError(f"Relationship label is not a string: {rel}")
-
-            # Validate indices
-            try:
-                from_idx = int(str(rel["from_abstraction"]).split("#")[0].strip())
-                to_idx = int(str(rel["to_abstraction"]).split("#")[0].strip())
-                if not (
-                    0 <= from_idx < num_abstractions and 0 <= to_idx < num_abstractions
-                ):
-                    raise ValueError(
-                        f"Invalid index in relationship: from={from_idx}, to={to_idx}. Max index is {num_abstractions-1}."
-                    )
-                validated_relationships.append(
-                    {
-                        "from": from_idx,
-                        "to": to_idx,
-                        "label": rel["label"],  # Potentially translated label
-                    }
-                )
-            except (ValueError, TypeError):
-                raise ValueError(f"Could not parse indices from relationship: {rel}")
 
         print("Generated architectural summary and relationship details.")
-        return {
-            "summary": relationships_data["summary"],
-            "details": validated_relationships,
-        }
+        return relationships
     
     def patched_write_exec(self, item):
         """Patched version of WriteChapters.exec that uses our custom prompt"""
@@ -21,9 +21,9 @@ Focus specifically on:
 For each component, provide:
 1. A concise `name`{name_lang_hint} that clearly identifies the architectural component.
 2. A technical `description` explaining its role in the system architecture, its responsibilities, and how it interacts with other components{desc_lang_hint}.
-3. A list of relevant `file_indices` (integers) using the format `idx # path/comment`.
+3. A list of relevant `file_ids` using the format `id # path/comment`.
 
-List of file indices and paths present in the context:
+List of file ids and paths present in the context:
 {file_listing_for_prompt}
 
 Format the output as a YAML list of dictionaries:
@@ -34,16 +34,16 @@ Format the output as a YAML list of dictionaries:
   description: |
   Core authentication component responsible for user identity verification and session management.
   Implements OAuth2 flow and JWT token generation.{desc_lang_hint}
-  file_indices:
-  - 0 # auth/service.py
-  - 3 # auth/middleware.py
+  file_ids:
+  - f3a91c0 # auth/service.py
+  - f07be5d # auth/middleware.py
 - name: |
   DataAccessLayer{name_lang_hint}
   description: |
   Abstraction layer that handles database operations and provides a clean API for the business logic layer.
   Implements repository pattern to isolate data storage concerns.{desc_lang_hint}
-  file_indices:
-  - 5 # data/repositories.py
+  file_ids:
+  - fc4d218 # data/repositories.py
 # ... up to {max_abstraction_num} components
 ```
 """
@@ -1,19 +1,59 @@
+import copy
 from pocketflow import Flow
 # Import all node classes from nodes.py
 from nodes import (
     FetchRepo,
+    BuildSymbolIndex,
+    PlanIncrementalUpdate,
+    SummarizeFiles,
     IdentifyAbstractions,
     AnalyzeRelationships,
     OrderChapters,
     WriteChapters,
     CombineTutorial
 )
+from utils.checkpoint import save_checkpoint, remove_checkpoint
+
+
+class CheckpointFlow(Flow):
+    """
+    A flow that checkpoints the shared store to shared["run_dir"] after every node.
+
+    Completed nodes and the action each returned are recorded in shared["completed_nodes"];
+    when the flow runs on a shared store loaded from a checkpoint, those nodes are skipped
+    and the flow follows their recorded actions. The checkpoint is removed once the last
+    node has finished.
+    """
+
+    def _orch(self, shared, params=None):
+        run_dir = shared.get("run_dir")
+        if not run_dir:
+            return super()._orch(shared, params)
+        completed = shared.setdefault("completed_nodes", {})
+        curr, p, last_action = copy.copy(self.start_node), (params or {**self.params}), None
+        while curr:
+            name = type(curr).__name__
+            if name in completed:
+                print(f"Skipping {name}, completed before the checkpoint.")
+                last_action = completed[name]
+            else:
+                curr.set_params(p)
+                last_action = curr._run(shared)
+                completed[name] = last_action
+                save_checkpoint(run_dir, shared)
+            curr = copy.copy(self.get_next_node(curr, last_action))
+        remove_checkpoint(run_dir)
+        return last_action
+
 
 def create_tutorial_flow():
     """Creates and returns the codebase tutorial generation flow."""
 
     # Instantiate nodes
     fetch_repo = FetchRepo()
+    build_symbol_index = BuildSymbolIndex()
+    plan_incremental_update = PlanIncrementalUpdate()
+    summarize_files = SummarizeFiles()
     identify_abstractions = IdentifyAbstractions(max_retries=5, wait=20)
     analyze_relationships = AnalyzeRelationships(max_retries=5, wait=20)
     order_chapters = OrderChapters(max_retries=5, wait=20)
@@ -21,13 +61,18 @@ def create_tutorial_flow():
     combine_tutorial = CombineTutorial()
 
     # Connect nodes in sequence based on the design
-    fetch_repo >> identify_abstractions
+    fetch_repo >> build_symbol_index
+    build_symbol_index >> plan_incremental_update
+    plan_incremental_update >> summarize_files
+    # Incremental runs that keep the last tutorial's abstractions go straight to the chapters
+    plan_incremental_update - "reuse" >> write_chapters
+    summarize_files >> identify_abstractions
     identify_abstractions >> analyze_relationships
     analyze_relationships >> order_chapters
     order_chapters >> write_chapters
     write_chapters >> combine_tutorial
 
-    # Create the flow starting with FetchRepo
-    tutorial_flow = Flow(start=fetch_repo)
+    # Create the flow starting with FetchRepo; shared is checkpointed after each node
+    tutorial_flow = CheckpointFlow(start=fetch_repo)
 
     return tutorial_flow
@@ -3,6 +3,8 @@ import os
 import argparse
 # Import the function that creates the flow
 from flow import create_tutorial_flow
+from utils.progress import PROGRESS_MODES
+from utils.checkpoint import load_checkpoint
 
 dotenv.load_dotenv()
 
@@ -21,6 +23,20 @@ DEFAULT_EXCLUDE_PATTERNS = {
     "legacy/*", ".git/*", ".github/*", ".next/*", ".vscode/*", "obj/*", "bin/*", "node_modules/*", "*.log"
 }
 
+# Settings a resumed run must share with its checkpoint, since finished steps depend on them
+RESUME_SETTINGS = (
+    "repo_url", "local_dir", "local_ref", "output_dir", "include_patterns", "exclude_patterns",
+    "max_file_size", "language", "max_abstraction_num", "crawl_cache_dir", "outline_max_file_size",
+    "outline_patterns", "use_symbol_index", "incremental_threshold", "memo_dir", "use_file_summaries",
+    "file_summary_cache_dir", "context_token_budget", "chapter_token_budget", "chapter_order_strategy",
+    "near_duplicate_threshold",
+)
+# Options that only affect how the rest of a run is carried out, taken from the command line on resume
+RESUME_RUN_OPTIONS = (
+    "github_token", "use_cache", "use_graphql", "use_git_index", "stream_files", "reuse_crawl",
+    "progress_mode", "checkpoint_file_list",
+)
+
 # --- Main Function ---
 def main():
     parser = argparse.ArgumentParser(description="Generate a tutorial for a GitHub codebase or local directory.")
@@ -30,8 +46,9 @@ def main():
     source_group.add_argument("--repo", help="URL of the public GitHub repository.")
     source_group.add_argument("--dir", help="Path to local directory.")
 
+    parser.add_argument("--ref", help="Git branch, tag or commit to read from the object database when using --dir (optional, defaults to the working tree).")
     parser.add_argument("-n", "--name", help="Project name (optional, derived from repo/directory if omitted).")
-    parser.add_argument("-t", "--token", help="GitHub personal access token (optional, reads from GITHUB_TOKEN env var if not provided).")
+    parser.add_argument("-t", "--token", help="GitHub personal access token (optional, reads from GITHUB_TOKEN env var if not provided). Separate several tokens with commas to use them round-robin.")
     parser.add_argument("-o", "--output", default="output", help="Base directory for output (default: ./output).")
     parser.add_argument("-i", "--include", nargs="+", help="Include file patterns (e.g. '*.py' '*.js'). Defaults to common code files if not specified.")
     parser.add_argument("-e", "--exclude", nargs="+", help="Exclude file patterns (e.g. 'tests/*' 'docs/*'). Defaults to test/build directories if not specified.")
@@ -42,9 +59,48 @@ def main():
     parser.add_argument("--no-cache", action="store_true", help="Disable LLM response caching (default: caching enabled)")
     # Add max_abstraction_num parameter to control the number of abstractions
     parser.add_argument("--max-abstractions", type=int, default=10, help="Maximum number of abstractions to identify (default: 10)")
+    # Add crawl snapshot parameters so re-crawls only fetch what changed
+    parser.add_argument("--crawl-cache-dir", default="crawl_cache", help="Directory for crawl snapshots used by incremental re-crawls of GitHub repos and local directories (default: ./crawl_cache)")
+    parser.add_argument("--no-crawl-cache", action="store_true", help="Disable crawl snapshots and always fetch every file (default: snapshots enabled)")
+    # Add GraphQL flag to fetch GitHub files in batches instead of one request per file
+    parser.add_argument("--graphql", action="store_true", help="Fetch GitHub file contents in batches through the GraphQL API (requires a token)")
+    # Add flag to walk local directories instead of asking git for the file list
+    parser.add_argument("--no-git-index", action="store_true", help="Walk --dir even if it is a git repository instead of listing files with git ls-files (default: use git when available)")
+    # Add flag to crawl everything before preprocessing files
+    parser.add_argument("--no-stream", action="store_true", help="Finish the crawl before preprocessing files instead of preprocessing them as they arrive (default: streaming)")
+    # Add flag to reuse the files stored by the previous crawl
+    parser.add_argument("--reuse-crawl", action="store_true", help="Reuse the file store written by the previous crawl of the same source and patterns instead of crawling again (default: crawl)")
+    # Add outline mode for large and low-priority files
+    parser.add_argument("--outline-max-size", type=int, default=None, help="Include files larger than --max-size, up to this size in bytes, as structural outlines (signatures, docstrings, constants) instead of skipping them (default: skip)")
+    parser.add_argument("--outline", nargs="+", help="Patterns of low-priority files to include as structural outlines whatever their size (e.g. 'migrations' '*_pb2.py'), matched like exclude patterns")
+    # Add flag to skip the static symbol/import index
+    parser.add_argument("--no-symbol-index", action="store_true", help="Skip the static symbol and import-graph index; AnalyzeRelationships then reads full files and infers dependencies itself (default: index enabled)")
+    # Add incremental mode
+    parser.add_argument("--incremental", type=float, nargs="?", const=0.1, default=None, metavar="THRESHOLD", help="Update the existing tutorial in the output directory: keep its abstractions unless more than THRESHOLD of the files were added or removed (default when given: 0.1), and rewrite only the chapters whose files or context changed")
+    # Add flag to resume from the last checkpoint
+    parser.add_argument("--resume", action="store_true", help="Continue the last run for this project from its checkpoint (saved under the output directory after every node and chapter) instead of starting over")
+    # Add flag to checkpoint files kept in memory
+    parser.add_argument("--checkpoint-files", action="store_true", help="Also save checkpoints when the files are kept in memory (with --no-crawl-cache), writing all their contents after every node and chapter (default: checkpoints only reference the crawl cache's file store)")
+    # Add flag to disable node result memoization
+    parser.add_argument("--no-memo", action="store_true", help="Always run the LLM nodes instead of reusing their stored results when their inputs are unchanged (default: memoization enabled, stored under --crawl-cache-dir; --no-crawl-cache disables it too)")
+    # Add flag to summarize files for over-budget contexts
+    parser.add_argument("--file-summaries", action="store_true", help="Summarize files over a few hundred tokens with the LLM (cached by content hash under --crawl-cache-dir) and show the largest ones as summaries when a context exceeds --context-token-budget (default: disabled)")
+    # Add context token budget argument
+    parser.add_argument("--context-token-budget", type=int, default=400000, help="Approximate tokens of file content in the abstraction and relationship prompts before files are replaced by their summaries; only used with --file-summaries (default: 400000)")
+    # Add per-chapter token budget for file context
+    parser.add_argument("--chapter-token-budget", type=int, default=8000, help="Approximate tokens of code per chapter prompt; larger files are cut down to their most relevant functions and classes, 0 sends whole files (default: 8000)")
+    # Add chapter ordering strategy
+    parser.add_argument("--chapter-order", choices=["llm", "local", "refine"], default="llm", help="How to order chapters: llm asks the LLM, local computes the order from the relationship graph without an LLM call, refine asks the LLM to adjust the graph order (default: llm)")
+    # Add near-duplicate clustering to shrink the abstraction prompt
+    parser.add_argument("--near-duplicates", type=float, nargs="?", const=0.8, default=None, metavar="THRESHOLD", help="Show one file per cluster of near-duplicate files when identifying abstractions; THRESHOLD is the minimum estimated similarity (default when given: 0.8, disabled otherwise)")
+    # Add progress mode for crawl output
+    parser.add_argument("--progress", choices=PROGRESS_MODES, default="auto", help="Crawl progress output: auto (live line on a terminal, periodic lines otherwise), plain, quiet or json (default: auto)")
 
     args = parser.parse_args()
 
+    if args.ref and not args.dir:
+        parser.error("--ref can only be used with --dir (put the branch or commit in the --repo URL instead)")
+
     # Get GitHub token from argument or environment variable if using repo
     github_token = None
     if args.repo:
@@ -52,10 +108,14 @@ def main():
         if not github_token:
             print("Warning: No GitHub token provided. You might hit rate limits for public repositories.")
 
+    # Crawl snapshots, node memos and file summaries all live here (None disables them)
+    crawl_cache_dir = None if args.no_crawl_cache else args.crawl_cache_dir
+
     # Initialize the shared dictionary with inputs
     shared = {
         "repo_url": args.repo,
         "local_dir": args.dir,
+        "local_ref": args.ref, # Optional git ref to read instead of the working tree
         "project_name": args.name, # Can be None, FetchRepo will derive it
         "github_token": github_token,
         "output_dir": args.output, # Base directory for CombineTutorial output
@@ -74,18 +134,106 @@ def main():
         # Add max_abstraction_num parameter
         "max_abstraction_num": args.max_abstractions,
 
+        # Add crawl snapshot directory (None disables incremental crawling)
+        "crawl_cache_dir": crawl_cache_dir,
+
+        # Add GraphQL flag for batched GitHub fetching
+        "use_graphql": args.graphql,
+
+        # Add git index flag (list local files with git ls-files when --dir is a git repo)
+        "use_git_index": not args.no_git_index,
+
+        # Add streaming flag (preprocess files while the crawl is still running)
+        "stream_files": not args.no_stream,
+
+        # Add reuse flag (open the previous crawl's file store instead of crawling)
+        "reuse_crawl": args.reuse_crawl,
+
+        # Add outline settings (oversize and low-priority files become structural outlines)
+        "outline_max_file_size": args.outline_max_size,
+        "outline_patterns": set(args.outline) if args.outline else set(),
+
+        # Add symbol index flag (static import/call graph after FetchRepo)
+        "use_symbol_index": not args.no_symbol_index,
+
+        # Add incremental threshold (None regenerates the whole tutorial)
+        "incremental_threshold": args.incremental,
+
+        # Add node memo directory (validated node results by input digest, None disables)
+        "memo_dir": None if args.no_memo or not crawl_cache_dir else os.path.join(crawl_cache_dir, "node_memo"),
+
+        # Add file summary settings (summaries stand in for large files over the context budget)
+        "use_file_summaries": args.file_summaries,
+        "file_summary_cache_dir": crawl_cache_dir,
+        "context_token_budget": args.context_token_budget,
+
+        # Add per-chapter token budget for file context (0 or None sends whole files)
+        "chapter_token_budget": args.chapter_token_budget,
+
+        # Add chapter ordering strategy (llm, local or refine)
+        "chapter_order_strategy": args.chapter_order,
+
+        # Add near-duplicate similarity threshold (None disables clustering)
+        "near_duplicate_threshold": args.near_duplicates,
+
+        # Add progress mode for the crawlers
+        "progress_mode": args.progress,
+
         # Outputs will be populated by the nodes
         "files": [],
+        "file_meta": [],
+        "file_ids": None,
+        "crawl_changes": None,
+        "dedup_stats": None,
+        "symbol_index": None,
+        "file_summaries": None,
+        "near_duplicate_clusters": [],
         "abstractions": [],
         "relationships": {},
         "chapter_order": [],
         "chapters": [],
-        "final_output_dir": None
+        "chapter_digests": [],
+        "previous_chapters": {},
+        "final_output_dir": None,
+
+        # Checkpoint state, see CheckpointFlow
+        "run_dir": None,
+        "checkpoint_file_list": args.checkpoint_files, # Also checkpoint files kept in memory (a list, not a FileStore)
+        "completed_nodes": {},
+        "partial_chapters": [],
     }
 
-    # Display starting message with repository/directory and language
-    print(f"Starting tutorial generation for: {args.repo or args.dir} in {args.language.capitalize()} language")
-    print(f"LLM caching: {'Disabled' if args.no_cache else 'Enabled'}")
+    # Checkpoints go to one directory per project, so --resume finds the last run
+    run_name = args.name or (
+        args.repo.split("/")[-1].replace(".git", "") if args.repo else os.path.basename(os.path.abspath(args.dir))
+    )
+    shared["run_dir"] = os.path.join(args.output, ".checkpoints", run_name)
+    if args.resume:
+        checkpoint = load_checkpoint(shared["run_dir"])
+        if checkpoint:
+            differences = [
+                f"  {key}: {checkpoint.get(key)!r} in the checkpoint, {shared[key]!r} now"
+                for key in RESUME_SETTINGS
+                if checkpoint.get(key) != shared[key]
+            ]
+            if args.name and checkpoint.get("project_name") != args.name:
+                differences.append(f"  project_name: {checkpoint.get('project_name')!r} in the checkpoint, {args.name!r} now")
+            if differences:
+                parser.error(
+                    f"the checkpoint in {shared['run_dir']} was saved with other settings:\n" + "\n".join(differences)
+                    + "\nRun with the same settings to resume, or without --resume to start over."
+                )
+            print(f"Resuming from checkpoint in {shared['run_dir']} after: {', '.join(checkpoint['completed_nodes']) or 'nothing'}")
+            # The token is not saved in checkpoints; these options come from the command line again
+            for key in RESUME_RUN_OPTIONS:
+                checkpoint[key] = shared[key]
+            shared = checkpoint
+        else:
+            print(f"No usable checkpoint in {shared['run_dir']}, starting from the beginning.")
+
+    # Display starting message with repository/directory and language (as used, also when resuming)
+    print(f"Starting tutorial generation for: {shared['repo_url'] or shared['local_dir']} in {shared['language'].capitalize()} language")
+    print(f"LLM caching: {'Enabled' if shared['use_cache'] else 'Disabled'}")
 
     # Create the flow instance
     tutorial_flow = create_tutorial_flow()
@@ -1,25 +1,180 @@
+import hashlib
 import os
 import re
-import yaml
 from pocketflow import Node, BatchNode
-from utils.crawl_github_files import crawl_github_files
+from utils.crawl_github_files import crawl_github_files, iter_github_files
 from utils.call_llm import call_llm
-from utils.crawl_local_files import crawl_local_files
+from utils.crawl_local_files import crawl_local_files, iter_local_files
+from utils.file_stream import process_file_stream
+from utils.file_store import FileStore
+from utils.dedup import dedupe_files
+from utils.file_ids import assign_file_ids, parse_file_ref
+from utils.file_summaries import (
+    MIN_SUMMARY_TOKENS,
+    files_to_summarize,
+    format_summary,
+    load_summary_cache,
+    save_summary_cache,
+    summary_key,
+)
+from utils.checkpoint import save_checkpoint
+from utils.manifest import load_manifest, plan_incremental_update, save_manifest
+from utils.memo import input_digest, load_memo, save_memo
+from utils.near_duplicates import cluster_near_duplicates
+from utils.outline import outline_file
+from utils.path_filter import get_path_filter
+from utils.symbol_index import build_symbol_index, abstraction_dependencies, extract_symbols
+from utils.chapter_order import order_abstractions
+from utils.snippets import fit_files_to_budget, keywords_for
+from utils.structured_output import (
+    Abstraction,
+    Relationship,
+    Relationships,
+    ABSTRACTIONS_SCHEMA,
+    RELATIONSHIPS_SCHEMA,
+    CHAPTER_ORDER_SCHEMA,
+    FILE_SUMMARIES_SCHEMA,
+    parse_structured,
+)
+from utils.tokens import approx_token_count
+
+
+# Helper to get the stable file ids (see assign_file_ids), computed from the paths if missing
+def get_file_ids(shared):
+    if shared.get("file_ids") is None:
+        files = shared["files"]
+        paths = files.paths if isinstance(files, FileStore) else [path for path, _ in files]
+        shared["file_ids"] = assign_file_ids(paths)
+    return shared["file_ids"]
+
+
+# Helper to get a file's token count, from the preprocessors when available
+def get_file_tokens(files_data, file_meta, i):
+    tokens = file_meta[i].get("tokens") if file_meta else None
+    return tokens if tokens is not None else approx_token_count(files_data[i][1])
+
+
+# Helper to choose the files shown as summaries (see SummarizeFiles) so a context fits its budget
+def get_summarized_files(shared, files_data, indices):
+    summaries = shared.get("file_summaries")
+    if not summaries:
+        return set()
+    file_meta = shared.get("file_meta")
+    token_counts = {i: get_file_tokens(files_data, file_meta, i) for i in indices}
+    return files_to_summarize(token_counts, summaries, shared.get("context_token_budget"))
+
+
+# Helper to get the content hashes of files, from dedupe_files when available
+def get_content_hashes(files_data, file_meta, indices):
+    hashes = []
+    for i in indices:
+        digest = file_meta[i].get("sha1") if file_meta else None
+        if digest is None:
+            digest = hashlib.sha1(files_data[i][1].encode("utf-8")).hexdigest()
+        hashes.append(digest)
+    return hashes
+
+
+# Helper to get the settings a tutorial's abstractions and chapter order depend on
+def tutorial_settings(shared):
+    return {
+        "project_name": shared["project_name"],
+        "language": shared.get("language", "english"),
+        "max_abstraction_num": shared.get("max_abstraction_num", 10),
+        "near_duplicate_threshold": shared.get("near_duplicate_threshold"),
+        "chapter_order_strategy": shared.get("chapter_order_strategy", "llm"),
+    }
 
 
 # Helper to get content for specific file indices
-def get_content_for_indices(files_data, indices):
+def get_content_for_indices(files_data, indices, file_meta=None, transform=None, file_ids=None):
     content_map = {}
+    first_keys = {}  # Index of the first copy -> key of the copy already in the map
     for i in indices:
         if 0 <= i < len(files_data):
             path, content = files_data[i]
-            content_map[f"{i} # {path}"] = (
-                content  # Use index + path as key for context
-            )
+            # Use id (or index) + path as key for context
+            key = f"{file_ids[i] if file_ids else i} # {path}"
+            # Identical files (see dedupe_files) are included once and aliased after that
+            original = file_meta[i].get("duplicate_of") if file_meta else None
+            original = i if original is None else original
+            if original in first_keys:
+                content_map[key] = f"(identical to File {first_keys[original]}, content omitted)"
+            else:
+                first_keys[original] = key
+                # Optional transform(index, path, content), e.g. to outline the file
+                content_map[key] = transform(i, path, content) if transform else content
     return content_map
 
 
+# Helper to fix an answer that failed validation with a short follow-up prompt: only the
+# invalid output, the validation errors and the allowed values, not the whole context again
+def repair_response(response, error, allowed_values, parse, use_cache=True, response_schema=None):
+    print("Output failed validation, asking the LLM to repair it...")
+    prompt = f"""
+Your previous output failed validation:
+
+{response.strip()}
+
+Validation errors:
+{error}
+
+{allowed_values}
+
+Fix only what the errors require and keep everything else unchanged. Return the complete corrected output in the same format."""
+    try:
+        return parse(call_llm(prompt, use_cache=use_cache, response_schema=response_schema))
+    except Exception as repair_error:
+        print(f"Repair failed ({repair_error}).")
+        raise error
+
+
+class MemoizedNode(Node):
+    """
+    A node whose shared-store outputs are stored under a digest of its semantic inputs.
+
+    Subclasses name the keys their post writes in memo_outputs and return the values
+    their result depends on from memo_inputs. When the same inputs come again, prep,
+    exec and post are skipped and the stored outputs are written back to the shared store.
+    """
+
+    memo_outputs = ()
+
+    def memo_inputs(self, shared):
+        return None  # No memoization
+
+    def _run(self, shared):
+        memo_dir = shared.get("memo_dir")
+        # Like the LLM cache, --no-cache asks for fresh results
+        inputs = self.memo_inputs(shared) if memo_dir and shared.get("use_cache", True) else None
+        if inputs is None:
+            return super()._run(shared)
+        name = type(self).__name__
+        # The exec function is part of the key, so patched prompts (component_architecture.py) get their own entries
+        digest = input_digest(name, type(self).exec.__qualname__, inputs)
+        outputs = load_memo(memo_dir, name, digest)
+        if outputs is not None:
+            print(f"{name}: inputs unchanged, reusing the memoized result.")
+            shared.update(outputs)
+            return None
+        self.memoize = True  # exec_fallback clears it, a fallback result is not kept
+        action = super()._run(shared)
+        if self.memoize:
+            save_memo(memo_dir, name, digest, {key: shared[key] for key in self.memo_outputs})
+        return action
+
+
 class FetchRepo(Node):
+    # Per-file preprocessing run while the crawl is still fetching:
+    # {name: function(path, content, meta)}, each result lands in shared["file_meta"][i][name]
+    preprocessors = {
+        "tokens": lambda path, content, meta: approx_token_count(content),
+    }
+    # Run as well when the symbol index is on, so BuildSymbolIndex only links the files
+    symbol_preprocessors = {
+        "symbols": lambda path, content, meta: extract_symbols(path, content),
+    }
+
     def prep(self, shared):
         repo_url = shared.get("repo_url")
         local_dir = shared.get("local_dir")
@@ -46,84 +201,447 @@ class FetchRepo(Node):
             "exclude_patterns": exclude_patterns,
             "max_file_size": max_file_size,
             "use_relative_paths": True,
+            "crawl_cache_dir": shared.get("crawl_cache_dir"),
+            "use_graphql": shared.get("use_graphql", False),
+            "local_ref": shared.get("local_ref"),
+            "progress_mode": shared.get("progress_mode", "auto"),
+            "use_git_index": shared.get("use_git_index", True),
+            "stream_files": shared.get("stream_files", True),
+            "project_name": project_name,
+            "reuse_crawl": shared.get("reuse_crawl", False),
+            "outline_max_file_size": shared.get("outline_max_file_size"),
+            "outline_patterns": shared.get("outline_patterns") or set(),
+            "use_symbol_index": shared.get("use_symbol_index", True),
         }
 
+    def outline_stream(self, stream, max_file_size, outline_patterns):
+        """Replace files over max_file_size or matching outline_patterns by their structural outline"""
+        # Exclude semantics: a pattern matches the file name or the name of any parent directory
+        outline_filter = get_path_filter(None, outline_patterns) if outline_patterns else None
+        for path, content, meta in stream:
+            size = meta.get("size") or len(content.encode("utf-8"))
+            oversize = size > max_file_size
+            if oversize or (outline_filter and outline_filter.is_excluded(path)):
+                outline = outline_file(path, content)
+                if outline is None:
+                    if oversize:
+                        continue  # No outline for this language: skipped as before
+                else:
+                    content = (
+                        f"(Structural outline of a {size}-byte file: signatures, docstrings and constants only, bodies omitted)\n"
+                        f"{outline}\n"
+                    )
+                    meta = dict(meta, outline=True)
+            yield path, content, meta
+
     def exec(self, prep_res):
+        # The files are kept in a FileStore under the crawl cache, reusable by later runs
+        store_dir = None
+        source = {
+            "repo_url": prep_res["repo_url"],
+            "local_dir": os.path.abspath(prep_res["local_dir"]) if prep_res["local_dir"] else None,
+            "local_ref": prep_res["local_ref"],
+            "include_patterns": sorted(prep_res["include_patterns"] or []),
+            "exclude_patterns": sorted(prep_res["exclude_patterns"] or []),
+            "max_file_size": prep_res["max_file_size"],
+            "outline_max_file_size": prep_res["outline_max_file_size"],
+            "outline_patterns": sorted(prep_res["outline_patterns"]),
+        }
+        # Files up to outline_max_file_size are fetched and outlined instead of skipped
+        crawl_max_file_size = max(prep_res["max_file_size"], prep_res["outline_max_file_size"] or 0)
+        if prep_res["crawl_cache_dir"]:
+            store_dir = os.path.join(prep_res["crawl_cache_dir"], "file_store", prep_res["project_name"])
+            if prep_res["reuse_crawl"] and FileStore.exists(store_dir):
+                store = FileStore(store_dir)
+                if store.source == source:
+                    print(f"Reusing {len(store)} crawled files from {store_dir}.")
+                    return store, store.meta, None, None
+                print(f"Crawled files in {store_dir} are from a different source or patterns, crawling again.")
+
+        stats = {}
         if prep_res["repo_url"]:
             print(f"Crawling repository: {prep_res['repo_url']}...")
-            result = crawl_github_files(
-                repo_url=prep_res["repo_url"],
+            crawl_args = dict(
                 token=prep_res["token"],
                 include_patterns=prep_res["include_patterns"],
                 exclude_patterns=prep_res["exclude_patterns"],
-                max_file_size=prep_res["max_file_size"],
+                max_file_size=crawl_max_file_size,
                 use_relative_paths=prep_res["use_relative_paths"],
+                snapshot_dir=prep_res["crawl_cache_dir"],
+                use_graphql=prep_res["use_graphql"],
+                progress_mode=prep_res["progress_mode"],
             )
+            if prep_res["stream_files"]:
+                stream = iter_github_files(prep_res["repo_url"], stats=stats, **crawl_args)
+            else:
+                result = crawl_github_files(prep_res["repo_url"], **crawl_args) or {}
         else:
-            print(f"Crawling directory: {prep_res['local_dir']}...")
+            if prep_res["local_ref"]:
+                print(f"Crawling directory: {prep_res['local_dir']} at {prep_res['local_ref']}...")
+            else:
+                print(f"Crawling directory: {prep_res['local_dir']}...")
 
-            result = crawl_local_files(
-                directory=prep_res["local_dir"],
+            crawl_args = dict(
                 include_patterns=prep_res["include_patterns"],
                 exclude_patterns=prep_res["exclude_patterns"],
-                max_file_size=prep_res["max_file_size"],
-                use_relative_paths=prep_res["use_relative_paths"]
+                max_file_size=crawl_max_file_size,
+                use_relative_paths=prep_res["use_relative_paths"],
+                ref=prep_res["local_ref"],
+                progress_mode=prep_res["progress_mode"],
+                use_git_index=prep_res["use_git_index"],
+                snapshot_dir=prep_res["crawl_cache_dir"],
             )
-
-        # Convert dict to list of tuples: [(path, content), ...]
-        files_list = list(result.get("files", {}).items())
-        if len(files_list) == 0:
+            if prep_res["stream_files"]:
+                stream = iter_local_files(prep_res["local_dir"], stats=stats, **crawl_args)
+            else:
+                result = crawl_local_files(prep_res["local_dir"], **crawl_args)
+
+        if not prep_res["stream_files"]:
+            # Preprocess only once the whole crawl has finished
+            stats = result.get("stats", {})
+            stream = ((path, content, {}) for path, content in result.get("files", {}).items())
+
+        if prep_res["outline_max_file_size"] or prep_res["outline_patterns"]:
+            stream = self.outline_stream(stream, prep_res["max_file_size"], prep_res["outline_patterns"])
+
+        # Preprocessing overlaps with fetching when streaming: [(path, content, meta), ...]
+        preprocessors = dict(self.preprocessors)
+        if prep_res["use_symbol_index"]:
+            preprocessors.update(self.symbol_preprocessors)
+        fetched = process_file_stream(stream, preprocessors)
+        if len(fetched) == 0:
             raise (ValueError("Failed to fetch files"))
-        print(f"Fetched {len(files_list)} files.")
-        return files_list
+        total_tokens = sum(meta.get("tokens") or 0 for _, _, meta in fetched)
+        print(f"Fetched {len(fetched)} files (~{total_tokens} tokens).")
+        outlined = sum(1 for _, _, meta in fetched if meta.get("outline"))
+        if outlined:
+            print(f"Included {outlined} large or low-priority files as structural outlines.")
+        # Added/modified/removed paths when the crawl was incremental, None for a full crawl
+        changes = stats.get("changes")
+
+        # Keep one copy of identical contents, duplicates record the index of the first copy
+        fetched, duplicate_of, dedup_stats = dedupe_files(fetched)
+        for (_, _, meta), original in zip(fetched, duplicate_of):
+            meta["duplicate_of"] = original
+        if dedup_stats["duplicate_files"]:
+            print(
+                f"Found {dedup_stats['duplicate_files']} files identical to another file, "
+                f"{dedup_stats['bytes_saved']} bytes (~{dedup_stats['tokens_saved']} tokens) not repeated."
+            )
+
+        file_meta = [meta for _, _, meta in fetched]
+        if store_dir:
+            # Contents move to the memory-mapped store, the strings are released after exec
+            files = FileStore.create(store_dir, ((path, content) for path, content, _ in fetched), file_meta, source)
+        else:
+            files = [(path, content) for path, content, _ in fetched]
+        return files, file_meta, changes, dedup_stats
+
+    def post(self, shared, prep_res, exec_res):
+        files, file_meta, changes, dedup_stats = exec_res
+        shared["files"] = files  # FileStore (or list) of (path, content) tuples
+        shared["file_meta"] = file_meta  # Per-file metadata, aligned with shared["files"]
+        shared["crawl_changes"] = changes
+        shared["dedup_stats"] = dedup_stats
+        shared["file_ids"] = None
+        get_file_ids(shared)  # Stable ids used for the files in prompts, aligned with shared["files"]
+
+
+class BuildSymbolIndex(Node):
+    def prep(self, shared):
+        if not shared.get("use_symbol_index", True):
+            return None
+        # Symbols extracted while fetching; None for files without (e.g. from a store crawled with the index off)
+        file_meta = shared.get("file_meta") or [{} for _ in shared["files"]]
+        return shared["files"], [meta.get("symbols") for meta in file_meta]
+
+    def exec(self, prep_res):
+        if prep_res is None:
+            return None
+        files_data, entries = prep_res
+        print("Building symbol index...")
+        symbol_index = build_symbol_index(files_data, entries=entries)
+        print(
+            f"Indexed {len(symbol_index['definitions'])} top-level definitions and "
+            f"{len(symbol_index['edges'])} import/call dependencies between files."
+        )
+        return symbol_index
+
+    def post(self, shared, prep_res, exec_res):
+        shared["symbol_index"] = exec_res  # None when disabled
+
+
+class PlanIncrementalUpdate(Node):
+    def prep(self, shared):
+        threshold = shared.get("incremental_threshold")  # None: regenerate everything
+        if threshold is None:
+            return None
+        files_data = shared["files"]
+        return (
+            os.path.join(shared.get("output_dir", "output"), shared["project_name"]),
+            dict(zip(
+                get_file_ids(shared),
+                get_content_hashes(files_data, shared.get("file_meta"), range(len(files_data))),
+            )),
+            tutorial_settings(shared),
+            threshold,
+        )
+
+    def exec(self, prep_res):
+        if prep_res is None:
+            return None, None
+        output_path, files, settings, threshold = prep_res
+        manifest = load_manifest(output_path)
+        if manifest is None:
+            print(f"No manifest from an earlier tutorial in {output_path}, generating everything.")
+            return None, None
+        plan = plan_incremental_update(manifest, files, settings, threshold)
+        print(
+            f"Compared with the last tutorial: {plan['added']} files added, {plan['removed']} removed, "
+            f"{plan['modified']} modified; "
+            + ("keeping its abstractions" if plan["reuse"] else f"identifying abstractions again ({plan['reason']})")
+            + "."
+        )
+        return manifest, plan
 
     def post(self, shared, prep_res, exec_res):
-        shared["files"] = exec_res  # List of (path, content) tuples
+        manifest, plan = exec_res
+        if manifest is None:
+            return None
+        # WriteChapters keeps every chapter whose inputs are unchanged, whatever the plan
+        shared["previous_chapters"] = {
+            chapter["inputs_digest"]: chapter["content"] for chapter in manifest["chapters"]
+        }
+        if not plan["reuse"]:
+            return None
+        index_of_id = {file_id: i for i, file_id in enumerate(get_file_ids(shared))}
+        shared["abstractions"] = [
+            dict(abstraction, files=sorted(index_of_id[file_id] for file_id in abstraction["files"]))
+            for abstraction in manifest["abstractions"]
+        ]
+        shared["relationships"] = manifest["relationships"]
+        shared["chapter_order"] = manifest["chapter_order"]
+        return "reuse"  # Straight to WriteChapters
+
+
+class SummarizeFiles(Node):
+    # Approximate tokens of file content per summary prompt; larger files are outlined or cut
+    batch_tokens = 30000
+
+    def prep(self, shared):
+        if not shared.get("use_file_summaries", False):
+            return None
+        return (
+            shared["files"],
+            shared.get("file_meta"),
+            get_file_ids(shared),
+            shared.get("file_summary_cache_dir"),
+            shared.get("use_cache", True),
+        )
+
+    def summarize_batch(self, batch, use_cache):
+        """Ask the LLM for {file id: summary} of a batch of (file id, path, content) tuples"""
+        context = "\n\n".join(f"--- File {file_id}: {path} ---\n{content}" for file_id, path, content in batch)
+        prompt = f"""
+Summarize each of the following source files for a developer who has not read it.
+
+{context}
+
+For each file, provide:
+1. The file's `id`.
+2. Its `purpose` in one or two sentences.
+3. Its key `symbols` (the most important classes, functions and constants, at most 8).
+4. Its `dependencies` (the modules and files it relies on, at most 8).
+
+Format the output as a YAML list of dictionaries:
+
+```yaml
+- id: f3a91c0
+  purpose: |
+    Loads the configuration and creates the database connection pool.
+  symbols:
+    - Config
+    - create_pool
+  dependencies:
+    - sqlalchemy
+    - settings.py
+```"""
+        response = call_llm(prompt, use_cache=use_cache, response_schema=FILE_SUMMARIES_SCHEMA)
+        items = parse_structured(response, list)
+
+        summaries = {}
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get("purpose"), str):
+                continue  # Summaries are optional: a malformed entry leaves the file unsummarized
+            summaries[str(item.get("id", "")).split("#")[0].strip()] = {
+                "purpose": item["purpose"].strip(),
+                "symbols": [str(s) for s in item.get("symbols") or []],
+                "dependencies": [str(d) for d in item.get("dependencies") or []],
+            }
+        return summaries
+
+    def exec(self, prep_res):
+        if prep_res is None:
+            return None
+        files_data, file_meta, file_ids, cache_dir, use_cache = prep_res
+        cache = load_summary_cache(cache_dir)
+
+        keys = [None] * len(files_data)
+        missing = {}  # key -> (file id, path, content) of the first file with that content
+        for i, (path, content) in enumerate(files_data):
+            if get_file_tokens(files_data, file_meta, i) < MIN_SUMMARY_TOKENS:
+                continue
+            keys[i] = summary_key(content)
+            if keys[i] not in cache and keys[i] not in missing:
+                missing[keys[i]] = (file_ids[i], path, content)
+
+        summarized = sum(1 for key in keys if key)
+        print(f"Summarizing files: {summarized - len(missing)} summaries cached, {len(missing)} to generate...")
+
+        batches, batch, batch_size = [], [], 0
+        for key, (file_id, path, content) in missing.items():
+            tokens = approx_token_count(content)
+            if tokens > self.batch_tokens:
+                content = outline_file(path, content) or content[: self.batch_tokens * 3]
+                tokens = approx_token_count(content)
+            if batch and batch_size + tokens > self.batch_tokens:
+                batches.append(batch)
+                batch, batch_size = [], 0
+            batch.append((key, file_id, path, content))
+            batch_size += tokens
+        if batch:
+            batches.append(batch)
+
+        for number, batch in enumerate(batches, 1):
+            try:
+                summaries = self.summarize_batch([entry[1:] for entry in batch], use_cache)
+            except Exception as e:
+                # Summaries only stand in for full text, the run continues without them
+                print(f"Warning: Could not summarize batch {number}/{len(batches)}: {e}")
+                continue
+            for key, file_id, _, _ in batch:
+                if file_id in summaries:
+                    cache[key] = summaries[file_id]
+            save_summary_cache(cache_dir, cache)  # Keep finished batches if the run stops
+
+        return [cache.get(key) if key else None for key in keys]
+
+    def post(self, shared, prep_res, exec_res):
+        shared["file_summaries"] = exec_res  # Summary dict or None per file, None when disabled
+
 
+class IdentifyAbstractions(MemoizedNode):
+    memo_outputs = ("abstractions", "near_duplicate_clusters")
+
+    def memo_inputs(self, shared):
+        files_data = shared["files"]
+        file_summaries = shared.get("file_summaries")
+        return {
+            "project_name": shared["project_name"],
+            "language": shared.get("language", "english"),
+            "max_abstraction_num": shared.get("max_abstraction_num", 10),
+            "near_duplicate_threshold": shared.get("near_duplicate_threshold"),
+            "files": list(zip(
+                get_file_ids(shared),
+                get_content_hashes(files_data, shared.get("file_meta"), range(len(files_data))),
+            )),
+            "file_summaries": file_summaries,
+            "context_token_budget": shared.get("context_token_budget") if file_summaries else None,
+        }
 
-class IdentifyAbstractions(Node):
     def prep(self, shared):
         files_data = shared["files"]
+        file_meta = shared.get("file_meta")
         project_name = shared["project_name"]  # Get project name
         language = shared.get("language", "english")  # Get language
         use_cache = shared.get("use_cache", True)  # Get use_cache flag, default to True
         max_abstraction_num = shared.get("max_abstraction_num", 10)  # Get max_abstraction_num, default to 10
+        near_duplicate_threshold = shared.get("near_duplicate_threshold")  # None disables clustering
+        # Prompts name files by stable ids, so adding or removing a file leaves the others unchanged
+        file_ids = get_file_ids(shared)
+
+        # Near-duplicate clusters: the first file stands in for the others in the prompt
+        clusters = []
+        if near_duplicate_threshold:
+            clusters = cluster_near_duplicates(
+                [content for _, content in files_data], near_duplicate_threshold
+            )
+            hidden = sum(len(members) - 1 for members in clusters)
+            print(f"Found {len(clusters)} clusters of near-duplicate files, {hidden} files represented by their cluster's first file.")
+        siblings = {members[0]: members[1:] for members in clusters}
+        represented = {i for members in clusters for i in members[1:]}
+
+        # Over the context budget, the largest files with a summary are shown as their summary
+        summaries = shared.get("file_summaries")
+        summarized = get_summarized_files(
+            shared,
+            files_data,
+            [
+                i for i in range(len(files_data))
+                if i not in represented and (not file_meta or file_meta[i].get("duplicate_of") is None)
+            ],
+        )
+        if summarized:
+            print(f"Showing {len(summarized)} large files as summaries to fit the context budget.")
 
         # Helper to create context from files, respecting limits (basic example)
         def create_llm_context(files_data):
             context = ""
-            file_info = []  # Store tuples of (index, path)
+            file_info = []  # Store tuples of (id, path)
             for i, (path, content) in enumerate(files_data):
-                entry = f"--- File Index {i}: {path} ---\n{content}\n\n"
+                file_info.append((file_ids[i], path))
+                if i in represented:
+                    continue  # Listed under its cluster's representative
+                if i in summarized:
+                    content = f"(Summary, full text omitted)\n{format_summary(summaries[i])}"
+                original = file_meta[i].get("duplicate_of") if file_meta else None
+                if i in siblings:
+                    entry = f"--- File {file_ids[i]}: {path} --- (also stands for {describe_siblings(siblings[i])})\n{content}\n\n"
+                elif original is not None:
+                    # Identical to an earlier file: reference it instead of repeating the text
+                    entry = f"--- File {file_ids[i]}: {path} --- (identical to File {file_ids[original]}: {file_info[original][1]}, content omitted)\n\n"
+                else:
+                    entry = f"--- File {file_ids[i]}: {path} ---\n{content}\n\n"
                 context += entry
-                file_info.append((i, path))
 
-            return context, file_info  # file_info is list of (index, path)
+            return context, file_info  # file_info is list of (id, path)
+
+        # Compact sibling list, capped so huge clusters (e.g. migrations) stay short
+        def describe_siblings(members, limit=20):
+            listed = ", ".join(f"{file_ids[j]} # {files_data[j][0]}" for j in members[:limit])
+            more = f" and {len(members) - limit} more" if len(members) > limit else ""
+            return f"{len(members)} similar files: {listed}{more}"
 
         context, file_info = create_llm_context(files_data)
         # Format file info for the prompt (comment is just a hint for LLM)
         file_listing_for_prompt = "\n".join(
-            [f"- {idx} # {path}" for idx, path in file_info]
+            [
+                f"- {file_id} # {path}" + (f" (+{len(siblings[i])} similar files)" if i in siblings else "")
+                for i, (file_id, path) in enumerate(file_info)
+                if i not in represented
+            ]
         )
         return (
             context,
             file_listing_for_prompt,
-            len(files_data),
+            file_ids,
             project_name,
             language,
             use_cache,
             max_abstraction_num,
+            clusters,
         )  # Return all parameters
 
     def exec(self, prep_res):
         (
             context,
             file_listing_for_prompt,
-            file_count,
+            file_ids,
             project_name,
             language,
             use_cache,
             max_abstraction_num,
+            _,
         ) = prep_res  # Unpack all parameters
         print(f"Identifying abstractions using LLM...")
 
@@ -149,9 +667,9 @@ Identify the top 5-{max_abstraction_num} core most important abstractions to hel
 For each abstraction, provide:
 1. A concise `name`{name_lang_hint}.
 2. A beginner-friendly `description` explaining what it is with a simple analogy, in around 100 words{desc_lang_hint}.
-3. A list of relevant `file_indices` (integers) using the format `idx # path/comment`.
+3. A list of relevant `file_ids` using the format `id # path/comment`.
 
-List of file indices and paths present in the context:
+List of file ids and paths present in the context:
 {file_listing_for_prompt}
 
 Format the output as a YAML list of dictionaries:
@@ -162,87 +680,130 @@ Format the output as a YAML list of dictionaries:
   description: |
     Explains what the abstraction does.
     It's like a central dispatcher routing requests.{desc_lang_hint}
-  file_indices:
-    - 0 # path/to/file1.py
-    - 3 # path/to/related.py
+  file_ids:
+    - f3a91c0 # path/to/file1.py
+    - f07be5d # path/to/related.py
 - name: |
     Query Optimization{name_lang_hint}
   description: |
     Another core concept, similar to a blueprint for objects.{desc_lang_hint}
-  file_indices:
-    - 5 # path/to/another.js
+  file_ids:
+    - fc4d218 # path/to/another.js
 # ... up to {max_abstraction_num} abstractions
 ```"""
-        response = call_llm(prompt, use_cache=(use_cache and self.cur_retry == 0))  # Use cache only if enabled and not retrying
+        response = call_llm(
+            prompt,
+            use_cache=(use_cache and self.cur_retry == 0),  # Use cache only if enabled and not retrying
+            response_schema=ABSTRACTIONS_SCHEMA,
+        )
 
         # --- Validation ---
-        yaml_str = response.strip().split("```yaml")[1].split("```")[0].strip()
-        abstractions = yaml.safe_load(yaml_str)
+        try:
+            validated_abstractions = self.parse_response(response, file_ids)
+        except ValueError as e:
+            validated_abstractions = repair_response(
+                response,
+                e,
+                f"Valid file ids:\n{file_listing_for_prompt}",
+                lambda repaired: self.parse_response(repaired, file_ids),
+                use_cache=(use_cache and self.cur_retry == 0),
+                response_schema=ABSTRACTIONS_SCHEMA,
+            )
 
-        if not isinstance(abstractions, list):
-            raise ValueError("LLM Output is not a list")
+        print(f"Identified {len(validated_abstractions)} abstractions.")
+        return validated_abstractions
 
+    def parse_response(self, response, file_ids):
+        """Validated list of Abstraction from an LLM response; the ValueError lists every problem found"""
+        abstractions = parse_structured(response, list)
+
+        index_of_id = {file_id: i for i, file_id in enumerate(file_ids)}
         validated_abstractions = []
+        errors = []  # Collected so a repair prompt can fix them all at once
         for item in abstractions:
             if not isinstance(item, dict) or not all(
-                k in item for k in ["name", "description", "file_indices"]
+                k in item for k in ["name", "description", "file_ids"]
             ):
-                raise ValueError(f"Missing keys in abstraction item: {item}")
+                errors.append(f"Missing keys (expected name, description, file_ids) in abstraction item: {item}")
+                continue
             if not isinstance(item["name"], str):
-                raise ValueError(f"Name is not a string in item: {item}")
+                errors.append(f"Name is not a string in item: {item}")
+                continue
             if not isinstance(item["description"], str):
-                raise ValueError(f"Description is not a string in item: {item}")
-            if not isinstance(item["file_indices"], list):
-                raise ValueError(f"file_indices is not a list in item: {item}")
+                errors.append(f"Description is not a string in item {item['name']}")
+                continue
+            if not isinstance(item["file_ids"], list):
+                errors.append(f"file_ids is not a list in item {item['name']}")
+                continue
 
-            # Validate indices
+            # Map ids back to indices
             validated_indices = []
-            for idx_entry in item["file_indices"]:
+            for id_entry in item["file_ids"]:
                 try:
-                    if isinstance(idx_entry, int):
-                        idx = idx_entry
-                    elif isinstance(idx_entry, str) and "#" in idx_entry:
-                        idx = int(idx_entry.split("#")[0].strip())
-                    else:
-                        idx = int(str(idx_entry).strip())
-
-                    if not (0 <= idx < file_count):
-                        raise ValueError(
-                            f"Invalid file index {idx} found in item {item['name']}. Max index is {file_count - 1}."
-                        )
-                    validated_indices.append(idx)
+                    validated_indices.append(parse_file_ref(id_entry, index_of_id, len(file_ids)))
                 except (ValueError, TypeError):
-                    raise ValueError(
-                        f"Could not parse index from entry: {idx_entry} in item {item['name']}"
-                    )
+                    errors.append(f"Unknown file id in entry: {id_entry} in item {item['name']}")
 
-            item["files"] = sorted(list(set(validated_indices)))
             # Store only the required fields
             validated_abstractions.append(
-                {
-                    "name": item["name"],  # Potentially translated name
-                    "description": item[
-                        "description"
-                    ],  # Potentially translated description
-                    "files": item["files"],
-                }
+                Abstraction(
+                    name=item["name"],  # Potentially translated name
+                    description=item["description"],  # Potentially translated description
+                    files=sorted(set(validated_indices)),
+                )
             )
 
-        print(f"Identified {len(validated_abstractions)} abstractions.")
+        if errors:
+            raise ValueError("\n".join(f"- {error}" for error in errors))
         return validated_abstractions
 
     def post(self, shared, prep_res, exec_res):
+        # A file standing in for a near-duplicate cluster brings in every member
+        clusters = prep_res[-1]
+        cluster_of = {i: members for members in clusters for i in members}
+        for abstraction in exec_res:
+            files = set(abstraction["files"])
+            for i in abstraction["files"]:
+                files.update(cluster_of.get(i, ()))
+            abstraction["files"] = sorted(files)
         shared["abstractions"] = (
             exec_res  # List of {"name": str, "description": str, "files": [int]}
         )
+        shared["near_duplicate_clusters"] = clusters
+
 
+class AnalyzeRelationships(MemoizedNode):
+    memo_outputs = ("relationships",)
+
+    def memo_inputs(self, shared):
+        abstractions = shared["abstractions"]
+        files_data = shared["files"]
+        file_ids = get_file_ids(shared)
+        symbol_index = shared.get("symbol_index")
+        file_summaries = shared.get("file_summaries")
+        relevant = sorted({i for abstraction in abstractions for i in abstraction["files"]})
+        return {
+            "project_name": shared["project_name"],
+            "language": shared.get("language", "english"),
+            "abstractions": abstractions,
+            "files": list(zip(
+                [file_ids[i] for i in relevant],
+                get_content_hashes(files_data, shared.get("file_meta"), relevant),
+            )),
+            "dependencies": abstraction_dependencies(symbol_index, abstractions) if symbol_index else None,
+            # Summaries only stand in for full files, i.e. without a symbol index
+            "file_summaries": [file_summaries[i] for i in relevant] if file_summaries and not symbol_index else None,
+            "context_token_budget": shared.get("context_token_budget") if file_summaries else None,
+        }
 
-class AnalyzeRelationships(Node):
     def prep(self, shared):
         abstractions = shared[
             "abstractions"
         ]  # Now contains 'files' list of indices, name/description potentially translated
         files_data = shared["files"]
+        file_meta = shared.get("file_meta")
+        symbol_index = shared.get("symbol_index")
+        file_ids = get_file_ids(shared)
         project_name = shared["project_name"]  # Get project name
         language = shared.get("language", "english")  # Get language
         use_cache = shared.get("use_cache", True)  # Get use_cache flag, default to True
@@ -255,20 +816,45 @@ class AnalyzeRelationships(Node):
         all_relevant_indices = set()
         abstraction_info_for_prompt = []
         for i, abstr in enumerate(abstractions):
-            # Use 'files' which contains indices directly
-            file_indices_str = ", ".join(map(str, abstr["files"]))
+            # 'files' contains indices, the prompt names files by their stable ids
+            file_ids_str = ", ".join(file_ids[j] for j in abstr["files"])
             # Abstraction name and description might be translated already
-            info_line = f"- Index {i}: {abstr['name']} (Relevant file indices: [{file_indices_str}])\\n  Description: {abstr['description']}"
+            info_line = f"- Index {i}: {abstr['name']} (Relevant file ids: [{file_ids_str}])\\n  Description: {abstr['description']}"
             context += info_line + "\\n"
             abstraction_info_for_prompt.append(
                 f"{i} # {abstr['name']}"
             )  # Use potentially translated name here too
             all_relevant_indices.update(abstr["files"])
 
-        context += "\\nRelevant File Snippets (Referenced by Index and Path):\\n"
+        # With a symbol index, the dependencies between abstractions are known from the
+        # code: the LLM labels them, and file outlines are enough to do so
+        transform = None
+        if symbol_index:
+            dependencies = abstraction_dependencies(symbol_index, abstractions)
+            context += "\nStatic Dependencies Between Abstractions (found from imports and calls in the code; label the important ones and add others only if the code shows them):\n"
+            for dep in dependencies:
+                context += f"- {dep['from']} # {abstractions[dep['from']]['name']} -> {dep['to']} # {abstractions[dep['to']]['name']} ({dep['imports']} imports, {dep['calls']} calls)\n"
+            if not dependencies:
+                context += "- None found\n"
+
+            def transform(i, path, content):
+                if file_meta and file_meta[i].get("outline"):
+                    return content
+                return outline_file(path, content) or content
+        else:
+            # Full files: over the context budget, the largest ones are shown as their summary
+            summaries = shared.get("file_summaries")
+            summarized = get_summarized_files(shared, files_data, sorted(all_relevant_indices))
+            if summarized:
+                def transform(i, path, content):
+                    if i in summarized:
+                        return f"(Summary, full text omitted)\n{format_summary(summaries[i])}"
+                    return content
+
+        context += "\\nRelevant File Snippets (Referenced by Id and Path):\\n"
         # Get content for relevant files using helper
         relevant_files_content_map = get_content_for_indices(
-            files_data, sorted(list(all_relevant_indices))
+            files_data, sorted(list(all_relevant_indices)), file_meta, transform, file_ids
         )
         # Format file content for context
         file_context_str = "\\n\\n".join(
@@ -344,13 +930,33 @@ relationships:
 
 Now, provide the YAML output:
 """
-        response = call_llm(prompt, use_cache=(use_cache and self.cur_retry == 0)) # Use cache only if enabled and not retrying
+        response = call_llm(
+            prompt,
+            use_cache=(use_cache and self.cur_retry == 0),  # Use cache only if enabled and not retrying
+            response_schema=RELATIONSHIPS_SCHEMA,
+        )
 
         # --- Validation ---
-        yaml_str = response.strip().split("```yaml")[1].split("```")[0].strip()
-        relationships_data = yaml.safe_load(yaml_str)
+        try:
+            relationships = self.parse_response(response, num_abstractions)
+        except ValueError as e:
+            relationships = repair_response(
+                response,
+                e,
+                f"Valid abstraction indices:\n{abstraction_listing}",
+                lambda repaired: self.parse_response(repaired, num_abstractions),
+                use_cache=(use_cache and self.cur_retry == 0),
+                response_schema=RELATIONSHIPS_SCHEMA,
+            )
+
+        print("Generated project summary and relationship details.")
+        return relationships
+
+    def parse_response(self, response, num_abstractions):
+        """Validated Relationships (summary and details) from an LLM response; the ValueError lists every problem found"""
+        relationships_data = parse_structured(response, dict)
 
-        if not isinstance(relationships_data, dict) or not all(
+        if not all(
             k in relationships_data for k in ["summary", "relationships"]
         ):
             raise ValueError(
@@ -363,43 +969,45 @@ Now, provide the YAML output:
 
         # Validate relationships structure
         validated_relationships = []
+        errors = []  # Collected so a repair prompt can fix them all at once
         for rel in relationships_data["relationships"]:
             # Check for 'label' key
             if not isinstance(rel, dict) or not all(
                 k in rel for k in ["from_abstraction", "to_abstraction", "label"]
             ):
-                raise ValueError(
+                errors.append(
                     f"Missing keys (expected from_abstraction, to_abstraction, label) in relationship item: {rel}"
                 )
+                continue
             # Validate 'label' is a string
             if not isinstance(rel["label"], str):
-                raise ValueError(f"Relationship label is not a string: {rel}")
+                errors.append(f"Relationship label is not a string: {rel}")
+                continue
 
             # Validate indices
             try:
                 from_idx = int(str(rel["from_abstraction"]).split("#")[0].strip())
                 to_idx = int(str(rel["to_abstraction"]).split("#")[0].strip())
-                if not (
-                    0 <= from_idx < num_abstractions and 0 <= to_idx < num_abstractions
-                ):
-                    raise ValueError(
-                        f"Invalid index in relationship: from={from_idx}, to={to_idx}. Max index is {num_abstractions-1}."
-                    )
-                validated_relationships.append(
-                    {
-                        "from": from_idx,
-                        "to": to_idx,
-                        "label": rel["label"],  # Potentially translated label
-                    }
-                )
             except (ValueError, TypeError):
-                raise ValueError(f"Could not parse indices from relationship: {rel}")
+                errors.append(f"Could not parse indices from relationship: {rel}")
+                continue
+            if not (
+                0 <= from_idx < num_abstractions and 0 <= to_idx < num_abstractions
+            ):
+                errors.append(
+                    f"Invalid index in relationship: from={from_idx}, to={to_idx}. Max index is {num_abstractions-1}."
+                )
+                continue
+            validated_relationships.append(
+                Relationship({"from": from_idx, "to": to_idx, "label": rel["label"]})  # Potentially translated label
+            )
 
-        print("Generated project summary and relationship details.")
-        return {
-            "summary": relationships_data["summary"],  # Potentially translated summary
-            "details": validated_relationships,  # Store validated, index-based relationships with potentially translated labels
-        }
+        if errors:
+            raise ValueError("\n".join(f"- {error}" for error in errors))
+        return Relationships(
+            summary=relationships_data["summary"],  # Potentially translated summary
+            details=validated_relationships,  # Store validated, index-based relationships with potentially translated labels
+        )
 
     def post(self, shared, prep_res, exec_res):
         # Structure is now {"summary": str, "details": [{"from": int, "to": int, "label": str}]}
@@ -407,7 +1015,18 @@ Now, provide the YAML output:
         shared["relationships"] = exec_res
 
 
-class OrderChapters(Node):
+class OrderChapters(MemoizedNode):
+    memo_outputs = ("chapter_order",)
+
+    def memo_inputs(self, shared):
+        return {
+            "project_name": shared["project_name"],
+            "language": shared.get("language", "english"),
+            "abstractions": shared["abstractions"],
+            "relationships": shared["relationships"],
+            "strategy": shared.get("chapter_order_strategy", "llm"),
+        }
+
     def prep(self, shared):
         abstractions = shared["abstractions"]  # Name/description might be translated
         relationships = shared["relationships"]  # Summary/label might be translated
@@ -442,6 +1061,14 @@ class OrderChapters(Node):
         if language.lower() != "english":
             list_lang_note = f" (Names might be in {language.capitalize()})"
 
+        # Order computed from the relationship graph: the result of the "local" strategy,
+        # the starting point of "refine", and the fallback when the LLM keeps failing
+        local_order = order_abstractions(len(abstractions), relationships["details"])
+        strategy = shared.get("chapter_order_strategy", "llm")
+        if strategy == "refine":
+            context += "\nSuggested order from the dependency graph (entry points first; keep it unless the concepts call for another order):\n"
+            context += "\n".join(f"- {i} # {abstractions[i]['name']}" for i in local_order) + "\n"
+
         return (
             abstraction_listing,
             context,
@@ -449,6 +1076,8 @@ class OrderChapters(Node):
             project_name,
             list_lang_note,
             use_cache,
+            strategy,
+            local_order,
         )  # Return use_cache
 
     def exec(self, prep_res):
@@ -459,7 +1088,12 @@ class OrderChapters(Node):
             project_name,
             list_lang_note,
             use_cache,
+            strategy,
+            local_order,
         ) = prep_res  # Unpack use_cache
+        if strategy == "local":
+            print(f"Determined chapter order from the relationship graph (indices): {local_order}")
+            return local_order
         print("Determining chapter order using LLM...")
         # No language variation needed here in prompt instructions, just ordering based on structure
         # The input names might be translated, hence the note.
@@ -486,14 +1120,14 @@ Output the ordered list of abstraction indices, including the name in a comment
 
 Now, provide the YAML output:
 """
-        response = call_llm(prompt, use_cache=(use_cache and self.cur_retry == 0)) # Use cache only if enabled and not retrying
+        response = call_llm(
+            prompt,
+            use_cache=(use_cache and self.cur_retry == 0),  # Use cache only if enabled and not retrying
+            response_schema=CHAPTER_ORDER_SCHEMA,
+        )
 
         # --- Validation ---
-        yaml_str = response.strip().split("```yaml")[1].split("```")[0].strip()
-        ordered_indices_raw = yaml.safe_load(yaml_str)
-
-        if not isinstance(ordered_indices_raw, list):
-            raise ValueError("LLM output is not a list")
+        ordered_indices_raw = parse_structured(response, list)
 
         ordered_indices = []
         seen_indices = set()
@@ -529,6 +1163,13 @@ Now, provide the YAML output:
         print(f"Determined chapter order (indices): {ordered_indices}")
         return ordered_indices  # Return the list of indices
 
+    def exec_fallback(self, prep_res, exc):
+        # All retries failed: the graph order is a valid permutation, so keep going with it
+        self.memoize = False  # The LLM may succeed next time
+        local_order = prep_res[-1]
+        print(f"Could not determine chapter order using LLM ({exc}), using the relationship graph order: {local_order}")
+        return local_order
+
     def post(self, shared, prep_res, exec_res):
         # exec_res is already the list of ordered indices
         shared["chapter_order"] = exec_res  # List of indices
@@ -540,7 +1181,7 @@ class WriteChapters(BatchNode):
         abstractions = shared[
             "abstractions"
         ]  # List of {"name": str, "description": str, "files": [int]}
-        files_data = shared["files"]  # List of (path, content) tuples
+        files_data = shared["files"]  # FileStore (or list) of (path, content) tuples
         project_name = shared["project_name"]
         language = shared.get("language", "english")
         use_cache = shared.get("use_cache", True)  # Get use_cache flag, default to True
@@ -552,6 +1193,14 @@ class WriteChapters(BatchNode):
             []
         )  # Use instance variable for temporary storage across exec calls
 
+        # Chapters finished before a checkpoint are not written again when resuming
+        partial_chapters = shared.get("partial_chapters") or []
+        run_dir = shared.get("run_dir")
+
+        def save_progress(chapters):
+            shared["partial_chapters"] = chapters
+            save_checkpoint(run_dir, shared)
+
         # Create a complete list of all chapters
         all_chapters = []
         chapter_filenames = {}  # Store chapter filename mapping for linking
@@ -584,12 +1233,9 @@ class WriteChapters(BatchNode):
                 abstraction_details = abstractions[
                     abstraction_index
                 ]  # Contains potentially translated name/desc
-                # Use 'files' (list of indices) directly
+                # Use 'files' (list of indices) directly; contents are read in exec,
+                # so only the chapter being written holds them in memory
                 related_file_indices = abstraction_details.get("files", [])
-                # Get content using helper, passing indices
-                related_files_content_map = get_content_for_indices(
-                    files_data, related_file_indices
-                )
 
                 # Get previous chapter info for transitions (uses potentially translated name)
                 prev_chapter = None
@@ -608,7 +1254,15 @@ class WriteChapters(BatchNode):
                         "chapter_num": i + 1,
                         "abstraction_index": abstraction_index,
                         "abstraction_details": abstraction_details,  # Has potentially translated name/desc
-                        "related_files_content_map": related_files_content_map,
+                        "related_file_indices": related_file_indices,
+                        "files_data": files_data,
+                        "file_meta": shared.get("file_meta"),
+                        "file_ids": get_file_ids(shared),
+                        "symbol_index": shared.get("symbol_index"),
+                        "memo_dir": shared.get("memo_dir") if use_cache else None,
+                        "written": partial_chapters[len(items_to_process)] if len(items_to_process) < len(partial_chapters) else None,
+                        "save_progress": save_progress if run_dir else None,
+                        "chapter_token_budget": shared.get("chapter_token_budget"),
                         "project_name": shared["project_name"],  # Add project name
                         "full_chapter_listing": full_chapter_listing,  # Add the full chapter listing (uses potentially translated names)
                         "chapter_filenames": chapter_filenames,  # Add chapter filenames mapping (uses potentially translated names)
@@ -624,9 +1278,34 @@ class WriteChapters(BatchNode):
                     f"Warning: Invalid abstraction index {abstraction_index} in chapter_order. Skipping."
                 )
 
+        # With a manifest from the last tutorial, chapters whose inputs did not change are kept
+        previous_chapters = shared.get("previous_chapters") or {}
+        for item in items_to_process:
+            item["inputs_digest"] = input_digest(*self.chapter_inputs(item))
+            item["previous_chapter"] = previous_chapters.get(item["inputs_digest"])
+
         print(f"Preparing to write {len(items_to_process)} chapters...")
         return items_to_process  # Iterable for BatchNode
 
+    @staticmethod
+    def chapter_inputs(item):
+        """What a chapter's prompt is built from, apart from the chapters written before it"""
+        related = item["related_file_indices"]
+        symbol_index = item.get("symbol_index")
+        details = item["abstraction_details"]
+        return (
+            "WriteChapters",
+            {key: item.get(key) for key in (
+                "chapter_num", "project_name", "full_chapter_listing",
+                "chapter_filenames", "prev_chapter", "next_chapter", "language", "chapter_token_budget",
+            )},
+            # Files by id and content rather than by position, which shifts when files are added
+            {"name": details["name"], "description": details["description"]},
+            [item["file_ids"][i] for i in related] if item.get("file_ids") else related,
+            get_content_hashes(item["files_data"], item["file_meta"], related),
+            [symbol_index["files"][i] for i in related] if symbol_index else None,
+        )
+
     def exec(self, item):
         # This runs for each item prepared above
         abstraction_name = item["abstraction_details"][
@@ -639,12 +1318,55 @@ class WriteChapters(BatchNode):
         project_name = item.get("project_name")
         language = item.get("language", "english")
         use_cache = item.get("use_cache", True) # Read use_cache from item
+
+        if item.get("written") is not None:
+            print(f"Keeping chapter {chapter_num} for: {abstraction_name}, written before the checkpoint.")
+            self.chapters_written_so_far.append(item["written"])
+            return item["written"]
+
+        # Reused as is when unchanged since the last tutorial (incremental mode), or memoized
+        # with the same inputs and the same chapters before it
+        memo_digest = None
+        if item.get("memo_dir"):
+            memo_digest = input_digest(*self.chapter_inputs(item), self.chapters_written_so_far)
+        chapter_content = item.get("previous_chapter")
+        if chapter_content is None and memo_digest:
+            chapter_content = load_memo(item["memo_dir"], "WriteChapters", memo_digest)
+        if chapter_content is not None:
+            print(f"Reusing chapter {chapter_num} for: {abstraction_name}, inputs unchanged.")
+            self.chapters_written_so_far.append(chapter_content)
+            if item.get("save_progress"):
+                item["save_progress"](list(self.chapters_written_so_far))
+            return chapter_content
+
         print(f"Writing chapter {chapter_num} for: {abstraction_name} using LLM...")
 
+        # Get content using helper, passing indices
+        file_ids = item.get("file_ids")
+        related_files_content_map = get_content_for_indices(
+            item["files_data"], item["related_file_indices"], item["file_meta"], file_ids=file_ids
+        )
+
+        # Over the chapter's token budget, keep only the most relevant definitions of each file
+        if item.get("chapter_token_budget"):
+            index_of_id = {file_id: i for i, file_id in enumerate(file_ids)} if file_ids else {}
+            fitted = fit_files_to_budget(
+                [
+                    (parse_file_ref(idx_path, index_of_id, len(item["files_data"])), idx_path.split(" # ", 1)[1], content)
+                    for idx_path, content in related_files_content_map.items()
+                ],
+                keywords_for(abstraction_name, abstraction_description),
+                item["chapter_token_budget"],
+                item.get("symbol_index"),
+            )
+            related_files_content_map = {
+                f"{file_ids[i] if file_ids else i} # {path}": content for i, path, content in fitted
+            }
+
         # Prepare file context string from the map
         file_context_str = "\n\n".join(
             f"--- File: {idx_path.split('# ')[1] if '# ' in idx_path else idx_path} ---\n{content}"
-            for idx_path, content in item["related_files_content_map"].items()
+            for idx_path, content in related_files_content_map.items()
         )
 
         # Get summary of chapters written *before* this one
@@ -739,12 +1461,19 @@ Now, directly provide a super beginner-friendly Markdown output (DON'T need ```m
 
         # Add the generated content to our temporary list for the next iteration's context
         self.chapters_written_so_far.append(chapter_content)
+        if memo_digest:
+            save_memo(item["memo_dir"], "WriteChapters", memo_digest, chapter_content)
+        if item.get("save_progress"):
+            # Checkpoint after every chapter, so a failure later in the batch keeps this one
+            item["save_progress"](list(self.chapters_written_so_far))
 
         return chapter_content  # Return the Markdown string (potentially translated)
 
     def post(self, shared, prep_res, exec_res_list):
         # exec_res_list contains the generated Markdown for each chapter, in order
         shared["chapters"] = exec_res_list
+        shared["chapter_digests"] = [item["inputs_digest"] for item in prep_res]  # For the manifest
+        shared["partial_chapters"] = []  # Complete, the node's checkpoint takes over
         # Clean up the temporary instance variable
         del self.chapters_written_so_far
         print(f"Finished writing {len(exec_res_list)} chapters.")
@@ -845,10 +1574,37 @@ class CombineTutorial(Node):
         # Add attribution to index content (using English fixed string)
         index_content += f"\n\n---\n\nGenerated by [AI Codebase Knowledge Builder](https://github.com/The-Pocket/Tutorial-Codebase-Knowledge)"
 
+        # Manifest of what each chapter was built from, read by the next incremental run
+        files_data = shared["files"]
+        file_ids = get_file_ids(shared)
+        hashes = get_content_hashes(files_data, shared.get("file_meta"), range(len(files_data)))
+        paths = files_data.paths if isinstance(files_data, FileStore) else [path for path, _ in files_data]
+        chapter_digests = shared.get("chapter_digests") or []
+        manifest = {
+            "settings": tutorial_settings(shared),
+            "files": {file_id: {"path": path, "sha1": digest} for file_id, path, digest in zip(file_ids, paths, hashes)},
+            "abstractions": [
+                dict(abstr, files=[file_ids[i] for i in abstr["files"]]) for abstr in abstractions
+            ],
+            "relationships": relationships_data,
+            "chapter_order": chapter_order,
+            "chapters": [
+                {
+                    "abstraction": abstraction_index,
+                    "files": {file_ids[j]: hashes[j] for j in abstractions[abstraction_index]["files"]},
+                    "inputs_digest": chapter_digests[i],
+                    "content": chapters_content[i],
+                }
+                for i, abstraction_index in enumerate(chapter_order)
+                if i < len(chapters_content) and i < len(chapter_digests)
+            ],
+        }
+
         return {
             "output_path": output_path,
             "index_content": index_content,
             "chapter_files": chapter_files,  # List of {"filename": str, "content": str}
+            "manifest": manifest,
         }
 
     def exec(self, prep_res):
@@ -873,6 +1629,7 @@ class CombineTutorial(Node):
                 f.write(chapter_info["content"])
             print(f"  - Wrote {chapter_filepath}")
 
+        save_manifest(output_path, prep_res["manifest"])
         return output_path  # Return the final path
 
     def post(self, shared, prep_res, exec_res):
@@ -3,6 +3,7 @@ import os
 import logging
 import json
 from datetime import datetime
+from utils.tokens import approx_token_count
 
 # Configure logging
 log_directory = os.getenv("LOG_DIR", "logs")
@@ -27,17 +28,37 @@ cache_file = "llm_cache.json"
 
 # Use Google Gemini with chunking for large prompts
 
-def _approx_token_count(text):
-    # Rough estimate: 1 word ≈ 1.3 tokens for code/text
-    return int(len(text.split()) * 1.3)
-
 def _chunk_text(text, max_tokens=600_000):
     words = text.split()
     chunk_size = int(max_tokens / 1.3)  # convert tokens to words
     return [" ".join(words[i:i+chunk_size]) for i in range(0, len(words), chunk_size)]
 
-def call_llm(prompt, use_cache: bool = True):
+def _use_structured_output(response_schema, prompt):
+    # Structured output needs a single request; set GEMINI_STRUCTURED_OUTPUT=0 for models without it
+    return (
+        response_schema is not None
+        and os.getenv("GEMINI_STRUCTURED_OUTPUT", "1") != "0"
+        and approx_token_count(prompt) <= 600_000
+    )
+
+def call_llm(prompt, use_cache: bool = True, response_schema=None):
+    """
+    Call the LLM, optionally constraining the answer to a JSON schema.
+
+    Args:
+        prompt (str): The prompt
+        use_cache (bool): Whether to read and write the response cache
+        response_schema (dict, optional): Schema of the expected output (see
+            utils/structured_output.py); the response is then JSON instead of the
+            fenced YAML the prompt asks for. Parse it with parse_structured, which accepts both.
+
+    Returns:
+        str: The response text
+    """
     logger.info(f"PROMPT: {prompt}")
+    structured = _use_structured_output(response_schema, prompt)
+    # Structured and free-form answers to the same prompt are cached separately
+    cache_key = (prompt + f"\n\nresponse_schema: {json.dumps(response_schema, sort_keys=True)}") if structured else prompt
 
     # Check cache if enabled
     if use_cache:
@@ -48,23 +69,30 @@ def call_llm(prompt, use_cache: bool = True):
                     cache = json.load(f)
             except:
                 logger.warning(f"Failed to load cache, starting with empty cache")
-        if prompt in cache:
-            logger.info(f"RESPONSE: {cache[prompt]}")
-            return cache[prompt]
+        if cache_key in cache:
+            logger.info(f"RESPONSE: {cache[cache_key]}")
+            return cache[cache_key]
 
     client = genai.Client(api_key=os.getenv("GEMINI_API_KEY", ""))
     model = os.getenv("GEMINI_MODEL", "gemini-1.5-pro-latest")
 
     # Chunk if too large
-    token_count = _approx_token_count(prompt)
+    token_count = approx_token_count(prompt)
     if token_count > 600_000:
         chunks = _chunk_text(prompt, max_tokens=600_000)
         responses = []
         for idx, chunk in enumerate(chunks):
-            logger.info(f"Sending chunk {idx+1}/{len(chunks)} to Gemini, size: {_approx_token_count(chunk)} tokens")
+            logger.info(f"Sending chunk {idx+1}/{len(chunks)} to Gemini, size: {approx_token_count(chunk)} tokens")
             resp = client.models.generate_content(model=model, contents=[chunk])
             responses.append(resp.text)
         response_text = "\n".join(responses)
+    elif structured:
+        resp = client.models.generate_content(
+            model=model,
+            contents=[prompt],
+            config={"response_mime_type": "application/json", "response_schema": response_schema},
+        )
+        response_text = resp.text
     else:
         resp = client.models.generate_content(model=model, contents=[prompt])
         response_text = resp.text
@@ -79,7 +107,7 @@ def call_llm(prompt, use_cache: bool = True):
                     cache = json.load(f)
             except:
                 pass
-        cache[prompt] = response_text
+        cache[cache_key] = response_text
         try:
             with open(cache_file, "w") as f:
                 json.dump(cache, f)
@@ -90,7 +118,7 @@ def call_llm(prompt, use_cache: bool = True):
 
 
 # # Use Anthropic Claude 3.7 Sonnet Extended Thinking
-# def call_llm(prompt, use_cache: bool = True):
+# def call_llm(prompt, use_cache: bool = True, response_schema=None):  # Schema ignored, answers stay YAML
 #     from anthropic import Anthropic
 #     client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY", "your-api-key"))
 #     response = client.messages.create(
@@ -107,7 +135,7 @@ def call_llm(prompt, use_cache: bool = True):
 #     return response.content[1].text
 
 # # Use OpenAI o1
-# def call_llm(prompt, use_cache: bool = True):
+# def call_llm(prompt, use_cache: bool = True, response_schema=None):  # Schema ignored, answers stay YAML
 #     from openai import OpenAI
 #     client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY", "your-api-key"))
 #     r = client.chat.completions.create(
@@ -122,7 +150,7 @@ def call_llm(prompt, use_cache: bool = True):
 #     return r.choices[0].message.content
 
 # Use OpenRouter API
-# def call_llm(prompt: str, use_cache: bool = True) -> str:
+# def call_llm(prompt: str, use_cache: bool = True, response_schema=None) -> str:  # Schema ignored, answers stay YAML
 #     import requests
 #     # Log the prompt
 #     logger.info(f"PROMPT: {prompt}")
@@ -0,0 +1,51 @@
+def order_abstractions(num_abstractions, relationships):
+    """
+    Compute a tutorial order from the relationship graph, without an LLM.
+
+    Relationships point from the abstraction that uses, manages or calls to the one
+    it depends on, so a topological order starts with entry points and user-facing
+    concepts and ends with the supporting ones. Among the abstractions that are ready
+    at the same time, the one more others depend on (fan-in), then the better
+    connected one, comes first. Cycles are broken by taking the remaining abstraction
+    with the fewest unexplained dependents.
+
+    Args:
+        num_abstractions (int): Number of abstractions
+        relationships (list): {"from": int, "to": int, ...} dicts, e.g. shared["relationships"]["details"]
+
+    Returns:
+        list: Every abstraction index exactly once
+    """
+    edges = {
+        (rel["from"], rel["to"])
+        for rel in relationships
+        if rel["from"] != rel["to"]
+        and 0 <= rel["from"] < num_abstractions
+        and 0 <= rel["to"] < num_abstractions
+    }
+    fan_in = [0] * num_abstractions
+    fan_out = [0] * num_abstractions
+    targets = [[] for _ in range(num_abstractions)]
+    for source, target in edges:
+        fan_in[target] += 1
+        fan_out[source] += 1
+        targets[source].append(target)
+
+    def priority(i):
+        return (-fan_in[i], -(fan_in[i] + fan_out[i]), i)
+
+    pending = list(fan_in)  # Dependents not placed yet
+    remaining = set(range(num_abstractions))
+    order = []
+    while remaining:
+        ready = [i for i in remaining if pending[i] == 0]
+        if not ready:
+            # A cycle: start it at the abstraction closest to being ready
+            fewest = min(pending[i] for i in remaining)
+            ready = [i for i in remaining if pending[i] == fewest]
+        chosen = min(ready, key=priority)
+        order.append(chosen)
+        remaining.discard(chosen)
+        for target in targets[chosen]:
+            pending[target] -= 1
+    return order
@@ -0,0 +1,89 @@
+import os
+import pickle
+import tempfile
+
+from utils.file_store import FileStore
+
+CHECKPOINT_FILE = "shared.pkl"
+SECRET_KEYS = ("github_token",)  # Never written to disk; main.py sets them again on resume
+
+_warned_runs = set()  # Runs already told that their in-memory files are not checkpointed
+
+
+def save_checkpoint(run_dir, shared):
+    """
+    Atomically save the shared store so an interrupted run can resume from this point.
+
+    The store is pickled: a FileStore pickles as a reference to its directory, so the
+    crawled contents are not copied into the checkpoint (a list of files, used without
+    a crawl cache, is copied). The digest of each FileStore is saved with it, so
+    load_checkpoint can tell when a later crawl has replaced the store. Secrets
+    (SECRET_KEYS) are left out.
+
+    Without a crawl cache the files are a list, and every checkpoint would write all of
+    their contents again; then nothing is saved (with a warning, once per run) unless
+    shared["checkpoint_file_list"] is set.
+
+    Args:
+        run_dir (str): Directory of the run's checkpoint (created if missing)
+        shared (dict): The shared store
+    """
+    files = shared.get("files")
+    if isinstance(files, list) and files and not shared.get("checkpoint_file_list"):
+        if run_dir not in _warned_runs:
+            _warned_runs.add(run_dir)
+            print(
+                "Warning: Not saving checkpoints, the files are kept in memory (no crawl cache) and would be "
+                "written in full after every node and chapter. Use --checkpoint-files to save them anyway."
+            )
+        return
+    os.makedirs(run_dir, exist_ok=True)
+    path = os.path.join(run_dir, CHECKPOINT_FILE)
+    fd, tmp_path = tempfile.mkstemp(dir=run_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            state = {key: value for key, value in shared.items() if key not in SECRET_KEYS}
+            file_stores = {key: value.digest for key, value in state.items() if isinstance(value, FileStore)}
+            pickle.dump({"shared": state, "file_stores": file_stores}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        # A failed checkpoint only costs the ability to resume, the run goes on
+        print(f"Warning: Could not save checkpoint {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_checkpoint(run_dir):
+    """
+    Load the shared store saved by the last checkpoint of a run.
+
+    Args:
+        run_dir (str): Directory of the run's checkpoint
+
+    Returns:
+        dict or None: The shared store, or None if there is no readable checkpoint or the
+                      crawled files it refers to have changed since it was saved
+    """
+    path = os.path.join(run_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            checkpoint = pickle.load(f)
+        shared = checkpoint["shared"]
+    except Exception as e:
+        print(f"Warning: Could not read checkpoint {path}: {e}")
+        return None
+    # File indices in the checkpoint (abstractions, chapters) only hold for the same files
+    for key, digest in checkpoint["file_stores"].items():
+        if digest is None or shared[key].digest != digest:
+            print(f"Warning: The crawled files in {shared[key].directory} changed since checkpoint {path}, not resuming.")
+            return None
+    return shared
+
+
+def remove_checkpoint(run_dir):
+    """Delete a run's checkpoint once the run has finished"""
+    path = os.path.join(run_dir, CHECKPOINT_FILE)
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,119 @@
+import os
+import json
+import hashlib
+import tempfile
+
+
+def _json_default(value):
+    # Pattern sets are the only non-JSON values we key on; sort them for a stable digest
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__} in snapshot key")
+
+
+def snapshot_key(*parts):
+    """
+    Build a short digest identifying a crawl configuration.
+
+    Args:
+        *parts: JSON-serializable values (sets are allowed) that determine the crawl result,
+                e.g. the sub-path, include/exclude patterns and max file size.
+
+    Returns:
+        str: 16 hex characters, safe to use in a file name
+    """
+    payload = json.dumps(parts, sort_keys=True, default=_json_default)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def load_snapshot(cache_dir, name):
+    """
+    Load a previously saved crawl snapshot.
+
+    Args:
+        cache_dir (str): Directory holding snapshots
+        name (str): Snapshot name (without extension)
+
+    Returns:
+        dict or None: The snapshot, or None if it does not exist or cannot be read
+    """
+    path = os.path.join(cache_dir, f"{name}.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Warning: Could not read crawl snapshot {path}: {e}")
+        return None
+
+
+def save_snapshot(cache_dir, name, snapshot):
+    """
+    Atomically write a crawl snapshot so an interrupted run never leaves a truncated file.
+
+    Args:
+        cache_dir (str): Directory holding snapshots (created if missing)
+        name (str): Snapshot name (without extension)
+        snapshot (dict): JSON-serializable snapshot data
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{name}.json")
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Warning: Could not save crawl snapshot {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def save_pack(cache_dir, name, texts):
+    """
+    Write texts back to back as UTF-8 into one pack file next to the snapshots, so a
+    snapshot can reference contents by offset instead of embedding them in JSON.
+
+    Args:
+        cache_dir (str): Directory holding snapshots (created if missing)
+        name (str): Pack file name
+        texts (dict): {key: text}
+
+    Returns:
+        dict or None: {key: [offset, length in bytes]}, None if the pack could not be written
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, name)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    index = {}
+    try:
+        with os.fdopen(fd, "wb") as f:
+            offset = 0
+            for key, text in texts.items():
+                data = text.encode("utf-8")
+                f.write(data)
+                index[key] = [offset, len(data)]
+                offset += len(data)
+        os.replace(tmp_path, path)
+        return index
+    except Exception as e:
+        print(f"Warning: Could not save crawl pack {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+
+def load_pack(cache_dir, name):
+    """
+    Read a pack written by save_pack.
+
+    Returns:
+        bytes or None: The pack content, slice it with the offsets from save_pack and decode as UTF-8
+    """
+    path = os.path.join(cache_dir, name)
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
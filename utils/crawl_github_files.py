@@ -1,12 +1,19 @@
-import requests
 import base64
 import os
+import queue
+import threading
 import tempfile
 import git
-import time
-import fnmatch
 from typing import Union, Set, List, Dict, Tuple, Any
 from urllib.parse import urlparse
+from utils.crawl_cache import snapshot_key, load_snapshot, save_snapshot
+from utils.github_graphql import fetch_blobs_graphql, graphql_url_for, batch_paths
+from utils.github_rate_budget import RateBudget
+from utils.path_filter import get_path_filter
+from utils.progress import ProgressReporter
+
+# Base URL of the GitHub REST API, override to target GitHub Enterprise or a local stand-in server
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
 
 def crawl_github_files(
     repo_url, 
@@ -14,7 +21,13 @@ def crawl_github_files(
     max_file_size: int = 1 * 1024 * 1024,  # 1 MB
     use_relative_paths: bool = False,
     include_patterns: Union[str, Set[str]] = None,
-    exclude_patterns: Union[str, Set[str]] = None
+    exclude_patterns: Union[str, Set[str]] = None,
+    snapshot_dir: str = None,
+    use_graphql: bool = False,
+    api_url: str = None,
+    rate_budget: RateBudget = None,
+    progress_mode: str = "auto",
+    on_file=None
 ):
     """
     Crawl files from a specific path in a GitHub repository at a specific commit.
@@ -22,16 +35,31 @@ def crawl_github_files(
     Args:
         repo_url (str): URL of the GitHub repository with specific path and commit
                         (e.g., 'https://github.com/microsoft/autogen/tree/e45a15766746d95f8cfaaa705b0371267bec812e/python/packages/autogen-core/src/autogen_core')
-        token (str, optional): **GitHub personal access token.**
+        token (str or list, optional): **GitHub personal access token.**
             - **Required for private repositories.**
             - **Recommended for public repos to avoid rate limits.**
             - Can be passed explicitly or set via the `GITHUB_TOKEN` environment variable.
+            - Several tokens (a list or a comma-separated string) are used round-robin.
         max_file_size (int, optional): Maximum file size in bytes to download (default: 1 MB)
         use_relative_paths (bool, optional): If True, file paths will be relative to the specified subdirectory
         include_patterns (str or set of str, optional): Pattern or set of patterns specifying which files to include (e.g., "*.py", {"*.md", "*.txt"}).
                                                        If None, all files are included.
         exclude_patterns (str or set of str, optional): Pattern or set of patterns specifying which files to exclude.
                                                        If None, no files are excluded.
+        snapshot_dir (str, optional): Directory for crawl snapshots. When set, the crawled commit SHA and files
+                                      are remembered per repo/path, and the next crawl only fetches the paths
+                                      that changed since that commit (via the compare endpoint).
+                                      If None, every file is fetched.
+        use_graphql (bool, optional): If True, list the tree with one recursive request and fetch file contents
+                                      in batches of up to 100 blobs per GraphQL query, falling back to REST for
+                                      binary or truncated blobs. Requires a token.
+        api_url (str, optional): Base URL of the REST API (default: GITHUB_API_URL environment variable or
+                                 https://api.github.com). The GraphQL endpoint is derived from it.
+        rate_budget (RateBudget, optional): Shared rate-limit budget, e.g. to reuse one across crawls.
+                                            If None, a budget for the given token(s) is created.
+        progress_mode (str, optional): "auto", "plain", "quiet" or "json", see ProgressReporter (default: "auto")
+        on_file (callable, optional): Called as on_file(path, content, meta) for every file as soon as it
+                                      has been fetched. Files restored from a snapshot are not reported.
 
     Returns:
         dict: Dictionary with files and statistics
@@ -42,22 +70,22 @@ def crawl_github_files(
     if exclude_patterns and isinstance(exclude_patterns, str):
         exclude_patterns = {exclude_patterns}
 
-    def should_include_file(file_path: str, file_name: str) -> bool:
+    # Patterns are compiled once and shared with crawl_local_files
+    path_filter = get_path_filter(include_patterns, exclude_patterns)
+
+    def should_include_file(file_path: str) -> bool:
         """Determine if a file should be included based on patterns"""
-        # If no include patterns are specified, include all files
-        if not include_patterns:
-            include_file = True
-        else:
-            # Check if file matches any include pattern
-            include_file = any(fnmatch.fnmatch(file_name, pattern) for pattern in include_patterns)
+        return path_filter.matches(file_path)
 
-        # If exclude patterns are specified, check if file should be excluded
-        if exclude_patterns and include_file:
-            # Exclude if file matches any exclude pattern
-            exclude_file = any(fnmatch.fnmatch(file_path, pattern) for pattern in exclude_patterns)
-            return not exclude_file
+    # Aggregated progress instead of a line per file
+    progress = ProgressReporter(f"Crawling {repo_url}", progress_mode)
 
-        return include_file
+    def add_file(rel_path: str, content: str, size: int):
+        """Record a fetched file and hand it to the on_file callback"""
+        files[rel_path] = content
+        progress.add("included")
+        if on_file:
+            on_file(rel_path, content, {"size": size})
 
     # Detect SSH URL (git@ or .git suffix)
     is_ssh_url = repo_url.startswith("git@") or repo_url.endswith(".git")
@@ -82,6 +110,11 @@ def crawl_github_files(
             skipped_files = []
 
             for root, dirs, filenames in os.walk(tmpdirname):
+                # Skip excluded directories without walking them
+                dirs[:] = [
+                    d for d in dirs
+                    if not path_filter.excludes_dir(os.path.relpath(os.path.join(root, d), tmpdirname))
+                ]
                 for filename in filenames:
                     abs_path = os.path.join(root, filename)
                     rel_path = os.path.relpath(abs_path, tmpdirname)
@@ -90,26 +123,27 @@ def crawl_github_files(
                     try:
                         file_size = os.path.getsize(abs_path)
                     except OSError:
+                        progress.add("errors")
                         continue
 
                     if file_size > max_file_size:
                         skipped_files.append((rel_path, file_size))
-                        print(f"Skipping {rel_path}: size {file_size} exceeds limit {max_file_size}")
+                        progress.add("skipped_size")
                         continue
 
                     # Check include/exclude patterns
-                    if not should_include_file(rel_path, filename):
-                        print(f"Skipping {rel_path}: does not match include/exclude patterns")
+                    if not should_include_file(rel_path):
+                        progress.add("skipped_pattern")
                         continue
 
                     # Read content
                     try:
                         with open(abs_path, "r", encoding="utf-8") as f:
                             content = f.read()
-                        files[rel_path] = content
-                        print(f"Added {rel_path} ({file_size} bytes)")
+                        add_file(rel_path, content, file_size)
                     except Exception as e:
-                        print(f"Failed to read {rel_path}: {e}")
+                        progress.warn(f"Failed to read {rel_path}: {e}")
+                        progress.add("errors")
 
             return {
                 "files": files,
@@ -120,7 +154,8 @@ def crawl_github_files(
                     "base_path": None,
                     "include_patterns": include_patterns,
                     "exclude_patterns": exclude_patterns,
-                    "source": "ssh_clone"
+                    "source": "ssh_clone",
+                    "counts": progress.finish()
                 }
             }
 
@@ -136,15 +171,25 @@ def crawl_github_files(
     repo = path_parts[1]
     
     # Setup for GitHub API
+    api_url = (api_url or GITHUB_API_URL).rstrip('/')
     headers = {"Accept": "application/vnd.github.v3+json"}
-    if token:
-        headers["Authorization"] = f"token {token}"
+
+    # Every request goes through the budget, which adds the Authorization header
+    # and paces requests to stay within the remaining rate limit
+    budget = rate_budget or RateBudget(token, api_url)
+    if rate_budget is None:
+        budget.refresh()
+    budget.report()
+
+    if use_graphql and not token:
+        print("Warning: The GraphQL API requires a token. Falling back to REST crawling.")
+        use_graphql = False
 
     def fetch_branches(owner: str, repo: str):
         """Get brancshes of the repository"""
 
-        url = f"https://api.github.com/repos/{owner}/{repo}/branches"
-        response = requests.get(url, headers=headers)
+        url = f"{api_url}/repos/{owner}/{repo}/branches"
+        response = budget.get(url, headers=headers)
 
         if response.status_code == 404:
             if not token:
@@ -164,8 +209,8 @@ def crawl_github_files(
     def check_tree(owner: str, repo: str, tree: str):
         """Check the repository has the given tree"""
 
-        url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/{tree}"
-        response = requests.get(url, headers=headers)
+        url = f"{api_url}/repos/{owner}/{repo}/git/trees/{tree}"
+        response = budget.get(url, headers=headers)
 
         return True if response.status_code == 200 else False 
 
@@ -210,20 +255,22 @@ def crawl_github_files(
     # Dictionary to store path -> content mapping
     files = {}
     skipped_files = []
-    
-    def fetch_contents(path):
+    failed_paths = []
+
+    def to_rel_path(item_path: str) -> str:
+        """Calculate relative path if requested"""
+        if use_relative_paths and specific_path:
+            # Make sure the path is relative to the specified subdirectory
+            if item_path.startswith(specific_path):
+                return item_path[len(specific_path):].lstrip('/')
+        return item_path
+
+    def fetch_contents(path, plan_listings=False):
         """Fetch contents of the repository at a specific path and commit"""
-        url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
+        url = f"{api_url}/repos/{owner}/{repo}/contents/{path}"
         params = {"ref": ref} if ref != None else {}
         
-        response = requests.get(url, headers=headers, params=params)
-        
-        if response.status_code == 403 and 'rate limit exceeded' in response.text.lower():
-            reset_time = int(response.headers.get('X-RateLimit-Reset', 0))
-            wait_time = max(reset_time - time.time(), 0) + 1
-            print(f"Rate limit exceeded. Waiting for {wait_time:.0f} seconds...")
-            time.sleep(wait_time)
-            return fetch_contents(path)
+        response = budget.get(url, headers=headers, params=params)
             
         if response.status_code == 404:
             if not token:
@@ -235,10 +282,12 @@ def crawl_github_files(
             else:
                 print(f"Error 404: Path '{path}' not found in repository or insufficient permissions with the provided token.\n"
                       f"Please verify the token has access to this repository and the path exists.")
+            failed_paths.append(path)
             return
             
         if response.status_code != 200:
             print(f"Error fetching {path}: {response.status_code} - {response.text}")
+            failed_paths.append(path)
             return
         
         contents = response.json()
@@ -246,53 +295,52 @@ def crawl_github_files(
         # Handle both single file and directory responses
         if not isinstance(contents, list):
             contents = [contents]
-        
+
+        subdirectories = [
+            item["path"] for item in contents
+            if item["type"] == "dir" and not path_filter.excludes_dir(to_rel_path(item["path"]))
+        ]
+        if plan_listings:
+            budget.plan(len(subdirectories))
+
         for item in contents:
             item_path = item["path"]
-            
-            # Calculate relative path if requested
-            if use_relative_paths and specific_path:
-                # Make sure the path is relative to the specified subdirectory
-                if item_path.startswith(specific_path):
-                    rel_path = item_path[len(specific_path):].lstrip('/')
-                else:
-                    rel_path = item_path
-            else:
-                rel_path = item_path
+            rel_path = to_rel_path(item_path)
             
             if item["type"] == "file":
                 # Check if file should be included based on patterns
-                if not should_include_file(rel_path, item["name"]):
-                    print(f"Skipping {rel_path}: Does not match include/exclude patterns")
+                if not should_include_file(rel_path):
+                    progress.add("skipped_pattern")
                     continue
                 
                 # Check file size if available
                 file_size = item.get("size", 0)
                 if file_size > max_file_size:
                     skipped_files.append((item_path, file_size))
-                    print(f"Skipping {rel_path}: File size ({file_size} bytes) exceeds limit ({max_file_size} bytes)")
+                    progress.add("skipped_size")
                     continue
                 
                 # For files, get raw content
                 if "download_url" in item and item["download_url"]:
                     file_url = item["download_url"]
-                    file_response = requests.get(file_url, headers=headers)
+                    file_response = budget.get(file_url, resource="raw", headers=headers)
                     
                     # Final size check in case content-length header is available but differs from metadata
                     content_length = int(file_response.headers.get('content-length', 0))
                     if content_length > max_file_size:
                         skipped_files.append((item_path, content_length))
-                        print(f"Skipping {rel_path}: Content length ({content_length} bytes) exceeds limit ({max_file_size} bytes)")
+                        progress.add("skipped_size")
                         continue
                         
                     if file_response.status_code == 200:
-                        files[rel_path] = file_response.text
-                        print(f"Downloaded: {rel_path} ({file_size} bytes) ")
+                        add_file(rel_path, file_response.text, file_size)
                     else:
-                        print(f"Failed to download {rel_path}: {file_response.status_code}")
+                        progress.warn(f"Failed to download {rel_path}: {file_response.status_code}")
+                        progress.add("errors")
+                        failed_paths.append(item_path)
                 else:
                     # Alternative method if download_url is not available
-                    content_response = requests.get(item["url"], headers=headers)
+                    content_response = budget.get(item["url"], headers=headers)
                     if content_response.status_code == 200:
                         content_data = content_response.json()
                         if content_data.get("encoding") == "base64" and "content" in content_data:
@@ -300,23 +348,244 @@ def crawl_github_files(
                             if len(content_data["content"]) * 0.75 > max_file_size:  # Approximate size calculation
                                 estimated_size = int(len(content_data["content"]) * 0.75)
                                 skipped_files.append((item_path, estimated_size))
-                                print(f"Skipping {rel_path}: Encoded content exceeds size limit")
+                                progress.add("skipped_size")
                                 continue
                                 
                             file_content = base64.b64decode(content_data["content"]).decode('utf-8')
-                            files[rel_path] = file_content
-                            print(f"Downloaded: {rel_path} ({file_size} bytes)")
+                            add_file(rel_path, file_content, file_size)
                         else:
-                            print(f"Unexpected content format for {rel_path}")
+                            progress.warn(f"Unexpected content format for {rel_path}")
+                            progress.add("errors")
+                            failed_paths.append(item_path)
                     else:
-                        print(f"Failed to get content for {rel_path}: {content_response.status_code}")
+                        progress.warn(f"Failed to get content for {rel_path}: {content_response.status_code}")
+                        progress.add("errors")
+                        failed_paths.append(item_path)
             
             elif item["type"] == "dir":
+                # Skip excluded directories without listing them
+                if item_path not in subdirectories:
+                    continue
                 # Recursively process subdirectories
-                fetch_contents(item_path)
+                fetch_contents(item_path, plan_listings)
     
-    # Start crawling from the specified path
-    fetch_contents(specific_path)
+    def resolve_commit_sha():
+        """Resolve the requested ref (or the default branch) to a commit SHA"""
+        url = f"{api_url}/repos/{owner}/{repo}/commits/{ref or 'HEAD'}"
+        response = budget.get(url, headers={**headers, "Accept": "application/vnd.github.sha"})
+        if response.status_code != 200:
+            print(f"Could not resolve commit for {owner}/{repo}@{ref or 'HEAD'}: {response.status_code}")
+            return None
+        return response.text.strip()
+
+    def compare_commits(base_sha: str, head_sha: str):
+        """List the files changed between two commits, or None if a full crawl is needed"""
+        url = f"{api_url}/repos/{owner}/{repo}/compare/{base_sha}...{head_sha}"
+        response = budget.get(url, headers=headers)
+        if response.status_code != 200:
+            print(f"Could not compare {base_sha[:7]}...{head_sha[:7]}: {response.status_code}. Falling back to a full crawl.")
+            return None
+
+        comparison = response.json()
+        # A three-dot compare is relative to the merge base, so it only describes
+        # the snapshot when the new commit descends from the snapshot commit
+        if comparison.get("status") not in ("ahead", "identical"):
+            print(f"Commit {head_sha[:7]} does not descend from snapshot {base_sha[:7]}. Falling back to a full crawl.")
+            return None
+
+        # GitHub truncates the list of changed files at 300 entries
+        changed = comparison.get("files", [])
+        if len(changed) >= 300:
+            print(f"Too many changed files since {base_sha[:7]} to list. Falling back to a full crawl.")
+            return None
+        return changed
+
+    def list_tree():
+        """List every tree entry under the crawled path with one recursive tree request"""
+        url = f"{api_url}/repos/{owner}/{repo}/git/trees/{ref or 'HEAD'}"
+        response = budget.get(url, headers=headers, params={"recursive": "1"})
+        if response.status_code != 200:
+            print(f"Could not list tree of {owner}/{repo}: {response.status_code}. Falling back to directory crawling.")
+            return None
+
+        tree = response.json()
+        if tree.get("truncated"):
+            print(f"Tree of {owner}/{repo} is too large to list at once. Falling back to directory crawling.")
+            return None
+
+        return [entry for entry in tree.get("tree", []) if in_specific_path(entry["path"])]
+
+    def list_tree_files():
+        """List (path, size) of every blob under the crawled path"""
+        entries = list_tree()
+        if entries is None:
+            return None
+        return [(entry["path"], entry.get("size", 0)) for entry in entries if entry.get("type") == "blob"]
+
+    def crawl_directories():
+        """
+        Crawl the specified path directory by directory, planning the listings up front.
+
+        One recursive tree request counts the directories the crawl will list (those not
+        excluded, nor below an excluded one), so the budget paces the crawl and reports its
+        projected time before it starts. If the tree cannot be listed, each listing plans
+        its subdirectories as it goes.
+        """
+        entries = list_tree()
+        if entries is not None:
+            base = specific_path.rstrip('/')
+            listed = set()
+            for entry in sorted(entries, key=lambda entry: entry["path"]):
+                item_path = entry["path"]
+                if entry.get("type") != "tree" or item_path == base:
+                    continue
+                parent = item_path.rsplit('/', 1)[0] if '/' in item_path else ""
+                if (parent == base or parent in listed) and not path_filter.excludes_dir(to_rel_path(item_path)):
+                    listed.add(item_path)
+            budget.plan(len(listed) + 1)  # Plus the listing of the crawled path itself
+            budget.report(len(listed) + 1)
+        fetch_contents(specific_path, plan_listings=entries is None)
+
+    def fetch_files(item_paths, sizes=None):
+        """Fetch the given files, batched through GraphQL when enabled"""
+        if not use_graphql:
+            budget.plan(len(item_paths))
+            budget.report(len(item_paths))
+            for item_path in item_paths:
+                fetch_contents(item_path)
+            return
+
+        batch_count = len(list(batch_paths(item_paths, sizes or {})))
+        budget.plan(batch_count, "graphql")
+        budget.report(batch_count, "graphql")
+        blobs = fetch_blobs_graphql(
+            graphql_url_for(api_url), owner, repo, ref or "HEAD", item_paths, token, sizes=sizes,
+            post=lambda url, **kwargs: budget.post(url, resource="graphql", **kwargs),
+        )
+        # Binary, truncated or failed blobs go through the REST API instead, one request each
+        rest_paths = [
+            item_path for item_path in item_paths
+            if blobs.get(item_path) is None or blobs[item_path]["is_binary"]
+            or blobs[item_path]["is_truncated"] or blobs[item_path]["text"] is None
+        ]
+        if rest_paths:
+            budget.plan(len(rest_paths))
+            budget.report(len(rest_paths))
+        rest_set = set(rest_paths)
+        for item_path in item_paths:
+            rel_path = to_rel_path(item_path)
+            blob = blobs.get(item_path)
+
+            if item_path in rest_set:
+                fetch_contents(item_path)
+                continue
+
+            if blob["byte_size"] > max_file_size:
+                skipped_files.append((item_path, blob["byte_size"]))
+                progress.add("skipped_size")
+                continue
+
+            add_file(rel_path, blob["text"], blob["byte_size"])
+
+    def crawl_tree():
+        """Crawl the specified path from a single tree listing, fetching contents in batches"""
+        entries = list_tree_files()
+        if entries is None:
+            fetch_contents(specific_path, plan_listings=True)
+            return
+
+        progress.set_total(len(entries))
+        item_paths = []
+        sizes = {}
+        for item_path, file_size in entries:
+            rel_path = to_rel_path(item_path)
+            if not should_include_file(rel_path):
+                progress.add("skipped_pattern")
+                continue
+            if file_size > max_file_size:
+                skipped_files.append((item_path, file_size))
+                progress.add("skipped_size")
+                continue
+            item_paths.append(item_path)
+            sizes[item_path] = file_size
+
+        fetch_files(item_paths, sizes)
+
+    def in_specific_path(item_path: str) -> bool:
+        """Check whether a repository path lies under the crawled subdirectory"""
+        if not specific_path:
+            return True
+        base = specific_path.rstrip('/')
+        return item_path == base or item_path.startswith(base + '/')
+
+    head_sha = None
+    snapshot_name = None
+    changes = None
+    changed = None
+
+    if snapshot_dir or use_graphql:
+        head_sha = resolve_commit_sha()
+        if head_sha:
+            # Pin every request to the resolved commit so listings, blobs and snapshot agree
+            ref = head_sha
+
+    if snapshot_dir and head_sha:
+        key = snapshot_key(specific_path, include_patterns, exclude_patterns, max_file_size, use_relative_paths)
+        snapshot_name = f"github_{owner}_{repo}_{key}"
+        snapshot = load_snapshot(snapshot_dir, snapshot_name)
+        if snapshot and snapshot.get("sha") == head_sha:
+            changed = []
+        elif snapshot:
+            changed = compare_commits(snapshot["sha"], head_sha)
+
+    if changed is not None:
+        # Rebuild the file set from the snapshot and fetch only what changed
+        print(f"Incremental crawl: {len(changed)} changed paths since {snapshot['sha'][:7]}")
+        files.update(snapshot["files"])
+        changes = {"added": [], "modified": [], "removed": []}
+
+        touched = []  # (rel_path, had_file) for every changed path under the crawled path
+        to_fetch = []
+        for entry in changed:
+            item_path = entry["filename"]
+            previous_path = entry.get("previous_filename")
+
+            # Renamed files leave their old path behind
+            if previous_path and in_specific_path(previous_path):
+                previous_rel_path = to_rel_path(previous_path)
+                if files.pop(previous_rel_path, None) is not None:
+                    changes["removed"].append(previous_rel_path)
+
+            if not in_specific_path(item_path):
+                continue
+
+            rel_path = to_rel_path(item_path)
+            touched.append((rel_path, files.pop(rel_path, None) is not None))
+
+            if entry.get("status") != "removed" and should_include_file(rel_path):
+                to_fetch.append(item_path)
+
+        fetch_files(to_fetch)
+
+        for rel_path, had_file in touched:
+            if rel_path in files:
+                changes["modified" if had_file else "added"].append(rel_path)
+            elif had_file:
+                changes["removed"].append(rel_path)
+    elif use_graphql:
+        crawl_tree()
+    else:
+        # Start crawling from the specified path
+        crawl_directories()
+
+    # Never persist a partial crawl, it would hide the missing files from the next run
+    if snapshot_name and not failed_paths:
+        save_snapshot(snapshot_dir, snapshot_name, {
+            "repo": f"{owner}/{repo}",
+            "path": specific_path,
+            "sha": head_sha,
+            "files": files,
+        })
     
     return {
         "files": files,
@@ -326,10 +595,93 @@ def crawl_github_files(
             "skipped_files": skipped_files,
             "base_path": specific_path if use_relative_paths else None,
             "include_patterns": include_patterns,
-            "exclude_patterns": exclude_patterns
+            "exclude_patterns": exclude_patterns,
+            "commit_sha": head_sha,
+            "changes": changes,
+            "request_count": budget.request_count,
+            "counts": progress.finish()
         }
     }
 
+class _CrawlStopped(Exception):
+    """Raised inside the crawler thread when the consumer of iter_github_files stops early"""
+
+
+def iter_github_files(repo_url, queue_size: int = 64, stats: dict = None, **kwargs):
+    """
+    Stream files from a GitHub repository as they are fetched, so work on early files can
+    start before the slowest download finishes.
+
+    The crawl runs in a background thread and hands files over through a bounded queue,
+    so a slow consumer holds the crawler back instead of buffering the whole repository.
+
+    Args:
+        repo_url (str): URL of the GitHub repository, as for crawl_github_files
+        queue_size (int, optional): Maximum number of fetched files waiting to be consumed (default: 64)
+        stats (dict, optional): Filled with the crawl statistics once the generator is exhausted
+        **kwargs: Any other crawl_github_files argument
+
+    Yields:
+        tuple: (path, content, meta) with meta {"size": int}. Files restored from a snapshot
+               during an incremental crawl come last, with meta {"size": int, "source": "snapshot"}.
+    """
+    items = queue.Queue(maxsize=queue_size)
+    stopped = threading.Event()
+    finished = object()
+    result = {}
+    errors = []
+
+    def on_file(path, content, meta):
+        while not stopped.is_set():
+            try:
+                items.put((path, content, meta), timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise _CrawlStopped()
+
+    def run():
+        try:
+            result.update(crawl_github_files(repo_url, on_file=on_file, **kwargs) or {})
+        except _CrawlStopped:
+            pass
+        except Exception as e:
+            errors.append(e)
+        finally:
+            items.put(finished)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    yielded = set()
+    try:
+        while True:
+            item = items.get()
+            if item is finished:
+                break
+            yielded.add(item[0])
+            yield item
+    finally:
+        stopped.set()
+        # Unblock a crawler waiting on a full queue
+        while thread.is_alive():
+            try:
+                items.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+    # Files restored from a snapshot were never fetched, so the callback did not see them
+    for path, content in result.get("files", {}).items():
+        if path not in yielded:
+            yield path, content, {"size": len(content.encode("utf-8")), "source": "snapshot"}
+
+    if stats is not None:
+        stats.update(result.get("stats", {}))
+
+
 # Example usage
 if __name__ == "__main__":
     # Get token from environment variable (recommended for private repos)
@@ -1,132 +1,517 @@
 import os
-import fnmatch
+import stat
+import time
+import hashlib
 import pathspec
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils.crawl_cache import snapshot_key, load_snapshot, save_snapshot, load_pack, save_pack
+from utils.local_git import is_git_repo, list_files, list_tree, read_blobs
+from utils.path_filter import get_path_filter
+from utils.progress import ProgressReporter
+from utils.text_files import MMAP_THRESHOLD, decode_text, looks_binary, read_text_file
 
+# Files read by one thread pool task
+READ_BATCH_SIZE = 32
+# Files modified this close to the previous crawl may have changed again within the
+# same mtime tick, so their manifest entry is not trusted
+RACY_MTIME_NS = 2 * 10**9
 
-def crawl_local_files(
+
+def iter_git_ref_files(
     directory,
+    ref,
     include_patterns=None,
     exclude_patterns=None,
     max_file_size=None,
     use_relative_paths=True,
+    progress_mode="auto",
+    stats=None,
 ):
     """
-    Crawl files in a local directory with similar interface as crawl_github_files.
+    Stream the files of a local git repository at any ref, reading blobs straight from
+    the object database so the work tree is never checked out or touched.
     Args:
-        directory (str): Path to local directory
+        directory (str): Path to a directory inside a git repository
+        ref (str): Branch, tag or commit to read
         include_patterns (set): File patterns to include (e.g. {"*.py", "*.js"})
         exclude_patterns (set): File patterns to exclude (e.g. {"tests/*"})
         max_file_size (int): Maximum file size in bytes
         use_relative_paths (bool): Whether to use paths relative to directory
+        progress_mode (str): "auto", "plain", "quiet" or "json" (see ProgressReporter)
+        stats (dict): Filled with the crawl statistics once the generator is exhausted (optional)
+
+    Yields:
+        tuple: (filepath, content, meta) with meta {"size": int, "sha": str}
+    """
+    if not is_git_repo(directory):
+        raise ValueError(f"Not a git repository, cannot read ref {ref}: {directory}")
+
+    path_filter = get_path_filter(include_patterns, exclude_patterns)
+    progress = ProgressReporter(f"Reading {ref}", progress_mode)
+    wanted = {}  # sha -> [filepath, ...], identical blobs are read once
+    skipped_files = []
+    entries = list_tree(directory, ref)
+    progress.set_total(len(entries))
+    for relpath, size, sha in entries:
+        filepath = relpath if use_relative_paths else os.path.join(directory, relpath)
+
+        if not path_filter.matches(relpath):
+            progress.add("skipped_pattern")
+            continue
+
+        if max_file_size and size > max_file_size:
+            skipped_files.append((filepath, size))
+            progress.add("skipped_size")
+            continue
+
+        wanted.setdefault(sha, []).append(filepath)
+
+    for sha, data in read_blobs(directory, list(wanted)):
+        paths = wanted[sha]
+        if data is None:
+            progress.warn(f"Warning: Could not read blob {sha} for {', '.join(paths)}")
+            progress.add("errors", len(paths))
+            continue
+        if looks_binary(data):
+            progress.add("skipped_binary", len(paths))
+            continue
+        content = decode_text(data)
+        if content is None:
+            progress.warn(f"Warning: Could not decode file {', '.join(paths)}")
+            progress.add("errors", len(paths))
+            continue
+        for filepath in paths:
+            progress.add("included")
+            yield filepath, content, {"size": len(data), "sha": sha}
+
+    if stats is not None:
+        stats.update({"ref": ref, "skipped_files": skipped_files, "counts": progress.finish()})
+    else:
+        progress.finish()
+
+
+def crawl_git_ref(
+    directory,
+    ref,
+    include_patterns=None,
+    exclude_patterns=None,
+    max_file_size=None,
+    use_relative_paths=True,
+    progress_mode="auto",
+):
+    """
+    Crawl files of a local git repository at any ref. Takes the same arguments as
+    iter_git_ref_files but collects every file before returning.
 
     Returns:
-        dict: {"files": {filepath: content}}
+        dict: {"files": {filepath: content}, "stats": {"ref", "skipped_files", "counts"}}
+    """
+    stats = {}
+    stream = iter_git_ref_files(
+        directory,
+        ref,
+        include_patterns=include_patterns,
+        exclude_patterns=exclude_patterns,
+        max_file_size=max_file_size,
+        use_relative_paths=use_relative_paths,
+        progress_mode=progress_mode,
+        stats=stats,
+    )
+    files_dict = {path: content for path, content, _ in stream}
+    return {"files": files_dict, "stats": stats}
+
+
+def _load_gitignore(gitignore_path, progress=None):
+    """Parse one .gitignore file, None if it cannot be read"""
+    try:
+        with open(gitignore_path, "r", encoding="utf-8") as f:
+            return pathspec.PathSpec.from_lines("gitwildmatch", f.readlines())
+    except Exception as e:
+        message = f"Warning: Could not read or parse .gitignore file {gitignore_path}: {e}"
+        if progress:
+            progress.warn(message)
+        else:
+            print(message)
+        return None
+
+
+def _is_ignored(gitignore_specs, relpath, is_dir=False):
+    """
+    Check a path against the stacked .gitignore specs of its parent directories.
+
+    Each spec matches paths relative to the directory of its .gitignore. A path counts
+    as ignored when any of them matches, so a deeper "!pattern" cannot re-include what
+    a shallower .gitignore ignores.
+    """
+    for base, spec in gitignore_specs:
+        subpath = relpath[len(base):]
+        if spec.match_file(subpath) or (is_dir and spec.match_file(subpath + "/")):
+            return True
+    return False
+
+
+def _walk_files(directory, path_filter, progress=None):
+    """
+    Walk a directory in a single os.scandir pass, yielding the files that pass the
+    include/exclude patterns and every .gitignore on the way down.
+
+    Directories that are excluded, ignored, or cannot contain an included file are
+    pruned before they are opened. Sizes come from the DirEntry stat data, so every
+    file is stat-ed at most once, and paths are yielded as they are found instead of
+    being collected into a list first. Files rejected by the patterns or a .gitignore
+    are counted as "skipped_pattern" on `progress`, if given.
+
+    Yields:
+        tuple: (path relative to directory, absolute path, os.stat_result)
+    """
+    # Depth-first with entries sorted by name, so the crawl order is deterministic.
+    # Every directory carries the .gitignore specs of itself and its parents.
+    stack = [("", directory, ())]
+    while stack:
+        rel_dir, abs_dir, gitignore_specs = stack.pop()
+        try:
+            with os.scandir(abs_dir) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            if progress:
+                progress.warn(f"Warning: Could not list directory {abs_dir}: {e}")
+                progress.add("errors")
+            else:
+                print(f"Warning: Could not list directory {abs_dir}: {e}")
+            continue
+
+        for entry in entries:
+            if entry.name == ".gitignore" and entry.is_file():
+                spec = _load_gitignore(entry.path, progress)
+                if spec is not None:
+                    gitignore_specs = gitignore_specs + ((rel_dir, spec),)
+                break
+
+        subdirs = []
+        for entry in entries:
+            relpath = f"{rel_dir}{entry.name}"
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+
+            if is_dir:
+                # Like os.walk, do not follow symlinked directories
+                if entry.is_symlink():
+                    continue
+                if _is_ignored(gitignore_specs, relpath, is_dir=True):
+                    continue
+                if path_filter.excludes_dir(relpath) or not path_filter.may_include_under(relpath):
+                    continue
+                subdirs.append((f"{relpath}/", entry.path, gitignore_specs))
+                continue
+
+            if not path_filter.matches(relpath) or _is_ignored(gitignore_specs, relpath):
+                if progress:
+                    progress.add("skipped_pattern")
+                continue
+            try:
+                file_stat = entry.stat()
+            except OSError as e:
+                if progress:
+                    progress.warn(f"Warning: Could not stat file {entry.path}: {e}")
+                    progress.add("errors")
+                else:
+                    print(f"Warning: Could not stat file {entry.path}: {e}")
+                continue
+            yield relpath, entry.path, file_stat
+
+        # Files of a directory come before its subdirectories, as with os.walk
+        stack.extend(reversed(subdirs))
+
+
+def _git_index_files(directory, git_paths, path_filter, progress=None):
+    """
+    Filter the files listed by the git index (tracked plus untracked-but-not-ignored),
+    so ignored trees are never traversed and every nested .gitignore is honoured by git.
+
+    Yields:
+        tuple: (path relative to directory, absolute path, os.stat_result)
+    """
+    for relpath in git_paths:
+        if not path_filter.matches(relpath):
+            if progress:
+                progress.add("skipped_pattern")
+            continue
+        filepath = os.path.join(directory, relpath)
+        try:
+            file_stat = os.stat(filepath)
+        except OSError:
+            # Deleted from the work tree but still in the index
+            continue
+        if not stat.S_ISREG(file_stat.st_mode):
+            # Submodules are listed as a single path
+            continue
+        yield relpath, filepath, file_stat
+
+
+def _save_manifest(snapshot_dir, snapshot_name, previous, directory, crawled_at_ns, manifest, texts):
+    """Write the contents pack and then the manifest pointing at it, removing the previous pack"""
+    pack_name = f"{snapshot_name}.{crawled_at_ns}.pack"
+    index = save_pack(snapshot_dir, pack_name, texts)
+    if index is None:
+        return
+    for relpath, (offset, length) in index.items():
+        manifest[relpath]["offset"] = offset
+        manifest[relpath]["length"] = length
+    save_snapshot(snapshot_dir, snapshot_name, {
+        "directory": os.path.abspath(directory),
+        "crawled_at_ns": crawled_at_ns,
+        "pack": pack_name,
+        "files": manifest,
+    })
+    # A crash before this point leaves the previous manifest and pack intact
+    if previous and previous.get("pack") != pack_name:
+        try:
+            os.remove(os.path.join(snapshot_dir, previous["pack"]))
+        except OSError:
+            pass
+
+
+def iter_local_files(
+    directory,
+    include_patterns=None,
+    exclude_patterns=None,
+    max_file_size=None,
+    use_relative_paths=True,
+    ref=None,
+    max_workers=None,
+    progress_mode="auto",
+    use_git_index=True,
+    snapshot_dir=None,
+    stats=None,
+):
+    """
+    Stream the files of a local directory as they are read, in walk order.
+    Args:
+        directory (str): Path to local directory
+        include_patterns (set): File patterns to include (e.g. {"*.py", "*.js"})
+        exclude_patterns (set): File patterns to exclude (e.g. {"tests/*"})
+        max_file_size (int): Maximum file size in bytes
+        use_relative_paths (bool): Whether to use paths relative to directory
+        ref (str): Git ref to read from the object database instead of the work tree (optional)
+        max_workers (int): Number of threads reading files (optional, defaults to CPU count + 4, at most 32)
+        progress_mode (str): "auto", "plain", "quiet" or "json" (see ProgressReporter)
+        use_git_index (bool): List files with `git ls-files` when directory is in a git work tree,
+                              otherwise walk it while honouring nested .gitignore files (optional)
+        snapshot_dir (str): Directory for crawl snapshots (optional). When set, a manifest of every
+                            file's size, mtime and content hash is kept, and the next crawl only
+                            re-reads files whose size or mtime changed.
+        stats (dict): Filled with the crawl statistics once the generator is exhausted (optional):
+                      "counts", "source", "changes" (added/modified/removed paths since the
+                      snapshot, None without one) and "unchanged_count"
+
+    Yields:
+        tuple: (filepath, content, meta) with meta {"size", "mtime_ns", "hash"}
     """
     if not os.path.isdir(directory):
         raise ValueError(f"Directory does not exist: {directory}")
 
-    files_dict = {}
+    if ref:
+        yield from iter_git_ref_files(
+            directory,
+            ref,
+            include_patterns=include_patterns,
+            exclude_patterns=exclude_patterns,
+            max_file_size=max_file_size,
+            use_relative_paths=use_relative_paths,
+            progress_mode=progress_mode,
+            stats=stats,
+        )
+        return
+
+    path_filter = get_path_filter(include_patterns, exclude_patterns)
+
+    # The manifest from the previous crawl: relative path -> size, mtime, hash and the
+    # offset/length of the content in the snapshot's pack file
+    snapshot_name = None
+    snapshot = None
+    manifest = {}
+    pack = None
+    racy_after = 0
+    if snapshot_dir:
+        key = snapshot_key(os.path.abspath(directory), include_patterns, exclude_patterns, max_file_size)
+        snapshot_name = f"local_{os.path.basename(os.path.abspath(directory))}_{key}"
+        snapshot = load_snapshot(snapshot_dir, snapshot_name)
+        if snapshot:
+            manifest = snapshot["files"]
+            pack = load_pack(snapshot_dir, snapshot["pack"])
+            racy_after = snapshot["crawled_at_ns"] - RACY_MTIME_NS
+    crawled_at_ns = time.time_ns()
+    new_manifest = {}
+    texts = {}  # relative path -> content, for the next pack
+
+    # Files near the size limit are memory-mapped rather than copied into a buffer
+    mmap_threshold = max_file_size // 2 if max_file_size else MMAP_THRESHOLD
+
+    def read_file(relpath, filepath, file_stat):
+        if max_file_size and file_stat.st_size > max_file_size:
+            return None, "size limit", None # Skip large files
+
+        entry = manifest.get(relpath)
+        if (
+            entry
+            and pack is not None
+            and entry["size"] == file_stat.st_size
+            and entry["mtime_ns"] == file_stat.st_mtime_ns
+            and file_stat.st_mtime_ns < racy_after
+        ):
+            # Unchanged since the last crawl, reuse the snapshot content
+            offset, length = entry["offset"], entry["length"]
+            return pack[offset:offset + length].decode("utf-8"), None, entry["hash"]
+
+        content, error = read_text_file(filepath, size=file_stat.st_size, mmap_threshold=mmap_threshold)
+        if error:
+            return None, error, None
+        return content, None, hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def read_batch(batch):
+        return [read_file(relpath, filepath, file_stat) for relpath, filepath, file_stat in batch]
 
-    # --- Load .gitignore ---
-    gitignore_path = os.path.join(directory, ".gitignore")
-    gitignore_spec = None
-    if os.path.exists(gitignore_path):
+    progress = ProgressReporter(f"Crawling {directory}", progress_mode)
+
+    # Let git enumerate the work tree when it can, it already knows every ignore rule
+    source = "walk"
+    if use_git_index and is_git_repo(directory):
         try:
-            with open(gitignore_path, "r", encoding="utf-8") as f:
-                gitignore_patterns = f.readlines()
-            gitignore_spec = pathspec.PathSpec.from_lines("gitwildmatch", gitignore_patterns)
-            print(f"Loaded .gitignore patterns from {gitignore_path}")
-        except Exception as e:
-            print(f"Warning: Could not read or parse .gitignore file {gitignore_path}: {e}")
-
-    all_files = []
-    for root, dirs, files in os.walk(directory):
-        # Filter directories using .gitignore and exclude_patterns early
-        excluded_dirs = set()
-        for d in dirs:
-            dirpath_rel = os.path.relpath(os.path.join(root, d), directory)
-
-            if gitignore_spec and gitignore_spec.match_file(dirpath_rel):
-                excluded_dirs.add(d)
-                continue
+            candidates = _git_index_files(directory, list_files(directory), path_filter, progress)
+            source = "git_index"
+        except RuntimeError as e:
+            progress.warn(f"Warning: Could not list files with git, walking the directory instead: {e}")
+    if source == "walk":
+        candidates = _walk_files(directory, path_filter, progress)
 
-            if exclude_patterns:
-                for pattern in exclude_patterns:
-                    if fnmatch.fnmatch(dirpath_rel, pattern) or fnmatch.fnmatch(d, pattern):
-                        excluded_dirs.add(d)
-                        break
-
-        for d in dirs.copy():
-            if d in excluded_dirs:
-                dirs.remove(d)
-
-        for filename in files:
-            filepath = os.path.join(root, filename)
-            all_files.append(filepath)
-
-    total_files = len(all_files)
-    processed_files = 0
-
-    for filepath in all_files:
-        relpath = os.path.relpath(filepath, directory) if use_relative_paths else filepath
-
-        # --- Exclusion check ---
-        excluded = False
-        if gitignore_spec and gitignore_spec.match_file(relpath):
-            excluded = True
-
-        if not excluded and exclude_patterns:
-            for pattern in exclude_patterns:
-                if fnmatch.fnmatch(relpath, pattern):
-                    excluded = True
-                    break
-
-        included = False
-        if include_patterns:
-            for pattern in include_patterns:
-                if fnmatch.fnmatch(relpath, pattern):
-                    included = True
-                    break
+    unchanged_count = 0
+    manifest_stale = pack is None  # Whether the snapshot must be rewritten
+
+    def report(relpath, filepath, file_stat, content, error, digest):
+        """Count a read result and return the (filepath, content, meta) to yield, or None"""
+        nonlocal unchanged_count, manifest_stale
+        if error is None:
+            progress.add("included")
+            meta = {"size": file_stat.st_size, "mtime_ns": file_stat.st_mtime_ns, "hash": digest}
+            if not snapshot_name:
+                return relpath if use_relative_paths else filepath, content, meta
+            previous = manifest.get(relpath)
+            if previous and previous["hash"] == digest:
+                unchanged_count += 1
+            if not (
+                previous
+                and previous["size"] == file_stat.st_size
+                and previous["mtime_ns"] == file_stat.st_mtime_ns
+                and file_stat.st_mtime_ns < racy_after
+            ):
+                manifest_stale = True
+            new_manifest[relpath] = meta
+            texts[relpath] = content
+            return relpath if use_relative_paths else filepath, content, meta
+        elif error == "size limit":
+            progress.add("skipped_size")
+        elif error == "binary":
+            progress.add("skipped_binary")
         else:
-            included = True
-
-        processed_files += 1 # Increment processed count regardless of inclusion/exclusion
-
-        status = "processed"
-        if not included or excluded:
-            status = "skipped (excluded)"
-            # Print progress for skipped files due to exclusion
-            if total_files > 0:
-                percentage = (processed_files / total_files) * 100
-                rounded_percentage = int(percentage)
-                print(f"\033[92mProgress: {processed_files}/{total_files} ({rounded_percentage}%) {relpath} [{status}]\033[0m")
-            continue # Skip to next file if not included or excluded
-
-        if max_file_size and os.path.getsize(filepath) > max_file_size:
-            status = "skipped (size limit)"
-            # Print progress for skipped files due to size limit
-            if total_files > 0:
-                percentage = (processed_files / total_files) * 100
-                rounded_percentage = int(percentage)
-                print(f"\033[92mProgress: {processed_files}/{total_files} ({rounded_percentage}%) {relpath} [{status}]\033[0m")
-            continue # Skip large files
-
-        # --- File is being processed ---        
-        try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                content = f.read()
-            files_dict[relpath] = content
-        except Exception as e:
-            print(f"Warning: Could not read file {filepath}: {e}")
-            status = "skipped (read error)"
-
-        # --- Print progress for processed or error files ---
-        if total_files > 0:
-            percentage = (processed_files / total_files) * 100
-            rounded_percentage = int(percentage)
-            print(f"\033[92mProgress: {processed_files}/{total_files} ({rounded_percentage}%) {relpath} [{status}]\033[0m")
-
-    return {"files": files_dict}
+            progress.warn(f"Warning: Could not read file {filepath}: {error}")
+            progress.add("errors")
+        return None
+
+    def collect(batch, future):
+        for (relpath, filepath, file_stat), result in zip(batch, future.result()):
+            item = report(relpath, filepath, file_stat, *result)
+            if item is not None:
+                yield item
+
+    # Reads are fanned out to a thread pool in small batches (one task per file costs
+    # more than reading a small file) and collected in walk order. Only a few batches
+    # per worker are in flight, so the walk never runs far ahead of the reads.
+    workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+    pending = deque()
+    batch = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for candidate in candidates:
+            batch.append(candidate)
+            if len(batch) >= READ_BATCH_SIZE:
+                pending.append((batch, executor.submit(read_batch, batch)))
+                batch = []
+            while len(pending) >= workers * 2 or (pending and pending[0][1].done()):
+                yield from collect(*pending.popleft())
+
+        if batch:
+            pending.append((batch, executor.submit(read_batch, batch)))
+        while pending:
+            yield from collect(*pending.popleft())
+
+    counts = progress.finish()
+
+    changes = None
+    if snapshot_name:
+        if snapshot:
+            changes = {
+                "added": [p for p in new_manifest if p not in manifest],
+                "modified": [p for p in new_manifest if p in manifest and manifest[p]["hash"] != new_manifest[p]["hash"]],
+                "removed": [p for p in manifest if p not in new_manifest],
+            }
+            if not use_relative_paths:
+                changes = {kind: [os.path.join(directory, p) for p in paths] for kind, paths in changes.items()}
+            print(
+                f"Incremental crawl: {len(changes['added'])} added, {len(changes['modified'])} modified, "
+                f"{len(changes['removed'])} removed, {unchanged_count} unchanged"
+            )
+
+        # Rewrite the snapshot only when a file had to be read or went away
+        if manifest_stale or len(new_manifest) != len(manifest):
+            _save_manifest(snapshot_dir, snapshot_name, snapshot, directory, crawled_at_ns, new_manifest, texts)
+
+    if stats is not None:
+        stats.update({
+            "counts": counts,
+            "source": source,
+            "changes": changes,
+            "unchanged_count": unchanged_count,
+        })
+
+
+def crawl_local_files(
+    directory,
+    include_patterns=None,
+    exclude_patterns=None,
+    max_file_size=None,
+    use_relative_paths=True,
+    ref=None,
+    max_workers=None,
+    progress_mode="auto",
+    use_git_index=True,
+    snapshot_dir=None,
+):
+    """
+    Crawl files in a local directory with similar interface as crawl_github_files.
+    Takes the same arguments as iter_local_files but collects every file before returning.
+
+    Returns:
+        dict: {"files": {filepath: content}, "stats": {"counts", "source", "changes", "unchanged_count"}}
+              "changes" lists the added/modified/removed paths since the snapshot, None without one.
+    """
+    stats = {}
+    stream = iter_local_files(
+        directory,
+        include_patterns=include_patterns,
+        exclude_patterns=exclude_patterns,
+        max_file_size=max_file_size,
+        use_relative_paths=use_relative_paths,
+        ref=ref,
+        max_workers=max_workers,
+        progress_mode=progress_mode,
+        use_git_index=use_git_index,
+        snapshot_dir=snapshot_dir,
+        stats=stats,
+    )
+    files_dict = {path: content for path, content, _ in stream}
+    return {"files": files_dict, "stats": stats}
 
 
 if __name__ == "__main__":
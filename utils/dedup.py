@@ -0,0 +1,45 @@
+import hashlib
+
+from utils.tokens import approx_token_count
+
+
+def dedupe_files(files):
+    """
+    Find files with identical contents and keep one copy of each distinct body.
+
+    Vendored copies, generated stubs and repeated license or config files are common;
+    duplicates share the first copy's string instead of holding their own, and context
+    builders can refer to the first copy instead of repeating the text. Each meta dict
+    gets the content's SHA-1 as "sha1", for caches keyed by content.
+
+    Args:
+        files (list): (path, content, meta) tuples, e.g. from process_file_stream
+
+    Returns:
+        tuple: (files, duplicate_of, stats)
+            - files: the same tuples, with identical contents interned to one string
+            - duplicate_of: for each file, the index of the first file with the same content, or None
+            - stats: {"duplicate_files": int, "bytes_saved": int, "tokens_saved": int}
+    """
+    first_by_digest = {}
+    interned = []
+    duplicate_of = []
+    stats = {"duplicate_files": 0, "bytes_saved": 0, "tokens_saved": 0}
+
+    for i, (path, content, meta) in enumerate(files):
+        data = content.encode("utf-8")
+        digest = hashlib.sha1(data).digest()
+        meta["sha1"] = digest.hex()
+        first = first_by_digest.setdefault(digest, i)
+        if first == i:
+            interned.append((path, content, meta))
+            duplicate_of.append(None)
+            continue
+        interned.append((path, interned[first][1], meta))
+        duplicate_of.append(first)
+        stats["duplicate_files"] += 1
+        stats["bytes_saved"] += len(data)
+        tokens = meta.get("tokens")
+        stats["tokens_saved"] += tokens if tokens is not None else approx_token_count(content)
+
+    return interned, duplicate_of, stats
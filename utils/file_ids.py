@@ -0,0 +1,70 @@
+import hashlib
+
+ID_HEX_DIGITS = 6
+
+
+def _digest(path):
+    return hashlib.sha1(path.replace("\\", "/").encode("utf-8")).hexdigest()
+
+
+def assign_file_ids(paths):
+    """
+    Stable short identifiers for files, used in prompts instead of positions.
+
+    An identifier is "f" plus the first hex digits of the SHA-1 of the path, so it
+    does not change when other files are added or removed and prompts about
+    unchanged files stay identical (and keep hitting the LLM cache). Paths whose
+    prefixes collide get longer identifiers.
+
+    Args:
+        paths (list): File paths, e.g. the paths of shared["files"]
+
+    Returns:
+        list: Identifiers aligned with paths
+    """
+    digests = [_digest(path) for path in paths]
+    length = {}
+    groups = {}
+    for i, digest in enumerate(digests):
+        groups.setdefault(digest[:ID_HEX_DIGITS], []).append(i)
+    for members in groups.values():
+        n = ID_HEX_DIGITS
+        while len({digests[i][:n] for i in members}) < len({digests[i] for i in members}):
+            n += 2
+        for i in members:
+            length[i] = n
+    return [f"f{digest[:length[i]]}" for i, digest in enumerate(digests)]
+
+
+def parse_file_ref(entry, index_of_id, file_count):
+    """
+    Map a file reference from an LLM answer back to a position in shared["files"].
+
+    Accepts "f1a2b3c # path/comment", "f1a2b3c" and, for answers in the old format,
+    plain positions.
+
+    Args:
+        entry (str or int): The reference
+        index_of_id (dict): {file id: position}
+        file_count (int): Number of files, to validate positions
+
+    Returns:
+        int: The position
+
+    Raises:
+        ValueError: If the reference is unknown or out of range
+    """
+    if isinstance(entry, bool):
+        raise ValueError(f"Invalid file reference: {entry}")
+    if isinstance(entry, int):
+        index = entry
+    else:
+        ref = str(entry).split("#")[0].strip()
+        if ref in index_of_id:
+            return index_of_id[ref]
+        if not ref.isdigit():
+            raise ValueError(f"Unknown file id: {ref}")
+        index = int(ref)
+    if not (0 <= index < file_count):
+        raise ValueError(f"Invalid file index {index}. Max index is {file_count - 1}.")
+    return index
@@ -0,0 +1,171 @@
+import os
+import hashlib
+import json
+import mmap
+import tempfile
+from collections.abc import Sequence
+
+INDEX_FILE = "index.json"
+PACK_FILE = "files.pack"  # Pack of stores written before packs were named by their digest
+
+
+def _write_atomic(path, write):
+    """Write a file through a temporary file and os.replace so readers never see it half-written"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class FileStore(Sequence):
+    """
+    Crawled files packed into one on-disk blob with an offset index and memory-mapped.
+
+    Behaves like the list of (path, content) tuples it replaces: len(store), store[i],
+    iteration and slicing all work, but contents are only decoded when accessed, so the
+    repository is not kept in memory as Python strings for the whole run. The store
+    is persisted, so later runs and other tools can reopen it without refetching.
+
+    Layout of a store directory:
+    - files.<digest>.pack: UTF-8 contents back to back, each distinct content stored once
+    - index.json: {"paths": [...], "offsets": [...], "lengths": [...], "meta": [...], "source": ...,
+                   "digest": ..., "pack": "files.<digest>.pack"}
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, INDEX_FILE), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        self.directory = directory
+        self.paths = index["paths"]
+        self.meta = index.get("meta") or [{} for _ in self.paths]
+        self.source = index.get("source")
+        self.digest = index.get("digest")  # SHA-1 of the paths and contents, None for older stores
+        self._offsets = index["offsets"]
+        self._lengths = index["lengths"]
+        self._positions = None
+
+        self._file = open(os.path.join(directory, index.get("pack", PACK_FILE)), "rb")
+        if os.fstat(self._file.fileno()).st_size:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # Empty files cannot be memory-mapped
+            self._data = b""
+
+    @classmethod
+    def create(cls, directory, files, meta=None, source=None):
+        """
+        Write a store and open it.
+
+        Args:
+            directory (str): Store directory (created if missing, an existing store is replaced)
+            files (iterable): (path, content) tuples
+            meta (list, optional): Per-file metadata dicts aligned with files (JSON-serializable)
+            source (any, optional): JSON-serializable description of what was crawled, to decide
+                                    later whether the store can be reused
+
+        Returns:
+            FileStore: The new store
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths, offsets, lengths = [], [], []
+        written = {}  # content -> offset, identical files point at the same bytes
+        digest = hashlib.sha1()
+
+        def write_pack(f):
+            offset = 0
+            for path, content in files:
+                data = content.encode("utf-8")
+                paths.append(path)
+                lengths.append(len(data))
+                digest.update(f"{path}\0{len(data)}\0".encode("utf-8"))
+                digest.update(data)
+                if content in written:
+                    offsets.append(written[content])
+                    continue
+                f.write(data)
+                written[content] = offset
+                offsets.append(offset)
+                offset += len(data)
+
+        # The pack goes to a temporary name first: its final name comes from the digest of
+        # the contents, which is only known once every file has been written
+        fd, tmp_pack = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write_pack(f)
+            pack_name = f"files.{digest.hexdigest()[:16]}.pack"
+            os.replace(tmp_pack, os.path.join(directory, pack_name))
+        except BaseException:
+            if os.path.exists(tmp_pack):
+                os.remove(tmp_pack)
+            raise
+
+        def write_index(f):
+            index = {
+                "paths": paths, "offsets": offsets, "lengths": lengths, "meta": meta, "source": source,
+                "digest": digest.hexdigest(), "pack": pack_name,
+            }
+            f.write(json.dumps(index).encode("utf-8"))
+
+        # The index names its pack, so a crash before it is replaced leaves the previous
+        # index and pack readable; other packs (the previous one, or one left by a crash)
+        # are removed only afterwards
+        _write_atomic(os.path.join(directory, INDEX_FILE), write_index)
+        for name in os.listdir(directory):
+            if name.endswith(".pack") and name != pack_name:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+        return cls(directory)
+
+    @staticmethod
+    def exists(directory):
+        """Check whether a store has been written to directory"""
+        try:
+            with open(os.path.join(directory, INDEX_FILE), "r", encoding="utf-8") as f:
+                pack = json.load(f).get("pack", PACK_FILE)
+        except (OSError, ValueError):
+            return False
+        return os.path.exists(os.path.join(directory, pack))
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.paths[i], self.content(i)
+
+    def view(self, i):
+        """Zero-copy memoryview of the UTF-8 bytes of file i"""
+        offset = self._offsets[i]
+        return memoryview(self._data)[offset:offset + self._lengths[i]]
+
+    def content(self, i):
+        """Decoded content of file i"""
+        return str(self.view(i), "utf-8")
+
+    def index_of(self, path):
+        """Position of a path in the store, or None"""
+        if self._positions is None:
+            self._positions = {p: i for i, p in enumerate(self.paths)}
+        return self._positions.get(path)
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __reduce__(self):
+        # Copies and pickles reopen the store from disk instead of copying the mapping
+        return (FileStore, (self.directory,))
+
+    def __repr__(self):
+        return f"FileStore({self.directory!r}, {len(self)} files)"
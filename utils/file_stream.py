@@ -0,0 +1,46 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def process_file_stream(stream, preprocessors, queue_size=64, max_workers=4):
+    """
+    Run per-file preprocessing while files are still arriving from a crawler.
+
+    Files are handed to a worker pool as the stream yields them. At most `queue_size`
+    files wait for or undergo preprocessing at a time; when the workers fall behind,
+    pulling from the stream (and with it the crawler) pauses.
+
+    Args:
+        stream (iterable): (path, content, meta) tuples, e.g. from iter_local_files or iter_github_files
+        preprocessors (dict): {name: function(path, content, meta)}; each result is stored as meta[name]
+        queue_size (int, optional): Maximum number of files in flight (default: 64)
+        max_workers (int, optional): Number of preprocessing threads (default: 4)
+
+    Returns:
+        list: (path, content, meta) tuples in stream order, with the preprocessing results in meta
+    """
+    slots = threading.BoundedSemaphore(queue_size)
+    files = []
+    futures = []
+
+    def preprocess(path, content, meta):
+        try:
+            for name, function in preprocessors.items():
+                try:
+                    meta[name] = function(path, content, meta)
+                except Exception as e:
+                    print(f"Warning: Could not compute {name} for {path}: {e}")
+                    meta[name] = None
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for path, content, meta in stream:
+            meta = dict(meta)
+            files.append((path, content, meta))
+            slots.acquire()
+            futures.append(executor.submit(preprocess, path, content, meta))
+        for future in futures:
+            future.result()
+
+    return files
@@ -0,0 +1,93 @@
+import hashlib
+
+from utils.crawl_cache import load_snapshot, save_snapshot
+from utils.tokens import approx_token_count
+
+SUMMARY_CACHE_NAME = "file_summaries"
+SUMMARY_FORMAT_VERSION = 1  # Part of every key, so a new summary format does not reuse old entries
+MIN_SUMMARY_TOKENS = 300  # Smaller files cost about as much as their summary
+
+
+def summary_key(content):
+    """
+    Cache key of a file's summary: the hash of its content, whatever its path or repository.
+
+    Args:
+        content (str): File content
+
+    Returns:
+        str: Key into the summary cache
+    """
+    return f"v{SUMMARY_FORMAT_VERSION}:" + hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def load_summary_cache(cache_dir):
+    """
+    Load the persistent summary cache, {summary_key: summary}.
+
+    Args:
+        cache_dir (str or None): Directory holding the cache, None for an in-memory cache
+
+    Returns:
+        dict: The cached summaries, empty if there are none yet
+    """
+    if not cache_dir:
+        return {}
+    return load_snapshot(cache_dir, SUMMARY_CACHE_NAME) or {}
+
+
+def save_summary_cache(cache_dir, cache):
+    """Atomically write the summary cache (no-op without a cache directory)"""
+    if cache_dir:
+        save_snapshot(cache_dir, SUMMARY_CACHE_NAME, cache)
+
+
+def format_summary(summary):
+    """
+    Render a summary for a prompt.
+
+    Args:
+        summary (dict): {"purpose": str, "symbols": [str], "dependencies": [str]}
+
+    Returns:
+        str: A few lines of text
+    """
+    lines = [f"Purpose: {summary.get('purpose', '').strip()}"]
+    if summary.get("symbols"):
+        lines.append("Key symbols: " + ", ".join(map(str, summary["symbols"])))
+    if summary.get("dependencies"):
+        lines.append("Depends on: " + ", ".join(map(str, summary["dependencies"])))
+    return "\n".join(lines)
+
+
+def files_to_summarize(token_counts, summaries, budget_tokens):
+    """
+    Choose the files whose summary replaces their full text so a context fits a budget.
+
+    The largest files with a summary are replaced first, until the estimated total
+    fits or no summarized file is left.
+
+    Args:
+        token_counts (dict): {file index: tokens of the text the context would include}
+        summaries (list): Summary (dict) or None per file, e.g. shared["file_summaries"]
+        budget_tokens (int): Approximate token budget for the files together
+
+    Returns:
+        set: Indices of the files to show as summaries
+    """
+    total = sum(token_counts.values())
+    chosen = set()
+    if not summaries or not budget_tokens or total <= budget_tokens:
+        return chosen
+    candidates = sorted(
+        (i for i in token_counts if 0 <= i < len(summaries) and summaries[i]),
+        key=lambda i: (-token_counts[i], i),
+    )
+    for i in candidates:
+        if total <= budget_tokens:
+            break
+        saved = token_counts[i] - approx_token_count(format_summary(summaries[i]))
+        if saved > 0:
+            chosen.add(i)
+            total -= saved
+    return chosen
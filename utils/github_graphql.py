@@ -0,0 +1,113 @@
+import requests
+from typing import Dict, List, Optional
+
+# GitHub caps the number of nodes per query, 100 aliases keeps us well within it
+DEFAULT_BATCH_SIZE = 100
+# Keep individual responses reasonably small even when every blob is near the size limit
+DEFAULT_MAX_BATCH_BYTES = 4 * 1024 * 1024
+
+BLOB_FIELDS = "... on Blob { byteSize isBinary isTruncated text }"
+
+
+def graphql_url_for(api_url: str) -> str:
+    """
+    Derive the GraphQL endpoint from a REST API base URL.
+
+    github.com serves both from https://api.github.com, GitHub Enterprise serves
+    REST from /api/v3 and GraphQL from /api/graphql.
+    """
+    api_url = api_url.rstrip("/")
+    if api_url.endswith("/api/v3"):
+        return api_url[: -len("/v3")] + "/graphql"
+    return f"{api_url}/graphql"
+
+
+def batch_paths(
+    paths: List[str],
+    sizes: Dict[str, int],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+):
+    """Split paths into batches bounded by item count and known total size"""
+    batch, batch_bytes = [], 0
+    for path in paths:
+        size = sizes.get(path, 0)
+        if batch and (len(batch) >= batch_size or batch_bytes + size > max_batch_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(path)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def fetch_blobs_graphql(
+    graphql_url: str,
+    owner: str,
+    repo: str,
+    ref: str,
+    paths: List[str],
+    token: str,
+    sizes: Optional[Dict[str, int]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+    post=None,
+):
+    """
+    Fetch the text of many blobs with one GraphQL query per batch (by `expression: "ref:path"`).
+
+    Args:
+        graphql_url (str): GraphQL endpoint (e.g. https://api.github.com/graphql or a local stand-in server)
+        owner (str): Repository owner
+        repo (str): Repository name
+        ref (str): Commit SHA, branch or tag the paths are resolved against
+        paths (list): Repository paths of the blobs to fetch
+        token (str): GitHub token, the GraphQL API does not allow anonymous access
+        sizes (dict, optional): Known blob sizes by path, used to bound the bytes per batch
+        batch_size (int, optional): Maximum number of blobs per query (default: 100)
+        max_batch_bytes (int, optional): Maximum known bytes per query (default: 4 MB)
+        post (callable, optional): Function used to send the request, defaults to requests.post
+
+    Returns:
+        dict: {path: {"text": str or None, "byte_size": int, "is_binary": bool, "is_truncated": bool}}
+              Paths whose batch failed or whose object does not exist are left out,
+              so the caller can fall back to the REST API for them.
+    """
+    post = post or requests.post
+    headers = {"Authorization": f"bearer {token}"}
+    blobs = {}
+
+    for batch in batch_paths(paths, sizes or {}, batch_size, max_batch_bytes):
+        # Pass expressions as variables so paths never need GraphQL string escaping
+        variable_defs = ", ".join(f"$e{i}: String!" for i in range(len(batch)))
+        aliases = "\n".join(f"    f{i}: object(expression: $e{i}) {{ {BLOB_FIELDS} }}" for i in range(len(batch)))
+        query = (
+            f"query($owner: String!, $name: String!, {variable_defs}) {{\n"
+            f"  repository(owner: $owner, name: $name) {{\n{aliases}\n  }}\n}}"
+        )
+        variables = {"owner": owner, "name": repo}
+        variables.update({f"e{i}": f"{ref}:{path}" for i, path in enumerate(batch)})
+
+        response = post(graphql_url, headers=headers, json={"query": query, "variables": variables})
+        if response.status_code != 200:
+            print(f"GraphQL batch of {len(batch)} files failed: {response.status_code} - {response.text}")
+            continue
+
+        payload = response.json()
+        repository = (payload.get("data") or {}).get("repository")
+        if repository is None:
+            print(f"GraphQL batch of {len(batch)} files returned no data: {payload.get('errors')}")
+            continue
+
+        for i, path in enumerate(batch):
+            obj = repository.get(f"f{i}")
+            if not obj or "byteSize" not in obj:
+                continue
+            blobs[path] = {
+                "text": obj.get("text"),
+                "byte_size": obj["byteSize"],
+                "is_binary": bool(obj.get("isBinary")),
+                "is_truncated": bool(obj.get("isTruncated")),
+            }
+
+    return blobs
@@ -0,0 +1,216 @@
+import math
+import threading
+import time
+import requests
+
+# GitHub rate-limit windows last one hour
+RATE_LIMIT_WINDOW = 3600
+# Assumed request latency until we have measured a few requests
+DEFAULT_LATENCY = 0.3
+# How often a single request may wait for a reset before giving up
+MAX_RATE_LIMIT_WAITS = 5
+
+
+def parse_tokens(token):
+    """Accept a single token, a comma-separated string of tokens or a list of tokens"""
+    if not token:
+        return [None]
+    if isinstance(token, str):
+        token = token.split(",")
+    tokens = [t.strip() for t in token if t and t.strip()]
+    return tokens or [None]
+
+
+class RateBudget:
+    """
+    Shared GitHub rate-limit budget for one or more tokens.
+
+    Every response updates the budget from its X-RateLimit-* headers. Requests rotate
+    round-robin over tokens that still have budget, and when the planned number of
+    requests exceeds what is left, they are paced so the budget lasts until the reset
+    instead of running into a 403 and sleeping. Budgets are tracked per token and per
+    resource ("core" for REST, "graphql" for GraphQL).
+    """
+
+    def __init__(self, token=None, api_url="https://api.github.com", sleep=time.sleep, clock=time.time):
+        self.tokens = parse_tokens(token)
+        self.api_url = api_url.rstrip("/")
+        self.sleep = sleep
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = {}  # (token, resource) -> {"remaining": int, "limit": int, "reset": float}
+        self.planned = {}  # resource -> requests still expected
+        self.next_slot = {}  # resource -> earliest time the next paced request may start
+        self.next_token = 0
+        self.request_count = 0
+        self.total_latency = 0.0
+
+    # --- Budget bookkeeping ---
+
+    def _record(self, token, resource, remaining, limit, reset):
+        with self.lock:
+            self.state[(token, resource)] = {"remaining": remaining, "limit": limit, "reset": reset}
+
+    def update(self, token, response, resource="core"):
+        """Read the X-RateLimit-* headers of a response into the budget"""
+        headers = response.headers
+        if "X-RateLimit-Remaining" not in headers:
+            return
+        try:
+            remaining = int(headers["X-RateLimit-Remaining"])
+            limit = int(headers.get("X-RateLimit-Limit", remaining))
+            reset = float(headers.get("X-RateLimit-Reset", self.clock() + RATE_LIMIT_WINDOW))
+        except ValueError:
+            return
+        self._record(token, headers.get("X-RateLimit-Resource", resource), remaining, limit, reset)
+
+    def refresh(self):
+        """Fetch the current budget of every token (the /rate_limit endpoint is free)"""
+        for token in self.tokens:
+            headers = {"Authorization": f"token {token}"} if token else {}
+            try:
+                response = requests.get(f"{self.api_url}/rate_limit", headers=headers)
+            except requests.RequestException as e:
+                print(f"Warning: Could not read rate limit: {e}")
+                continue
+            if response.status_code != 200:
+                continue
+            for resource, values in response.json().get("resources", {}).items():
+                self._record(token, resource, values["remaining"], values["limit"], float(values["reset"]))
+
+    def plan(self, count, resource="core"):
+        """Announce how many more requests the crawl expects to make"""
+        with self.lock:
+            self.planned[resource] = self.planned.get(resource, 0) + count
+
+    def available(self, resource="core"):
+        """Return (remaining requests across tokens, seconds until the last reset), or (None, None) if unknown"""
+        now = self.clock()
+        remaining, reset_in = 0, 0.0
+        with self.lock:
+            for token in self.tokens:
+                state = self.state.get((token, resource))
+                if state is None:
+                    return None, None
+                if state["reset"] <= now:
+                    remaining += state["limit"]
+                else:
+                    remaining += state["remaining"]
+                    reset_in = max(reset_in, state["reset"] - now)
+        return remaining, reset_in
+
+    def projected_seconds(self, planned, resource="core"):
+        """Estimate how long `planned` requests take given the remaining budget"""
+        latency = self.total_latency / self.request_count if self.request_count else DEFAULT_LATENCY
+        remaining, reset_in = self.available(resource)
+        if remaining is None or planned <= remaining:
+            return planned * latency
+        # Requests beyond the remaining budget wait for resets, a full window per `limit` requests
+        limit = sum(self.state[(token, resource)]["limit"] for token in self.tokens) or 1
+        windows = math.ceil((planned - remaining) / limit)
+        return reset_in + (windows - 1) * RATE_LIMIT_WINDOW + planned * latency
+
+    def report(self, planned=None, resource="core"):
+        """Print the remaining budget and, if known, the projected crawl time"""
+        remaining, reset_in = self.available(resource)
+        if remaining is None:
+            return
+        message = (
+            f"Rate budget: {remaining} {resource} requests left across {len(self.tokens)} token(s), "
+            f"resets in {reset_in:.0f}s"
+        )
+        if planned is not None:
+            message += f". Planned ~{planned} requests, projected crawl time ~{self.projected_seconds(planned, resource):.0f}s"
+        print(message)
+
+    # --- Request scheduling ---
+
+    def _acquire(self, resource):
+        """Pick the token for the next request and how long to wait before sending it"""
+        now = self.clock()
+        remaining, reset_in = self.available(resource)
+
+        with self.lock:
+            chosen, wait = None, 0.0
+            for offset in range(len(self.tokens)):
+                token = self.tokens[(self.next_token + offset) % len(self.tokens)]
+                state = self.state.get((token, resource))
+                if state is None or state["remaining"] > 0 or state["reset"] <= now:
+                    chosen = token
+                    self.next_token = (self.next_token + offset + 1) % len(self.tokens)
+                    break
+            if chosen is None:
+                # Every token is exhausted, wait for the earliest reset
+                chosen = min(self.tokens, key=lambda t: self.state[(t, resource)]["reset"])
+                wait = self.state[(chosen, resource)]["reset"] - now + 1
+
+            state = self.state.get((chosen, resource))
+            if state is not None and state["remaining"] > 0:
+                # Reserve the request so concurrent callers do not overspend
+                state["remaining"] -= 1
+
+            # Pace only when the planned requests would outrun the remaining budget
+            planned = self.planned.get(resource, 0)
+            if planned:
+                self.planned[resource] = planned - 1
+            if remaining and planned > remaining and reset_in:
+                slot = max(now + wait, self.next_slot.get(resource, 0.0))
+                self.next_slot[resource] = slot + reset_in / remaining
+                wait = slot - now
+
+        return chosen, wait
+
+    def request(self, method, url, resource="core", headers=None, **kwargs):
+        """
+        Send a request with the next available token, waiting for budget if needed.
+
+        Rate-limited responses (403/429) mark the token exhausted and the request is retried
+        with another token or after the reset, up to MAX_RATE_LIMIT_WAITS times.
+        """
+        response = None
+        for _ in range(MAX_RATE_LIMIT_WAITS + 1):
+            token, wait = self._acquire(resource)
+            if wait > 0:
+                print(f"Rate budget: waiting {wait:.1f} seconds before the next {resource} request...")
+                self.sleep(wait)
+
+            request_headers = dict(headers or {})
+            if token:
+                scheme = "bearer" if resource == "graphql" else "token"
+                request_headers["Authorization"] = f"{scheme} {token}"
+
+            started = self.clock()
+            response = requests.request(method, url, headers=request_headers, **kwargs)
+            with self.lock:
+                self.request_count += 1
+                self.total_latency += self.clock() - started
+            self.update(token, response, resource)
+
+            if not self._is_rate_limited(response):
+                return response
+
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                # Secondary rate limits ask for a fixed back-off instead of a reset
+                print(f"Secondary rate limit hit. Waiting {retry_after} seconds...")
+                self.sleep(float(retry_after))
+            else:
+                reset = float(response.headers.get("X-RateLimit-Reset", self.clock() + 60))
+                limit = int(response.headers.get("X-RateLimit-Limit", 0))
+                self._record(token, resource, 0, limit, reset)
+                print(f"Rate limit exceeded for a token. Switching token or waiting for reset...")
+        return response
+
+    def get(self, url, resource="core", **kwargs):
+        return self.request("GET", url, resource=resource, **kwargs)
+
+    def post(self, url, resource="core", **kwargs):
+        return self.request("POST", url, resource=resource, **kwargs)
+
+    @staticmethod
+    def _is_rate_limited(response):
+        if response.status_code not in (403, 429):
+            return False
+        if response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers:
+            return True
+        return "rate limit" in response.text.lower()
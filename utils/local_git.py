@@ -0,0 +1,118 @@
+import os
+import subprocess
+import threading
+
+
+def _git(directory, *args):
+    """Run a git command in `directory` and return its stdout as bytes"""
+    result = subprocess.run(
+        ["git", *args], cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+    return result.stdout
+
+
+def is_git_repo(directory):
+    """Check whether `directory` is inside a git work tree"""
+    try:
+        return _git(directory, "rev-parse", "--is-inside-work-tree").strip() == b"true"
+    except (RuntimeError, OSError):
+        return False
+
+
+def list_tree(directory, ref):
+    """
+    List the blobs under `directory` at `ref` without touching the work tree.
+
+    Args:
+        directory (str): Directory inside a git repository
+        ref (str): Branch, tag or commit to read
+
+    Returns:
+        list: (path relative to directory, size in bytes, blob sha) for every regular file.
+              Symlinks and submodules are left out.
+    """
+    # Paths come back relative to the working directory since we restrict to "."
+    output = _git(directory, "ls-tree", "-r", "-l", "-z", ref, "--", ".")
+    entries = []
+    for record in output.split(b"\0"):
+        if not record:
+            continue
+        meta, path = record.split(b"\t", 1)
+        mode, obj_type, sha, size = meta.split()
+        if obj_type != b"blob" or mode == b"120000":
+            continue
+        entries.append((os.fsdecode(path), int(size), sha.decode("ascii")))
+    return entries
+
+
+def read_blobs(directory, shas):
+    """
+    Read many blobs in bulk through a single `git cat-file --batch` process.
+
+    Args:
+        directory (str): Directory inside a git repository
+        shas (list): Blob SHAs to read
+
+    Yields:
+        tuple: (sha, content bytes) in the order requested
+    """
+    if not shas:
+        return
+
+    process = subprocess.Popen(
+        ["git", "cat-file", "--batch"],
+        cwd=directory,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+
+    # Feed requests from a thread so neither pipe can fill up and deadlock
+    def write_requests():
+        try:
+            for sha in shas:
+                process.stdin.write(f"{sha}\n".encode("ascii"))
+            process.stdin.close()
+        except OSError:
+            # The reader stopped early and git was terminated
+            pass
+
+    writer = threading.Thread(target=write_requests, daemon=True)
+    writer.start()
+    try:
+        for sha in shas:
+            header = process.stdout.readline().split()
+            if len(header) != 3:
+                # "<sha> missing" for objects that do not exist
+                yield sha, None
+                continue
+            size = int(header[2])
+            content = process.stdout.read(size)
+            process.stdout.read(1)  # Trailing newline after every object
+            yield sha, content
+    finally:
+        # Everything requested has been read (or the caller stopped early), so git can go
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        writer.join()
+
+
+def list_files(directory):
+    """
+    List the files git would consider part of the work tree under `directory`: tracked
+    files plus untracked files that are not ignored, honouring every .gitignore,
+    .git/info/exclude and the global excludes file. Ignored directories are never walked.
+
+    Args:
+        directory (str): Directory inside a git work tree
+
+    Returns:
+        list: Paths relative to directory, with "/" separators, each listed once
+    """
+    output = _git(directory, "ls-files", "-z", "--cached", "--others", "--exclude-standard")
+    # Unmerged paths are listed once per conflict stage
+    return sorted({os.fsdecode(path) for path in output.split(b"\0") if path})
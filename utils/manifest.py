@@ -0,0 +1,60 @@
+from utils.crawl_cache import load_snapshot, save_snapshot
+
+MANIFEST_NAME = "manifest"  # manifest.json in the tutorial's output directory
+MANIFEST_FORMAT_VERSION = 1
+
+
+def load_manifest(output_path):
+    """
+    Load the manifest written with the previous tutorial.
+
+    Args:
+        output_path (str): The tutorial's output directory
+
+    Returns:
+        dict or None: The manifest, or None if there is none in a format this version reads
+    """
+    manifest = load_snapshot(output_path, MANIFEST_NAME)
+    if not manifest or manifest.get("version") != MANIFEST_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(output_path, manifest):
+    """Atomically write a tutorial's manifest next to its chapters"""
+    save_snapshot(output_path, MANIFEST_NAME, dict(manifest, version=MANIFEST_FORMAT_VERSION))
+
+
+def plan_incremental_update(manifest, files, settings, threshold):
+    """
+    Decide whether the abstractions of the previous tutorial can be kept.
+
+    Edits inside files only change the chapters that use them, so the abstractions,
+    relationships and chapter order are kept unless the settings changed, a file an
+    abstraction refers to was removed, or more than `threshold` of the files were added
+    or removed.
+
+    Args:
+        manifest (dict): Output of load_manifest
+        files (dict): {file id: content hash} of the current crawl
+        settings (dict): Settings the abstractions depend on (project, language, ...)
+        threshold (float): Largest share of added plus removed files that keeps the abstractions
+
+    Returns:
+        dict: {"reuse": bool, "reason": str, "added": int, "removed": int, "modified": int}
+    """
+    previous = {file_id: entry["sha1"] for file_id, entry in manifest["files"].items()}
+    added = [file_id for file_id in files if file_id not in previous]
+    removed = [file_id for file_id in previous if file_id not in files]
+    modified = [file_id for file_id in files if file_id in previous and previous[file_id] != files[file_id]]
+    plan = {"added": len(added), "removed": len(removed), "modified": len(modified)}
+
+    used = {file_id for abstraction in manifest["abstractions"] for file_id in abstraction["files"]}
+    changed_share = (len(added) + len(removed)) / max(len(previous), 1)
+    if manifest.get("settings") != settings:
+        return dict(plan, reuse=False, reason="settings changed")
+    if used.intersection(removed):
+        return dict(plan, reuse=False, reason="files of an abstraction were removed")
+    if changed_share > threshold:
+        return dict(plan, reuse=False, reason=f"{changed_share:.0%} of the files were added or removed")
+    return dict(plan, reuse=True, reason="file set unchanged" if not added and not removed else "small change to the file set")
@@ -0,0 +1,48 @@
+import hashlib
+import json
+import os
+
+from utils.crawl_cache import load_snapshot, save_snapshot
+
+MEMO_FORMAT_VERSION = 1  # Part of every digest, so a change to what is stored does not reuse old entries
+
+
+def _json_default(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__} in memo inputs")
+
+
+def input_digest(*parts):
+    """
+    Digest of a node's semantic inputs, used as its memo key.
+
+    Args:
+        *parts: JSON-serializable values (sets are allowed) that determine the node's result
+
+    Returns:
+        str: 64 hex characters
+    """
+    payload = json.dumps([MEMO_FORMAT_VERSION, *parts], sort_keys=True, default=_json_default)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_memo(memo_dir, node_name, digest):
+    """
+    Load a memoized node result.
+
+    Args:
+        memo_dir (str): Directory holding memoized results
+        node_name (str): Node (or batch item) kind, one sub-directory each
+        digest (str): Output of input_digest
+
+    Returns:
+        The stored value, or None if there is none
+    """
+    entry = load_snapshot(os.path.join(memo_dir, node_name), digest)
+    return entry.get("value") if isinstance(entry, dict) else None
+
+
+def save_memo(memo_dir, node_name, digest, value):
+    """Atomically store a node result (JSON-serializable) under its input digest"""
+    save_snapshot(os.path.join(memo_dir, node_name), digest, {"value": value})
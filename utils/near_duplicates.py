@@ -0,0 +1,102 @@
+import re
+import zlib
+
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+SHINGLE_SIZE = 5  # Tokens per shingle
+NUM_BUCKETS = 64  # MinHash signature length
+BANDS = 16  # LSH bands of NUM_BUCKETS // BANDS rows; candidates share at least one band
+EMPTY = 1 << 32  # Larger than any crc32 value
+
+
+def minhash_signature(content, shingle_size=SHINGLE_SIZE, num_buckets=NUM_BUCKETS):
+    """
+    MinHash signature of a text over its token shingles.
+
+    Uses one-permutation hashing: every shingle is hashed once and only competes for
+    the minimum of the bucket its hash falls in, so the cost does not grow with the
+    signature length. Empty buckets borrow the next non-empty bucket's value.
+
+    Args:
+        content (str): Text to sign
+        shingle_size (int, optional): Tokens per shingle (default: 5)
+        num_buckets (int, optional): Signature length (default: 64)
+
+    Returns:
+        list or None: num_buckets integers, None for a text without tokens
+    """
+    tokens = TOKEN_RE.findall(content)
+    if not tokens:
+        return None
+    if len(tokens) < shingle_size:
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+
+    signature = [EMPTY] * num_buckets
+    for shingle in shingles:
+        # crc32 is deterministic across runs, so clusters (and the prompts built from them) are too
+        h = zlib.crc32(shingle.encode("utf-8"))
+        bucket = h % num_buckets
+        if h < signature[bucket]:
+            signature[bucket] = h
+
+    # Densify: fill empty buckets from the right, marked by the distance borrowed over
+    for i in range(num_buckets):
+        if signature[i] == EMPTY:
+            for step in range(1, num_buckets):
+                value = signature[(i + step) % num_buckets]
+                if value < EMPTY:
+                    signature[i] = EMPTY + step * EMPTY + value
+                    break
+    return signature
+
+
+def cluster_near_duplicates(contents, threshold=0.8, bands=BANDS):
+    """
+    Group texts whose estimated Jaccard similarity (over token shingles) reaches threshold.
+
+    Candidate pairs come from locality-sensitive hashing on bands of the MinHash
+    signatures and are confirmed by comparing the full signatures, so the work grows
+    with the number of files rather than the number of pairs.
+
+    Args:
+        contents (list): Texts, e.g. the contents of shared["files"]
+        threshold (float, optional): Minimum estimated similarity, between 0 and 1 (default: 0.8)
+        bands (int, optional): Number of LSH bands (default: 16)
+
+    Returns:
+        list: Clusters of at least two indices into contents, each sorted, the first index being
+              the cluster's representative; clusters are ordered by representative
+    """
+    signatures = [minhash_signature(content) for content in contents]
+    rows = NUM_BUCKETS // bands
+
+    parent = list(range(len(contents)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        buckets = {}
+        for i, signature in enumerate(signatures):
+            if signature is not None:
+                key = tuple(signature[band * rows:(band + 1) * rows])
+                buckets.setdefault(key, []).append(i)
+        for members in buckets.values():
+            first = members[0]
+            for other in members[1:]:
+                root_first, root_other = find(first), find(other)
+                if root_first == root_other:
+                    continue
+                a, b = signatures[first], signatures[other]
+                similarity = sum(x == y for x, y in zip(a, b)) / NUM_BUCKETS
+                if similarity >= threshold:
+                    parent[max(root_first, root_other)] = min(root_first, root_other)
+
+    clusters = {}
+    for i in range(len(contents)):
+        clusters.setdefault(find(i), []).append(i)
+    return [members for _, members in sorted(clusters.items()) if len(members) > 1]
@@ -0,0 +1,198 @@
+import ast
+import os
+import re
+
+MAX_VALUE_CHARS = 120  # Constants with longer values are cut
+MAX_COMMENT_LINES = 3  # Comment lines kept above a declaration in non-Python files
+
+# Declaration lines kept for each language, by file extension or file name
+_BRACE_COMMENT = re.compile(r"^\s*(//|/\*|\*)")
+# Go blocks whose members are kept: struct fields, interface methods, grouped constants
+_GO_BLOCK = re.compile(r"^(type\s+\w+.*\b(struct|interface)\s*(?P<brace>\{)|(const|var|type)\s*\()\s*$")
+_OUTLINE_PATTERNS = {
+    "js": re.compile(
+        r"^\s*(import\b|export\b|(async\s+)?function\b|class\b|interface\b|type\s+\w+\s*=|enum\b"
+        r"|(const|let|var)\s+\w+\s*=\s*(async\s*)?(\(|function\b|class\b|[A-Z_][A-Z0-9_]*\b)"
+        r"|(const|let|var)\s+[A-Z_][A-Z0-9_]*\s*="
+        r"|((static|async|public|private|protected|readonly|get|set)\s+)*(?!(if|for|while|switch|catch|return)\b)\w+\s*\([^;]*\)\s*(:\s*[^{;]+)?\{\s*$)"
+    ),
+    "go": re.compile(r"^(package|import|func|type|const|var)\b"),
+    "java": re.compile(
+        r"^\s*(package|import)\b"
+        r"|^\s*(@\w+|((public|protected|private|static|final|abstract|sealed|default|synchronized)\s+)*"
+        r"(class|interface|enum|record)\b)"
+        r"|^\s*((public|protected|private|static|final|abstract|synchronized|default)\s+)+[\w<>\[\],\s]+\s+\w+\s*\("
+        r"|^\s*((public|protected|private)\s+)?static\s+final\b"
+    ),
+    "c": re.compile(
+        r"^\s*#\s*(include|define)\b|^(typedef|struct|union|enum|class|namespace|template)\b"
+        r"|^\s*(public|protected|private)\s*:|^[A-Za-z_][\w\s\*&:<>,]*\([^;]*\)\s*(const\s*)?\{?\s*$"
+    ),
+    "markdown": re.compile(r"^#{1,6}\s"),
+    "yaml": re.compile(r"^( {0,2})[\w\-\.\"']+\s*:"),
+    "dockerfile": re.compile(r"^\s*(FROM|ARG|ENV|EXPOSE|ENTRYPOINT|CMD|WORKDIR|VOLUME|USER)\b", re.IGNORECASE),
+    "makefile": re.compile(r"^([\w\.\-/%$()]+\s*:[^=]|[A-Z_]+\s*[:?+]?=|\.PHONY|include\b)"),
+}
+_LANGUAGES = {
+    ".js": "js", ".jsx": "js", ".ts": "js", ".tsx": "js", ".mjs": "js", ".cjs": "js",
+    ".go": "go",
+    ".java": "java", ".kt": "java", ".scala": "java", ".cs": "java",
+    ".c": "c", ".cc": "c", ".cpp": "c", ".h": "c", ".hpp": "c",
+    ".md": "markdown", ".rst": "rst",
+    ".yaml": "yaml", ".yml": "yaml",
+}
+
+
+def _language(path):
+    name = os.path.basename(path)
+    if name == "Dockerfile" or name.startswith("Dockerfile."):
+        return "dockerfile"
+    if name in ("Makefile", "GNUmakefile") or name.endswith(".mk"):
+        return "makefile"
+    extension = os.path.splitext(name)[1].lower()
+    if extension in (".py", ".pyi", ".pyx"):
+        return "python"
+    return _LANGUAGES.get(extension)
+
+
+def _shorten(text, limit=MAX_VALUE_CHARS):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def _python_outline(content):
+    """Imports, constants, class and function headers and the first paragraph of docstrings"""
+    tree = ast.parse(content)
+    lines = []
+
+    def add_docstring(node, indent):
+        docstring = ast.get_docstring(node)
+        if docstring:
+            paragraph = docstring.strip().split("\n\n")[0]
+            doc_lines = paragraph.splitlines()
+            if len(doc_lines) == 1:
+                lines.append(f'{indent}"""{doc_lines[0]}"""')
+            else:
+                lines.append(f'{indent}"""{doc_lines[0]}')
+                lines.extend(f"{indent}{line}" for line in doc_lines[1:])
+                lines.append(f'{indent}"""')
+
+    def visit(body, indent, in_class):
+        emitted = False
+        for node in body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)) and not indent:
+                lines.append(ast.unparse(node))
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                lines.extend(f"{indent}@{_shorten(ast.unparse(d))}" for d in node.decorator_list)
+                prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+                returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+                lines.append(f"{indent}{prefix} {node.name}({ast.unparse(node.args)}){returns}:")
+                add_docstring(node, indent + "    ")
+                lines.append(f"{indent}    ...")
+            elif isinstance(node, ast.ClassDef):
+                lines.extend(f"{indent}@{_shorten(ast.unparse(d))}" for d in node.decorator_list)
+                bases = [ast.unparse(b) for b in node.bases] + [ast.unparse(k) for k in node.keywords]
+                lines.append(f"{indent}class {node.name}({', '.join(bases)}):" if bases else f"{indent}class {node.name}:")
+                add_docstring(node, indent + "    ")
+                if not visit(node.body, indent + "    ", True):
+                    lines.append(f"{indent}    ...")
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                names = [t.id for t in targets if isinstance(t, ast.Name)]
+                # Class attributes are all kept (fields), module level only constants and __all__
+                if names and (in_class or all(n.isupper() or n == "__all__" for n in names)):
+                    lines.append(f"{indent}{_shorten(ast.unparse(node))}")
+                else:
+                    continue
+            elif isinstance(node, ast.If) and not indent and "__name__" in ast.unparse(node.test):
+                lines.append(f"if {ast.unparse(node.test)}:")
+                lines.append("    ...")
+            else:
+                continue
+            emitted = True
+        return emitted
+
+    add_docstring(tree, "")
+    visit(tree.body, "", False)
+    return "\n".join(lines)
+
+
+def _line_outline(content, language):
+    """Declaration lines matched by the language's pattern, with the comments right above them"""
+    pattern = _OUTLINE_PATTERNS[language]
+    source_lines = content.splitlines()
+    lines = []
+
+    if language == "rst":
+        # Section titles are the lines underlined with punctuation
+        for i in range(1, len(source_lines)):
+            underline = source_lines[i].strip()
+            title = source_lines[i - 1].strip()
+            if title and len(underline) >= 3 and len(set(underline)) == 1 and underline[0] in "=-~^\"'`#*+":
+                lines.append(title)
+        return "\n".join(lines)
+
+    last_kept = -1
+    i = -1
+    while i + 1 < len(source_lines):
+        i += 1
+        line = source_lines[i]
+        if not pattern.match(line):
+            continue
+        comments = []
+        j = i - 1
+        while j > last_kept and len(comments) < MAX_COMMENT_LINES and _BRACE_COMMENT.match(source_lines[j]):
+            comments.insert(0, source_lines[j])
+            j -= 1
+        lines.extend(comments)
+        stripped = line.rstrip()
+        block = _GO_BLOCK.match(line) if language == "go" else None
+        if block:
+            closer = "}" if block.group("brace") else ")"
+            lines.append(stripped)
+            while i + 1 < len(source_lines) and not source_lines[i + 1].startswith(closer):
+                i += 1
+                if source_lines[i].strip():
+                    lines.append(source_lines[i].rstrip())
+            lines.append(closer)
+            i += 1
+            last_kept = i
+            continue
+        if stripped.endswith("{") and language in ("js", "java", "c", "go"):
+            stripped = stripped[:-1].rstrip() + " { ... }"
+        lines.append(stripped)
+        last_kept = i
+    return "\n".join(lines)
+
+
+def outline_file(path, content):
+    """
+    Structural outline of a source file: signatures, class and function headers,
+    docstrings and top-level constants, without the bodies.
+
+    Python is parsed with `ast`; other languages (JS/TS, Go, Java, C/C++, Markdown,
+    reStructuredText, YAML, Dockerfile, Makefile) keep their declaration lines,
+    found with per-language regexes, plus the comments right above them.
+
+    Args:
+        path (str): File path, used to pick the language
+        content (str): File content
+
+    Returns:
+        str or None: The outline, or None if the language is not supported or nothing was found
+    """
+    language = _language(path)
+    if language is None:
+        return None
+    if language == "python":
+        try:
+            outline = _python_outline(content)
+        except (SyntaxError, ValueError, RecursionError):
+            # Python 2 or generated code ast cannot parse: fall back to declaration lines
+            outline = "\n".join(
+                line.rstrip() for line in content.splitlines()
+                if re.match(r"^\s*(def|class|async\s+def|import|from)\b|^[A-Z_][A-Z0-9_]*\s*=", line)
+            )
+    else:
+        outline = _line_outline(content, language)
+    return outline or None
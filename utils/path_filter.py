@@ -0,0 +1,117 @@
+import os
+import re
+import fnmatch
+from functools import lru_cache
+
+
+def _translate(pattern):
+    """fnmatch.translate without the end anchor, so patterns can be combined into one regex"""
+    regex = fnmatch.translate(pattern)
+    return regex[:-2] if regex.endswith(r"\Z") else regex
+
+
+def _compile(patterns, exclude):
+    """Combine glob patterns into a single regex matched against the full relative path"""
+    if not patterns:
+        return None
+    alternatives = []
+    for pattern in sorted(patterns):
+        regex = _translate(pattern)
+        if "/" not in pattern:
+            # Name patterns may match after any directory separator
+            regex = f"(?:.*/)?{regex}"
+        if exclude:
+            # Excluding a directory excludes everything below it
+            regex = f"{regex}(?:/.*)?"
+        alternatives.append(f"(?:{regex})")
+    return re.compile("|".join(alternatives), re.DOTALL)
+
+
+def _literal_prefix(pattern):
+    """The part of a pattern before its first wildcard, e.g. 'src/' for 'src/*.py'"""
+    for i, char in enumerate(pattern):
+        if char in "*?[":
+            return pattern[:i]
+    return pattern
+
+
+class PathFilter:
+    """
+    Include/exclude patterns compiled once into one regex per pattern set, shared by
+    both crawlers so every path is tested with a single match instead of a loop over
+    fnmatch calls.
+
+    Semantics:
+    - Patterns containing "/" match the full relative path ("docs/*", "src/*.py").
+    - Patterns without "/" are name patterns: include patterns match the file name
+      ("*.py", "Dockerfile"), exclude patterns match the name of the file or of any
+      directory above it ("node_modules", "*test*").
+    - An excluded directory excludes everything below it.
+    - As with fnmatch, "*" also matches "/".
+    """
+
+    def __init__(self, include_patterns=None, exclude_patterns=None):
+        self.include_patterns = frozenset(include_patterns or ())
+        self.exclude_patterns = frozenset(exclude_patterns or ())
+        self._include = _compile(self.include_patterns, exclude=False)
+        self._exclude = _compile(self.exclude_patterns, exclude=True)
+        # When every include pattern is anchored to a path, only directories on
+        # the way to those paths can contain included files
+        self._include_prefixes = None
+        if self.include_patterns and all("/" in p for p in self.include_patterns):
+            self._include_prefixes = tuple(_literal_prefix(p) for p in self.include_patterns)
+
+    @staticmethod
+    def _posix(path):
+        return path.replace(os.sep, "/") if os.sep != "/" else path
+
+    def is_included(self, path):
+        """Check a relative file path against the include patterns (everything is included without any)"""
+        return self._include is None or self._include.fullmatch(self._posix(path)) is not None
+
+    def is_excluded(self, path):
+        """Check a relative file path against the exclude patterns"""
+        return self._exclude is not None and self._exclude.fullmatch(self._posix(path)) is not None
+
+    def matches(self, path):
+        """Check whether a relative file path should be crawled"""
+        return self.is_included(path) and not self.is_excluded(path)
+
+    def excludes_dir(self, dirpath):
+        """Check whether a whole directory (relative path) is excluded and need not be walked"""
+        if self._exclude is None:
+            return False
+        dirpath = self._posix(dirpath).rstrip("/")
+        # "docs/*" matches "docs/" and therefore everything inside docs
+        return self._exclude.fullmatch(dirpath) is not None or self._exclude.fullmatch(dirpath + "/") is not None
+
+    def may_include_under(self, dirpath):
+        """Check whether any include pattern could match a file below a directory (relative path)"""
+        if self._include_prefixes is None:
+            # Name patterns can match at any depth
+            return True
+        dirpath = self._posix(dirpath).rstrip("/") + "/"
+        return any(prefix.startswith(dirpath) or dirpath.startswith(prefix) for prefix in self._include_prefixes)
+
+
+@lru_cache(maxsize=32)
+def _cached_filter(include_patterns, exclude_patterns):
+    return PathFilter(include_patterns, exclude_patterns)
+
+
+def get_path_filter(include_patterns=None, exclude_patterns=None):
+    """
+    Get the compiled filter for a pair of pattern sets, compiling each combination only once.
+
+    Args:
+        include_patterns (str or set, optional): Pattern or patterns to include, None includes everything
+        exclude_patterns (str or set, optional): Pattern or patterns to exclude, None excludes nothing
+
+    Returns:
+        PathFilter: Compiled filter
+    """
+    if isinstance(include_patterns, str):
+        include_patterns = {include_patterns}
+    if isinstance(exclude_patterns, str):
+        exclude_patterns = {exclude_patterns}
+    return _cached_filter(frozenset(include_patterns or ()), frozenset(exclude_patterns or ()))
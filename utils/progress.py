@@ -0,0 +1,135 @@
+import json
+import sys
+import threading
+import time
+
+PROGRESS_MODES = ("auto", "plain", "quiet", "json")
+
+# Counters every crawler reports, with their labels in the summary
+CATEGORIES = (
+    ("included", "included"),
+    ("skipped_pattern", "skipped by pattern"),
+    ("skipped_size", "skipped by size"),
+    ("skipped_binary", "skipped as binary"),
+    ("errors", "errors"),
+)
+
+# Seconds between updates: redrawing one terminal line is cheap, log lines are not
+TTY_INTERVAL = 0.25
+PLAIN_INTERVAL = 5.0
+
+
+class ProgressReporter:
+    """
+    Aggregated, throttled progress output shared by the crawlers.
+
+    Instead of one line per file, counts are collected and shown at most a few times a
+    second, followed by a final summary.
+
+    Modes:
+    - "auto": "tty" when the stream is a terminal, "plain" otherwise
+    - "tty": one status line redrawn in place
+    - "plain": a status line every few seconds, suitable for CI logs
+    - "quiet": only warnings and the final summary
+    - "json": one JSON object per update and for the summary
+    """
+
+    def __init__(self, label="Crawl", mode="auto", stream=None, clock=time.monotonic):
+        if mode not in PROGRESS_MODES and mode != "tty":
+            raise ValueError(f"Unknown progress mode: {mode}")
+        self.label = label
+        self.stream = stream or sys.stdout
+        if mode == "auto":
+            isatty = getattr(self.stream, "isatty", None)
+            mode = "tty" if isatty and isatty() else "plain"
+        self.mode = mode
+        self.interval = TTY_INTERVAL if mode == "tty" else PLAIN_INTERVAL
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.counts = {name: 0 for name, _ in CATEGORIES}
+        self.total = None
+        self.started = clock()
+        self.last_update = self.started
+        self.line_open = False  # A tty status line is on screen and must be cleared first
+        self.finished = False
+
+    def set_total(self, total):
+        """Set the number of files expected, once known"""
+        with self.lock:
+            self.total = total
+
+    def add(self, category, count=1):
+        """Count files in one of the CATEGORIES and update the display if it is due"""
+        with self.lock:
+            self.counts[category] += count
+            now = self.clock()
+            if now - self.last_update >= self.interval:
+                self.last_update = now
+                self._emit_progress(now)
+
+    def warn(self, message):
+        """Print a warning without garbling the status line"""
+        with self.lock:
+            if self.mode == "json":
+                self._write_json({"event": "warning", "label": self.label, "message": message})
+            else:
+                self._clear_line()
+                self.stream.write(f"{message}\n")
+                self.stream.flush()
+
+    def finish(self):
+        """Print the final summary once and return the counts"""
+        with self.lock:
+            if not self.finished:
+                self.finished = True
+                elapsed = self.clock() - self.started
+                if self.mode == "json":
+                    self._write_json(self._record("summary", elapsed))
+                else:
+                    self._clear_line()
+                    self.stream.write(f"{self.label} done in {elapsed:.1f}s: {self._describe()}\n")
+                    self.stream.flush()
+            return dict(self.counts)
+
+    # --- Output ---
+
+    def _processed(self):
+        return sum(self.counts.values())
+
+    def _describe(self):
+        return ", ".join(f"{self.counts[name]} {label}" for name, label in CATEGORIES)
+
+    def _record(self, event, elapsed):
+        record = {"event": event, "label": self.label, "elapsed": round(elapsed, 3)}
+        record.update(self.counts)
+        if self.total is not None:
+            record["total"] = self.total
+        return record
+
+    def _write_json(self, record):
+        self.stream.write(json.dumps(record) + "\n")
+        self.stream.flush()
+
+    def _clear_line(self):
+        if self.line_open:
+            self.stream.write("\r\033[K")
+            self.line_open = False
+
+    def _emit_progress(self, now):
+        if self.mode == "quiet":
+            return
+        elapsed = now - self.started
+        if self.mode == "json":
+            self._write_json(self._record("progress", elapsed))
+            return
+
+        processed = self._processed()
+        done = f"{processed}/{self.total}" if self.total is not None else f"{processed}"
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        line = f"{self.label}: {done} files ({self._describe()}), {rate:.0f} files/s"
+        if self.mode == "tty":
+            self.stream.write(f"\r\033[K{line}")
+            self.line_open = True
+        else:
+            self.stream.write(f"{line}\n")
+        self.stream.flush()
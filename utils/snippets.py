@@ -0,0 +1,185 @@
+import ast
+import math
+import os
+import re
+
+from utils.tokens import approx_token_count
+
+WINDOW_LINES = 3  # Context lines kept around a selected span
+CHUNK_LINES = 20  # Span size for files without recognised definitions
+HEADER_LINES = 15  # Lines of a file's header (imports, module docstring) kept first
+MIN_FILE_BUDGET = 200  # Tokens every file gets, however small its share
+
+_WORD_RE = re.compile(r"[A-Za-z][a-z0-9]*|[A-Z]+(?![a-z])|\d+")
+_STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "like", "its", "are", "was",
+    "how", "what", "which", "when", "where", "who", "why", "can", "each", "all", "any", "but",
+    "not", "you", "your", "our", "has", "have", "had", "use", "uses", "used", "using", "also",
+    "more", "most", "other", "such", "than", "then", "them", "they", "there", "these", "those",
+    "will", "would", "about", "just", "one", "two", "way", "ways", "make", "makes", "some",
+}
+
+
+def keywords_for(*texts):
+    """
+    Lower-case words of an abstraction's name and description to match code against,
+    with camelCase and snake_case split and common English words left out.
+    """
+    words = set()
+    for text in texts:
+        for word in _WORD_RE.findall(text or ""):
+            word = word.lower()
+            if len(word) >= 3 and word not in _STOPWORDS:
+                words.add(word)
+    return words
+
+
+def _python_spans(content):
+    """(name, first line, last line) of functions, class headers and methods, 1-based"""
+    tree = ast.parse(content)
+    spans = []
+
+    def start_of(node):
+        return min([node.lineno] + [d.lineno for d in node.decorator_list])
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            spans.append((node.name, start_of(node), node.end_lineno))
+        elif isinstance(node, ast.ClassDef):
+            methods = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+            header_end = start_of(methods[0]) - 1 if methods else node.end_lineno
+            spans.append((node.name, start_of(node), header_end))
+            for method in methods:
+                spans.append((f"{node.name}.{method.name}", start_of(method), method.end_lineno))
+    return spans
+
+
+def _spans(path, content, line_count, symbols):
+    if os.path.splitext(path)[1].lower() in (".py", ".pyi", ".pyx"):
+        try:
+            return _python_spans(content)
+        except (SyntaxError, ValueError, RecursionError):
+            pass
+    if symbols:
+        # A definition runs until the next one starts
+        starts = sorted({(s["line"], s["name"]) for s in symbols})
+        return [
+            (name, line, (starts[k + 1][0] - 1) if k + 1 < len(starts) else line_count)
+            for k, (line, name) in enumerate(starts)
+        ]
+    return [("", start, min(start + CHUNK_LINES - 1, line_count)) for start in range(1, line_count + 1, CHUNK_LINES)]
+
+
+def extract_snippets(path, content, keywords, budget_tokens, symbols=None, referenced=(), window=WINDOW_LINES):
+    """
+    Cut a file down to the definitions most relevant to an abstraction.
+
+    Functions, classes and methods (from `ast` for Python, from the symbol index for
+    other languages, fixed chunks otherwise) are scored by keywords in their name and
+    body and by whether other related files call them. The file header and the best
+    spans, each with a few lines of surrounding context, are kept in file order until
+    the token budget is used; omitted ranges are marked.
+
+    Args:
+        path (str): File path
+        content (str): File content
+        keywords (set): Lower-case words from the abstraction, see keywords_for
+        budget_tokens (int): Approximate token budget for this file
+        symbols (list, optional): {"name", "line"} definitions from the symbol index
+        referenced (iterable, optional): Names called from the other related files
+        window (int, optional): Context lines kept around each span (default: 3)
+
+    Returns:
+        str: The content if it fits the budget, the selected snippets otherwise
+    """
+    if approx_token_count(content) <= budget_tokens:
+        return content
+    lines = content.splitlines()
+    referenced = set(referenced)
+
+    spans = _spans(path, content, len(lines), symbols)
+    bodies = ["\n".join(lines[start - 1:end]).lower() for _, start, end in spans]
+    # Keywords found all over the file (e.g. the project's main noun) say little about a span
+    weights = {
+        k: math.log((1 + len(spans)) / (1 + sum(k in body for body in bodies)))
+        for k in keywords
+    }
+
+    scored = []
+    for (name, start, end), body in zip(spans, bodies):
+        score = 5 * len(keywords_for(name) & keywords)
+        score += sum(weights[k] * min(body.count(k), 3) for k in keywords)
+        if name and name.split(".")[-1] in referenced:
+            score += 3
+        scored.append((-score, start, end))
+    scored.sort()
+
+    selected = set()
+    used = 0
+
+    def take(start, end):
+        nonlocal used
+        new = [n for n in range(max(1, start), min(len(lines), end) + 1) if n not in selected]
+        cost = approx_token_count("\n".join(lines[n - 1] for n in new))
+        if used + cost > budget_tokens:
+            return False
+        selected.update(new)
+        used += cost
+        return True
+
+    first_span = min((start for _, start, _ in scored), default=1)
+    take(1, min(HEADER_LINES, first_span - 1))
+    for _, start, end in scored:
+        if not take(start - window, end + window):
+            # Too large for what is left: at least its signature and docstring
+            take(start, min(end, start + 2 * window))
+
+    parts = []
+    gap_start = None
+    for n in range(1, len(lines) + 1):
+        if n in selected:
+            if gap_start is not None:
+                parts.append(f"... (lines {gap_start}-{n - 1} omitted) ...")
+                gap_start = None
+            parts.append(lines[n - 1])
+        elif gap_start is None:
+            gap_start = n
+    if gap_start is not None:
+        parts.append(f"... (lines {gap_start}-{len(lines)} omitted) ...")
+    return "\n".join(parts)
+
+
+def fit_files_to_budget(files, keywords, budget_tokens, symbol_index=None):
+    """
+    Fit an abstraction's related files into a per-chapter token budget.
+
+    Files are kept whole when they fit together; otherwise each file gets a share of
+    the budget in proportion to its size (at least MIN_FILE_BUDGET tokens) and larger
+    files are cut down with extract_snippets.
+
+    Args:
+        files (list): (file index, path, content) tuples
+        keywords (set): Lower-case words from the abstraction, see keywords_for
+        budget_tokens (int): Approximate token budget for all files together
+        symbol_index (dict, optional): Output of build_symbol_index
+
+    Returns:
+        list: (file index, path, content or snippets) tuples in the same order
+    """
+    sizes = [approx_token_count(content) for _, _, content in files]
+    total = sum(sizes)
+    if total <= budget_tokens:
+        return files
+
+    entries = symbol_index["files"] if symbol_index else None
+    fitted = []
+    for (i, path, content), size in zip(files, sizes):
+        share = max(MIN_FILE_BUDGET, budget_tokens * size // total)
+        symbols = entries[i]["symbols"] if entries and 0 <= i < len(entries) else None
+        referenced = set()
+        if entries:
+            for j, _, _ in files:
+                if j != i and 0 <= j < len(entries):
+                    referenced.update(entries[j]["calls"])
+        fitted.append((i, path, extract_snippets(path, content, keywords, share, symbols, referenced)))
+    return fitted
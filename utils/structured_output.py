@@ -0,0 +1,120 @@
+import json
+import re
+from typing import List, TypedDict
+
+import yaml
+
+# Result types of the LLM nodes. They are plain dicts at runtime, so results stay
+# JSON-serializable for the shared store, memoized results, checkpoints and the manifest.
+
+
+class Abstraction(TypedDict):
+    name: str  # Potentially translated
+    description: str  # Potentially translated
+    files: List[int]  # Indices into shared["files"]
+
+
+# "from" is a keyword, so this one needs the functional syntax; indices into shared["abstractions"]
+Relationship = TypedDict("Relationship", {"from": int, "to": int, "label": str})
+
+
+class Relationships(TypedDict):
+    summary: str  # Potentially translated
+    details: List[Relationship]
+
+
+# Response schemas for the provider's structured output mode, in the OpenAPI subset
+# Gemini accepts. Fields mirror the YAML the prompts ask for, so the same parsing and
+# validation applies to both; references stay strings like "f3a91c0 # path/to/file.py".
+_STRING = {"type": "STRING"}
+
+
+def _object(properties):
+    return {
+        "type": "OBJECT",
+        "properties": properties,
+        "required": list(properties),
+        "propertyOrdering": list(properties),
+    }
+
+
+ABSTRACTIONS_SCHEMA = {
+    "type": "ARRAY",
+    "items": _object({"name": _STRING, "description": _STRING, "file_ids": {"type": "ARRAY", "items": _STRING}}),
+}
+
+RELATIONSHIPS_SCHEMA = _object({
+    "summary": _STRING,
+    "relationships": {
+        "type": "ARRAY",
+        "items": _object({"from_abstraction": _STRING, "to_abstraction": _STRING, "label": _STRING}),
+    },
+})
+
+CHAPTER_ORDER_SCHEMA = {"type": "ARRAY", "items": _STRING}
+
+FILE_SUMMARIES_SCHEMA = {
+    "type": "ARRAY",
+    "items": _object({
+        "id": _STRING,
+        "purpose": _STRING,
+        "symbols": {"type": "ARRAY", "items": _STRING},
+        "dependencies": {"type": "ARRAY", "items": _STRING},
+    }),
+}
+
+# Fenced block with an optional language tag; the closing fence may be missing when the
+# output was cut off
+_FENCE_RE = re.compile(r"```[ \t]*(yaml|yml|json)?[ \t]*\n(.*?)(?:```|\Z)", re.DOTALL | re.IGNORECASE)
+
+
+def _candidates(response):
+    """Texts that may hold the structured output, most likely first"""
+    text = response.strip()
+    yield text  # JSON from structured output mode, or bare YAML
+    blocks = _FENCE_RE.findall(text)
+    # Blocks tagged yaml/json before untagged ones (which may be example code)
+    for tag, block in sorted(blocks, key=lambda b: not b[0]):
+        yield block.strip()
+    # A sentence before the first list item or key
+    lines = text.splitlines()
+    for start, line in enumerate(lines):
+        if line.startswith(("- ", "[", "{")) or re.match(r"^\w+:", line):
+            yield "\n".join(lines[start:]).split("```")[0].strip()
+            break
+
+
+def parse_structured(response, expected_type):
+    """
+    Parse the structured output of an LLM response, tolerating formatting drift.
+
+    Tries, in order: the whole response as JSON (structured output mode) or YAML, each
+    ```yaml/```json/``` block (also one whose closing fence is missing), and the text from
+    the first list item or key on. The first candidate that parses to `expected_type` wins.
+
+    Args:
+        response (str): The LLM response
+        expected_type (type): list or dict
+
+    Returns:
+        list or dict: The parsed output
+
+    Raises:
+        ValueError: If no candidate parses to `expected_type`
+    """
+    last_error = None
+    for candidate in _candidates(response):
+        if not candidate:
+            continue
+        for load in (json.loads, yaml.safe_load):
+            try:
+                data = load(candidate)
+            except ValueError:
+                continue  # Not JSON, try YAML
+            except yaml.YAMLError as e:
+                last_error = e
+                continue
+            if isinstance(data, expected_type):
+                return data
+    detail = f": {last_error}" if last_error else ""
+    raise ValueError(f"No {expected_type.__name__} found in the LLM output{detail}")
@@ -0,0 +1,295 @@
+import ast
+import os
+import posixpath
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+PYTHON_EXTENSIONS = (".py", ".pyi", ".pyx")
+JS_EXTENSIONS = (".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs")
+PROCESS_POOL_MIN_FILES = 64  # Below this, starting worker processes costs more than it saves
+MIN_CALL_NAME_LENGTH = 4  # Shorter names (get, run, id) link unrelated files
+MAX_DEFINITIONS_PER_CALL = 3  # Names defined in more files than this are too ambiguous to link
+
+# Regex extraction for languages without a parser in the standard library
+_PY_FALLBACK = {
+    "symbols": re.compile(r"^\s*(?:async\s+)?(def|class)\s+(\w+)", re.M),
+    "imports": re.compile(r"^\s*(?:from\s+(\.*[\w\.]*)\s+import|import\s+([\w\.]+))", re.M),
+}
+_JS = {
+    "symbols": re.compile(
+        r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?(?:async\s+)?"
+        r"(function|class|interface|type|enum|const|let|var)\s+(\w+)",
+        re.M,
+    ),
+    "imports": re.compile(r"""(?:\bfrom\s*|\bimport\s*\(?\s*|\brequire\s*\(\s*)["']([^"']+)["']"""),
+}
+_GO = {
+    "symbols": re.compile(r"^(?:(func)\s+(?:\([^)]*\)\s*)?(\w+)|(type)\s+(\w+))", re.M),
+    "import_block": re.compile(r"^import\s*\((.*?)^\)", re.M | re.S),
+    "import_line": re.compile(r'^import\s+(?:\w+\s+)?"([^"]+)"', re.M),
+}
+_JAVA = {
+    "symbols": re.compile(
+        r"^\s*(?:(?:public|protected|private|static|final|abstract|sealed)\s+)*(class|interface|enum|record)\s+(\w+)"
+        r"|^\s*(?:(?:public|protected|private|static|final|abstract|synchronized)\s+)+[\w<>\[\],\s]+\s+(\w+)\s*\(",
+        re.M,
+    ),
+    "imports": re.compile(r"^\s*import\s+(?:static\s+)?([\w\.]+)(?:\.\*)?\s*;", re.M),
+}
+
+
+def _python_symbols(content):
+    tree = ast.parse(content)
+    symbols, imports, calls = [], [], set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append({"name": node.name, "kind": "function", "line": node.lineno})
+        elif isinstance(node, ast.ClassDef):
+            symbols.append({"name": node.name, "kind": "class", "line": node.lineno})
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    symbols.append({"name": f"{node.name}.{item.name}", "kind": "method", "line": item.lineno})
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            module = "." * node.level + (node.module or "")
+            imports.append(module)
+            # "from package import module" imports a file too
+            imports.extend(f"{module}.{alias.name}" if node.module else f"{module}{alias.name}" for alias in node.names)
+        elif isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Name):
+                calls.add(func.id)
+            elif isinstance(func, ast.Attribute):
+                calls.add(func.attr)
+    return symbols, imports, sorted(calls)
+
+
+def _regex_symbols(content, patterns):
+    symbols = []
+    for match in patterns["symbols"].finditer(content):
+        groups = [g for g in match.groups() if g]
+        kind, name = (groups[0], groups[1]) if len(groups) > 1 else ("function", groups[0])
+        line = content.count("\n", 0, match.start()) + 1
+        symbols.append({"name": name, "kind": kind, "line": line})
+    imports = [next(g for g in match.groups() if g is not None) for match in patterns["imports"].finditer(content)]
+    return symbols, imports, []
+
+
+def _go_symbols(content):
+    symbols, _, _ = _regex_symbols(content, {"symbols": _GO["symbols"], "imports": re.compile(r"(?!)")})
+    for symbol in symbols:
+        symbol["kind"] = "function" if symbol["kind"] == "func" else symbol["kind"]
+    imports = []
+    for block in _GO["import_block"].findall(content):
+        imports.extend(re.findall(r'"([^"]+)"', block))
+    content_without_blocks = _GO["import_block"].sub("", content)
+    imports.extend(_GO["import_line"].findall(content_without_blocks))
+    return symbols, imports, []
+
+
+def extract_symbols(path, content):
+    """
+    Definitions, imports and called names of one file.
+
+    Python is parsed with `ast` (falling back to regexes for code it cannot parse,
+    such as outlines); JS/TS, Go and Java are scanned with regexes.
+
+    Args:
+        path (str): File path, used to pick the language
+        content (str): File content
+
+    Returns:
+        dict: {"symbols": [{"name", "kind", "line"}], "imports": [str], "calls": [str]},
+              empty lists for other languages
+    """
+    extension = os.path.splitext(path)[1].lower()
+    symbols, imports, calls = [], [], []
+    if extension in PYTHON_EXTENSIONS:
+        try:
+            symbols, imports, calls = _python_symbols(content)
+        except (SyntaxError, ValueError, RecursionError):
+            symbols = [
+                {"name": m.group(2), "kind": "function" if m.group(1) == "def" else "class",
+                 "line": content.count("\n", 0, m.start()) + 1}
+                for m in _PY_FALLBACK["symbols"].finditer(content)
+            ]
+            imports = [m.group(1) or m.group(2) for m in _PY_FALLBACK["imports"].finditer(content)]
+    elif extension in JS_EXTENSIONS:
+        symbols, imports, calls = _regex_symbols(content, _JS)
+    elif extension == ".go":
+        symbols, imports, calls = _go_symbols(content)
+    elif extension == ".java":
+        symbols, imports, calls = _regex_symbols(content, _JAVA)
+    return {"symbols": symbols, "imports": imports, "calls": calls}
+
+
+def _extract_batch(batch):
+    # Module-level so worker processes can unpickle it
+    return [extract_symbols(path, content) for path, content in batch]
+
+
+def _resolve_import(path, module, by_path, by_stem):
+    """File index an import refers to, or None for external modules"""
+    extension = os.path.splitext(path)[1].lower()
+    directory = posixpath.dirname(path)
+
+    if extension in PYTHON_EXTENSIONS:
+        level = len(module) - len(module.lstrip("."))
+        parts = [p for p in module.lstrip(".").split(".") if p]
+        if level:
+            base = directory
+            for _ in range(level - 1):
+                base = posixpath.dirname(base)
+            stems = [posixpath.join(base, *parts) if parts else base]
+        else:
+            if not parts:
+                return None
+            stems = ["/".join(parts)]
+        for stem in stems:
+            for candidate in (f"{stem}.py", f"{stem}.pyi", f"{stem}/__init__.py"):
+                if candidate in by_path:
+                    return by_path[candidate]
+            if not level:
+                # The import root may be a sub-directory such as src/
+                for candidate_stem in (stem, f"{stem}/__init__"):
+                    matches = by_stem.get(candidate_stem)
+                    if matches and len(matches) == 1:
+                        return matches[0]
+        return None
+
+    if extension in JS_EXTENSIONS:
+        if not module.startswith("."):
+            return None
+        stem = posixpath.normpath(posixpath.join(directory, module))
+        for suffix in ("",) + JS_EXTENSIONS + tuple(f"/index{e}" for e in JS_EXTENSIONS):
+            if stem + suffix in by_path:
+                return by_path[stem + suffix]
+        return None
+
+    if extension == ".java":
+        matches = by_stem.get(module.replace(".", "/"))
+        return matches[0] if matches and len(matches) == 1 else None
+
+    return None
+
+
+def build_symbol_index(files, max_workers=None, entries=None):
+    """
+    Build a symbol table and a file-level import and call graph for a repository.
+
+    Python files are parsed in a process pool (`ast` is CPU-bound and holds the GIL);
+    other languages are scanned with regexes. Imports are resolved to files of the
+    repository; a Python call links to the file defining the called name when that
+    name is defined in only a few files.
+
+    Args:
+        files (sequence): (path, content) tuples, e.g. shared["files"]
+        max_workers (int, optional): Worker processes for Python files (default: CPU count)
+        entries (list, optional): extract_symbols results aligned with files, e.g. computed
+                                  while fetching; files whose entry is None are parsed here
+
+    Returns:
+        dict: JSON-serializable index
+            - "files": per file {"symbols": [...], "imports": [...], "calls": [...]}, aligned with files
+            - "definitions": {name: [file indices]} for top-level functions and classes
+            - "edges": [[from file, to file, "import" or "call"], ...] without duplicates
+    """
+    paths = [path.replace(os.sep, "/") for path, _ in files]
+    entries = list(entries) if entries is not None else [None] * len(paths)
+    python = [i for i, path in enumerate(paths) if entries[i] is None and path.lower().endswith(PYTHON_EXTENSIONS)]
+
+    if len(python) >= PROCESS_POOL_MIN_FILES:
+        batch_size = 16
+        batches = [python[start:start + batch_size] for start in range(0, len(python), batch_size)]
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = executor.map(_extract_batch, [[files[i] for i in batch] for batch in batches])
+                for batch, batch_entries in zip(batches, results):
+                    for i, entry in zip(batch, batch_entries):
+                        entries[i] = entry
+        except (OSError, RuntimeError) as e:
+            # Sandboxes without process support, or a broken pool: parse in this process
+            print(f"Warning: Could not parse Python files in worker processes ({e}), parsing them sequentially.")
+    for i in range(len(paths)):
+        if entries[i] is None:
+            path, content = files[i]
+            entries[i] = extract_symbols(path, content)
+
+    by_path = {path: i for i, path in enumerate(paths)}
+    by_stem = {}  # Path without extension, and each of its suffixes, -> file indices
+    for i, path in enumerate(paths):
+        parts = posixpath.splitext(path)[0].split("/")
+        for start in range(len(parts)):
+            by_stem.setdefault("/".join(parts[start:]), []).append(i)
+
+    definitions = {}
+    for i, entry in enumerate(entries):
+        for symbol in entry["symbols"]:
+            if "." not in symbol["name"]:
+                definitions.setdefault(symbol["name"], [])
+                if not definitions[symbol["name"]] or definitions[symbol["name"]][-1] != i:
+                    definitions[symbol["name"]].append(i)
+
+    # Go packages are directories: an import path ending in a directory links to its files
+    go_dirs = {}
+    for i, path in enumerate(paths):
+        if path.endswith(".go"):
+            go_dirs.setdefault(posixpath.dirname(path), []).append(i)
+
+    edges = set()
+    for i, entry in enumerate(entries):
+        for module in entry["imports"]:
+            if paths[i].endswith(".go"):
+                for directory, members in go_dirs.items():
+                    if directory and (module == directory or module.endswith("/" + directory)):
+                        edges.update((i, j, "import") for j in members if j != i)
+                continue
+            j = _resolve_import(paths[i], module, by_path, by_stem)
+            if j is not None and j != i:
+                edges.add((i, j, "import"))
+        for name in entry["calls"]:
+            defined_in = definitions.get(name)
+            if (
+                defined_in
+                and len(name) >= MIN_CALL_NAME_LENGTH
+                and len(defined_in) <= MAX_DEFINITIONS_PER_CALL
+                and i not in defined_in
+            ):
+                edges.update((i, j, "call") for j in defined_in)
+
+    return {
+        "files": entries,
+        "definitions": definitions,
+        "edges": [list(edge) for edge in sorted(edges)],
+    }
+
+
+def abstraction_dependencies(symbol_index, abstractions):
+    """
+    Aggregate the file graph into dependencies between abstractions.
+
+    Args:
+        symbol_index (dict): Output of build_symbol_index
+        abstractions (list): {"files": [file indices], ...} dicts, e.g. shared["abstractions"]
+
+    Returns:
+        list: [{"from": int, "to": int, "imports": int, "calls": int}], strongest first
+    """
+    owners = {}
+    for a, abstraction in enumerate(abstractions):
+        for i in abstraction.get("files", []):
+            owners.setdefault(i, set()).add(a)
+
+    counts = {}
+    for source, target, kind in symbol_index.get("edges", []):
+        for a in owners.get(source, ()):
+            for b in owners.get(target, ()):
+                if a != b:
+                    pair = counts.setdefault((a, b), {"imports": 0, "calls": 0})
+                    pair["imports" if kind == "import" else "calls"] += 1
+
+    dependencies = [{"from": a, "to": b, **pair} for (a, b), pair in counts.items()]
+    dependencies.sort(key=lambda d: (-(d["imports"] + d["calls"]), d["from"], d["to"]))
+    return dependencies
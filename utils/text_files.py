@@ -0,0 +1,168 @@
+import codecs
+import mmap
+
+try:
+    from charset_normalizer import from_bytes
+except ImportError:  # Optional, only used when a file is neither UTF-8 nor has a BOM
+    from_bytes = None
+
+# Bytes read up front to tell binaries from text
+SNIFF_BYTES = 8192
+# Files at least this large are memory-mapped instead of read into a buffer
+MMAP_THRESHOLD = 256 * 1024
+
+# Signatures of common binary formats that may not contain a NUL byte early on
+BINARY_MAGIC = (
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",  # JPEG
+    b"PK\x03\x04",  # zip, jar, docx, wheel
+    b"\x1f\x8b",  # gzip
+    b"\xfd7zXZ\x00",
+    b"7z\xbc\xaf\x27\x1c",
+    b"\x7fELF",
+    b"\xca\xfe\xba\xbe",  # Java class, Mach-O fat binary
+    b"\xcf\xfa\xed\xfe",  # Mach-O
+    b"\x00asm",  # WebAssembly
+    b"SQLite format 3\x00",
+)
+
+# Signatures made of printable ASCII, which a text file may also start with: they only
+# mark a binary together with a control byte in the sniffed head
+ASCII_BINARY_MAGIC = (
+    b"GIF87a",
+    b"GIF89a",
+    b"%PDF-",
+    b"BZh",
+    b"RIFF",
+    b"OggS",
+    b"ID3",
+    b"wOFF",
+    b"wOF2",
+)
+
+# Byte order marks, longest first so UTF-32 is not mistaken for UTF-16
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# Control bytes that do not occur in text files, and the share of them that marks a binary
+CONTROL_BYTES = bytes(set(range(32)) - set(b"\t\n\r\f\b\x1b"))
+BINARY_CONTROL_RATIO = 0.05
+
+# charset_normalizer names of single-byte code pages, which it cannot reliably tell apart
+SINGLE_BYTE_PREFIXES = ("cp12", "cp4", "cp8", "iso8859", "latin", "mac", "koi8", "ascii")
+
+
+def _bom_encoding(head):
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    return None
+
+
+def looks_binary(head):
+    """
+    Sniff the first bytes of a file: known binary signatures, NUL bytes or many control bytes mean binary.
+
+    Args:
+        head (bytes): The first SNIFF_BYTES bytes (or fewer) of the file
+
+    Returns:
+        bool: True if the file should be treated as binary
+    """
+    head = bytes(head[:SNIFF_BYTES])
+    if _bom_encoding(head):
+        # UTF-16/32 text is full of NUL bytes
+        return False
+    if head.startswith(BINARY_MAGIC):
+        return True
+    if b"\0" in head:
+        return True
+    if not head:
+        return False
+
+    # Random binary data is about 10% control bytes, text in any encoding next to none
+    control = len(head) - len(head.translate(None, CONTROL_BYTES))
+    if control and head.startswith(ASCII_BINARY_MAGIC):
+        return True
+    return control > len(head) * BINARY_CONTROL_RATIO
+
+
+def decode_text(data):
+    """
+    Decode file content, trying UTF-8 first, then a byte order mark, then charset detection.
+
+    Args:
+        data (bytes-like): File content, a bytes object or an mmap
+
+    Returns:
+        str or None: Decoded text, None if no encoding fits
+    """
+    head = bytes(data[:4])
+    encoding = _bom_encoding(head)
+    if encoding:
+        try:
+            return str(data, encoding)
+        except UnicodeDecodeError:
+            return None
+
+    try:
+        return str(data, "utf-8")
+    except UnicodeDecodeError:
+        pass
+
+    best = from_bytes(bytes(data)).best() if from_bytes is not None else None
+    if best is not None and not best.encoding.startswith(SINGLE_BYTE_PREFIXES):
+        # Multi-byte encodings (Shift-JIS, GB18030, EUC-KR, ...) are detected reliably
+        return str(best)
+
+    # Detection cannot tell single-byte code pages apart, and Windows-1252 covers
+    # most legacy source files
+    try:
+        return str(data, "cp1252")
+    except UnicodeDecodeError:
+        return str(best) if best is not None else None
+
+
+def read_text_file(filepath, size=None, mmap_threshold=MMAP_THRESHOLD):
+    """
+    Read a text file, skipping binaries after sniffing only their first bytes.
+
+    Large files are memory-mapped and decoded straight from the mapping. Line endings
+    are normalized to "\\n" like Python's text mode does.
+
+    Args:
+        filepath (str): Path of the file
+        size (int, optional): Known file size, saves a stat call
+        mmap_threshold (int, optional): Minimum size for memory-mapping the file
+
+    Returns:
+        tuple: (content, error) where content is the text or None, and error is None,
+               "binary", "decode error" or "read error: <reason>"
+    """
+    try:
+        with open(filepath, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+            if looks_binary(head):
+                return None, "binary"
+
+            if len(head) < SNIFF_BYTES:
+                # The sniff already read the whole file
+                text = decode_text(head)
+            elif size is not None and size >= mmap_threshold:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    text = decode_text(mapped)
+            else:
+                text = decode_text(head + f.read())
+    except (OSError, ValueError) as e:
+        return None, f"read error: {e}"
+
+    if text is None:
+        return None, "decode error"
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text, None
@@ -0,0 +1,11 @@
+def approx_token_count(text):
+    """
+    Estimate the number of LLM tokens in a text without a tokenizer.
+
+    Args:
+        text (str): Prompt or file content
+
+    Returns:
+        int: Rough estimate, 1 word ≈ 1.3 tokens for code/text
+    """
+    return int(len(text.split()) * 1.3)